@@ -0,0 +1,577 @@
+# brief_utils.py
+"""
+Shared runner for the executive brief scripts (coo_brief_enhanced.py and its siblings).
+
+A brief fetches its operational report (the URL in `url_env`, else `file_fallback`, else the
+script's skeleton), asks an LLM for commentary to prepend, and emails the two together.
+`run_brief(**BRIEF)` runs one. `run_briefs([...])` runs several, with their fetch and LLM
+stages overlapping on a pool of BRIEF_WORKERS threads, then sends the emails in order:
+
+    python brief_utils.py coo_brief_enhanced cfo_brief ...   # the BRIEF of each module
+
+Completions are cached on disk under BRIEF_CACHE_DIR, keyed by model, system message, prompt
+prefix and a hash of the report (now_est_str stamps masked), so a rerun or an unchanged
+report costs no tokens. BRIEF_LLM=stub answers locally and deterministically instead of
+calling OpenAI, and BRIEF_DRY_RUN=1 prints each email instead of sending it, so the whole
+flow runs offline.
+
+Prompts are compacted against the last report a brief sent (kept with its token and cost
+history under BRIEF_STATE_DIR): only the sections that changed go to the LLM, annotated with
+their previous values, and the rest are named in one line. An unchanged report reuses the
+last commentary. Every prompt is held to the brief's token budget (`token_budget`, default
+BRIEF_TOKEN_BUDGET, covering system message, prompt and `max_output_tokens`) using a local
+token estimate, leaving out unchanged lines before changed ones, and each run records its
+tokens and cost in USD per brief.
+"""
+import hashlib, importlib, json, os, re, smtplib, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.mime.text import MIMEText
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import requests
+
+BRIEF_WORKERS = max(1, int(os.getenv("BRIEF_WORKERS", "4")))  # briefs fetched and completed at once
+BRIEF_LLM = os.getenv("BRIEF_LLM", "openai").lower()  # "openai", or "stub" for an offline deterministic answer
+BRIEF_CACHE = os.getenv("BRIEF_CACHE", "1").lower() not in ("0", "false", "no")
+BRIEF_CACHE_DIR = os.getenv("BRIEF_CACHE_DIR", os.path.join(os.getenv("DATA_DIR", "server/data"), "brief_cache"))
+BRIEF_CACHE_DAYS = float(os.getenv("BRIEF_CACHE_DAYS", "30"))  # completions unused for longer are pruned
+BRIEF_DRY_RUN = os.getenv("BRIEF_DRY_RUN", "0").lower() not in ("0", "false", "no", "")
+FETCH_TIMEOUT = float(os.getenv("BRIEF_FETCH_TIMEOUT", "20"))
+LLM_TIMEOUT = float(os.getenv("BRIEF_LLM_TIMEOUT", "60"))
+LLM_RETRIES = int(os.getenv("BRIEF_LLM_RETRIES", "3"))  # retries of a 429 or 5xx completion
+OPENAI_URL = os.getenv("OPENAI_URL", "https://api.openai.com/v1/chat/completions")
+BRIEF_STATE_DIR = os.getenv("BRIEF_STATE_DIR", os.path.join(os.getenv("DATA_DIR", "server/data"), "brief_state"))
+BRIEF_TOKEN_BUDGET = int(os.getenv("BRIEF_TOKEN_BUDGET", "2500"))  # per completion: system + prompt + output
+BRIEF_MAX_OUTPUT_TOKENS = int(os.getenv("BRIEF_MAX_OUTPUT_TOKENS", "700"))
+BRIEF_HISTORY = int(os.getenv("BRIEF_HISTORY", "90"))  # runs of token/cost history kept per brief
+
+# USD per million (prompt, completion) tokens
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+# Same SMTP settings as scripts/send_ceo_autonomy_checklist.py
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.complianceworxs.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("ComplianceWorxs_EMAIL", "")
+SMTP_PASSWORD = os.getenv("ComplianceWorxs_EMAIL_PASSWORD", "")
+SENDER_EMAIL = os.getenv("SENDER_EMAIL", "chief-of-staff@complianceworxs.ai")
+SENDER_NAME = os.getenv("SENDER_NAME", "ComplianceWorxs Chief of Staff AI")
+
+EST = ZoneInfo("America/New_York")
+_STAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2} E[SD]T")  # what now_est_str() produces
+
+
+def now_est_str() -> str:
+    return datetime.now(EST).strftime("%Y-%m-%d %H:%M %Z")
+
+
+# ----- fetch ---------------------------------------------------------------------
+
+def fetch_report(url_env: str, file_fallback: Optional[str], fallback_skeleton: str) -> Tuple[str, str]:
+    """(report text, where it came from: "url", "file" or "skeleton")."""
+    url = os.getenv(url_env, "")
+    if url:
+        try:
+            resp = requests.get(url, timeout=FETCH_TIMEOUT)
+            resp.raise_for_status()
+            if resp.text.strip():
+                return resp.text.strip(), "url"
+        except requests.RequestException as e:
+            print(f"⚠️  {url_env} fetch failed ({e}); using fallback")
+    if file_fallback and os.path.exists(file_fallback):
+        with open(file_fallback, "r", encoding="utf-8") as f:
+            text = f.read().strip()
+        if text:
+            return text, "file"
+    return fallback_skeleton, "skeleton"
+
+
+# ----- completion cache ----------------------------------------------------------
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _mask(text: str) -> str:
+    return _STAMP_RE.sub("<now>", text)
+
+
+def cache_key(model: str, system_msg: str, user_prefix: str, body: str) -> str:
+    """Completion cache key for a prompt of `user_prefix` plus `body`. Stamps from now_est_str()
+    are masked, so the same report fetched at another time still hits; BRIEF_LLM is part of it
+    so stub answers never stand in for real ones."""
+    return _sha("|".join([BRIEF_LLM, model, _sha(system_msg), _sha(user_prefix), _sha(_mask(body))]))
+
+
+class CompletionCache:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(self._path(key))  # last used, for prune
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(path + ".tmp", path)
+
+    def prune(self, max_age_days: float) -> int:
+        cutoff, removed = time.time() - max_age_days * 86400, 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+# ----- prompt --------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d{1,3}|\s+|[\x21-\x7e]|[^\x00-\x7f]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate shaped like a BPE tokenizer: a word per token (two past eight
+    letters), numbers in groups of three digits, a token per punctuation mark or line break,
+    and non-ASCII characters (bullets, dashes, emoji) by their UTF-8 length. Spaces join the
+    following word. Good enough for budgeting without a tokenizer dependency."""
+    n = 0
+    for m in _TOKEN_RE.finditer(text):
+        piece = m.group()
+        if piece[0].isalpha() and piece.isascii():
+            n += (len(piece) + 7) // 8
+        elif piece[0].isspace():
+            n += "\n" in piece
+        elif piece.isascii():
+            n += 1
+        else:
+            n += max(1, len(piece.encode("utf-8")) // 2)
+    return n
+
+
+def split_sections(report: str) -> List[Tuple[str, List[str]]]:
+    """(heading line as written, e.g. "### Risks", non-blank lines) in report order; lines
+    before the first heading get heading ""."""
+    sections: List[Tuple[str, List[str]]] = []
+    heading, lines = "", []
+    for line in report.splitlines():
+        if line.lstrip().startswith("#"):
+            if heading or lines:
+                sections.append((heading, lines))
+            heading, lines = line.strip(), []
+        elif line.strip():
+            lines.append(line.rstrip())
+    if heading or lines:
+        sections.append((heading, lines))
+    return sections
+
+
+def _title(heading: str) -> str:
+    return heading.lstrip("#").strip() or "Preamble"
+
+
+def _line_key(line: str) -> str:
+    """"MTTR: 4.3min (target: <5min)" -> "mttr", so a KPI can be matched across reports."""
+    return line.split(":", 1)[0].strip().lower()
+
+
+def _diff_lines(lines: List[str], before: List[str]) -> List[Tuple[str, bool]]:
+    """(line, changed) for a section, with a changed KPI annotated with its previous value
+    and lines that disappeared listed as removed."""
+    old = {_mask(l) for l in before}
+    by_key = {_line_key(l): l for l in before if ":" in l}
+    out, matched = [], set()
+    for line in lines:
+        if _mask(line) in old:
+            out.append((line, False))
+            matched.add(_mask(line))
+            continue
+        prev = by_key.get(_line_key(line)) if ":" in line else None
+        if prev is not None:
+            matched.add(_mask(prev))
+            out.append((f"{line}  [was: {prev.split(':', 1)[1].strip()}]", True))
+        else:
+            out.append((f"{line}  [new]", True))
+    out += [(f"[removed] {l}", True) for l in before if _mask(l) not in matched]
+    return out
+
+
+def _render(blocks: List[List[Any]], tail: List[str], head: str = "") -> str:
+    """Prompt text of `head`, [heading, [(line, changed)], unchanged lines left out] blocks and tail lines."""
+    parts = ["\n".join(([h] if h else []) + [line for line, _ in lines]
+                       + ([f"({skipped} unchanged lines)"] if skipped else [])) for h, lines, skipped in blocks]
+    return "\n\n".join([p for p in [head] + parts if p] + [t for t in tail if t])
+
+
+def _fit(blocks: List[List[Any]], notes: List[Tuple[str, str]], tail: List[str],
+         max_tokens: int) -> Tuple[str, int, int]:
+    """Leave lines out of a prompt until it estimates within `max_tokens`, least useful first:
+    the notes around the sections (each (head, summary) of `notes` in turn), then unchanged
+    lines, and only then changed lines, both from the end. Returns the body and how many
+    unchanged and changed lines were left out."""
+    skipped = dropped = 0
+
+    def render(head: str, summary: str) -> str:
+        note = [f"({dropped} more lines left out for the token budget)"] if dropped else []
+        return _render(blocks, [summary] + tail + note, head)
+
+    for head, summary in notes:
+        body = render(head, summary)
+        if estimate_tokens(body) <= max_tokens:
+            return body, 0, 0
+    for block in list(reversed(blocks)):
+        lines = block[1]
+        while estimate_tokens(body) > max_tokens:
+            i = next((i for i in range(len(lines) - 1, -1, -1) if not lines[i][1]), None)
+            if i is None:
+                break
+            del lines[i]
+            block[2] += 1
+            skipped += 1
+            if not lines:  # nothing of the section is left to show
+                blocks.remove(block)
+            body = render(head, summary)
+    while estimate_tokens(body) > max_tokens and blocks:
+        if blocks[-1][1]:
+            blocks[-1][1].pop()
+            dropped += 1
+        if not blocks[-1][1]:
+            blocks.pop()
+        body = render(head, summary)
+    return body, skipped, dropped
+
+
+def build_prompt(report: str, previous: Optional[str] = None, sent_at: Optional[str] = None,
+                 max_tokens: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """The prompt body sent after a brief's user prefix, and what went into it.
+
+    Without a `previous` report (or when it equals `report` apart from timestamps) the body
+    is the whole report. Otherwise it is the shorter of the whole report and a delta: the
+    sections that differ from `previous`, with "[was: ...]" on changed values, and the names
+    of the unchanged ones. Over `max_tokens`, both are cut down by _fit, and the one that
+    leaves out the fewest changed lines, then unchanged ones, is sent."""
+    sections = split_sections(report)
+    changed = previous is not None and _mask(previous) != _mask(report)
+    old = {_mask(h): (h, lines) for h, lines in split_sections(previous)} if changed else {}
+    # the whole report, with each line marked changed unless `previous` had it in that section
+    had = {key: {_mask(l) for l in lines} for key, (_, lines) in old.items()}
+    full = [[h, [(l, _mask(l) not in had.get(_mask(h), ())) for l in lines], 0] for h, lines in sections]
+    full_tokens = estimate_tokens(_render(full, []))
+    options = [("full", full, len(sections), [("", "")], [])]
+    if changed:
+        since = f" ({sent_at})" if sent_at else ""
+        delta, unchanged = [], []
+        for heading, lines in sections:
+            before = old.pop(_mask(heading), (None, None))[1]
+            if before is not None and [_mask(l) for l in before] == [_mask(l) for l in lines]:
+                if lines:
+                    unchanged.append(_title(heading))
+                continue
+            delta.append([heading if before is not None else f"{heading} [new section]" if heading else "[new section]",
+                          _diff_lines(lines, before or []), 0])
+        removed = [_title(h) for h, _ in old.values() if h]
+        intro = (f"Only what changed since the last brief{since} is shown in full; "
+                 "\"[was: ...]\" gives the previous value.")
+        summaries = [f"Unchanged since the last brief{since}: {', '.join(unchanged)}.",
+                     f"{len(unchanged)} other sections unchanged."] if unchanged else []
+        options.append(("delta", delta, len(delta), [(intro, s) for s in summaries + [""]] + [("", "")],
+                        [f"Sections removed since the last brief: {', '.join(removed)}." if removed else ""]))
+    best = None
+    for mode, blocks, changed_sections, notes, tail in options:
+        if max_tokens is None:
+            body, skipped, dropped = _render(blocks, [notes[0][1]] + tail, notes[0][0]), 0, 0
+        else:
+            body, skipped, dropped = _fit(blocks, notes, tail, max_tokens)
+        rank = (dropped, skipped, estimate_tokens(body))
+        if best is None or rank < best[0]:
+            best = (rank, body, {"mode": mode, "sections": len(sections), "changed_sections": changed_sections,
+                                 "full_tokens": full_tokens, "omitted_lines": skipped + dropped})
+    _, body, info = best
+    info["tokens"] = estimate_tokens(body)
+    return body, info
+
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Price of a completion from PRICES; None for a model not listed there."""
+    price = PRICES.get(model)
+    if price is None:
+        return None
+    return round((prompt_tokens * price[0] + completion_tokens * price[1]) / 1e6, 6)
+
+
+# ----- state ---------------------------------------------------------------------
+
+def _state_path(name: str) -> str:
+    return os.path.join(BRIEF_STATE_DIR, re.sub(r"[^A-Za-z0-9_-]+", "_", name) + ".json")
+
+
+def load_state(name: str) -> Dict[str, Any]:
+    """A brief's last sent report ("report", "sent_at", "key" of its completion) and "history"."""
+    try:
+        with open(_state_path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"history": []}
+
+
+def save_state(name: str, state: Dict[str, Any]):
+    os.makedirs(BRIEF_STATE_DIR, exist_ok=True)
+    path = _state_path(name)
+    state["history"] = state.get("history", [])[-BRIEF_HISTORY:]
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def token_spend(day: Optional[str] = None) -> Dict[str, Any]:
+    """Tokens and USD spent on brief completions on `day` (ISO date, default today, EST),
+    in total and per brief."""
+    day = day or datetime.now(EST).date().isoformat()
+    out = {"day": day, "tokens": 0, "cost_usd": 0.0, "briefs": {}}
+    if not os.path.isdir(BRIEF_STATE_DIR):
+        return out
+    for fname in sorted(os.listdir(BRIEF_STATE_DIR)):
+        if not fname.endswith(".json"):
+            continue
+        with open(os.path.join(BRIEF_STATE_DIR, fname), "r", encoding="utf-8") as f:
+            runs = [r for r in json.load(f).get("history", []) if r["at"].startswith(day)]
+        if runs:
+            tokens = sum(r["prompt_tokens"] + r["completion_tokens"] for r in runs)
+            cost = round(sum(r["cost_usd"] or 0.0 for r in runs), 6)
+            out["briefs"][fname[:-5]] = {"runs": len(runs), "tokens": tokens, "cost_usd": cost}
+            out["tokens"] += tokens
+            out["cost_usd"] = round(out["cost_usd"] + cost, 6)
+    return out
+
+
+# ----- LLM -----------------------------------------------------------------------
+
+def _openai_completion(model: str, system_msg: str, prompt: str, api_key: str, max_tokens: int) -> Dict[str, Any]:
+    body = {"model": model, "temperature": 0.2, "max_tokens": max_tokens,
+            "messages": [{"role": "system", "content": system_msg}, {"role": "user", "content": prompt}]}
+    for attempt in range(LLM_RETRIES + 1):
+        resp = requests.post(OPENAI_URL, json=body, timeout=LLM_TIMEOUT,
+                             headers={"Authorization": f"Bearer {api_key}"})
+        if resp.status_code in (429, 500, 502, 503, 504) and attempt < LLM_RETRIES:
+            delay = float(resp.headers.get("retry-after") or 2 ** attempt)
+            print(f"⏳ OpenAI {resp.status_code}, retry {attempt + 1}/{LLM_RETRIES} in {delay:.0f}s")
+            time.sleep(delay)
+            continue
+        resp.raise_for_status()
+        data = resp.json()
+        usage = data.get("usage", {})
+        return {"text": data["choices"][0]["message"]["content"].strip(),
+                "usage": {"prompt_tokens": usage.get("prompt_tokens", 0),
+                          "completion_tokens": usage.get("completion_tokens", 0)}}
+
+
+def _stub_completion(model: str, system_msg: str, prompt: str) -> Dict[str, Any]:
+    """Deterministic offline answer: one line per section the prompt asks for, plus a digest
+    of the prompt so different inputs give visibly different commentary."""
+    sections = [m.group(1).strip() for m in re.finditer(r"^•\s*([^(\n]+)", prompt, re.M)] or ["Commentary"]
+    digest = _sha(prompt)[:8]
+    text = "\n".join(f"• {s}: stub commentary ({model}, input {digest})" for s in sections)
+    return {"text": text, "usage": {"prompt_tokens": estimate_tokens(system_msg + prompt),
+                                    "completion_tokens": estimate_tokens(text)}}
+
+
+def complete(model: str, system_msg: str, prompt: str, api_key: Optional[str],
+             max_tokens: int = BRIEF_MAX_OUTPUT_TOKENS) -> Dict[str, Any]:
+    """{"text", "usage": {"prompt_tokens", "completion_tokens"}} from BRIEF_LLM."""
+    if BRIEF_LLM == "stub":
+        return _stub_completion(model, system_msg, prompt)
+    if not api_key:
+        raise RuntimeError("no OpenAI API key configured")
+    return _openai_completion(model, system_msg, prompt, api_key, max_tokens)
+
+
+# ----- email ---------------------------------------------------------------------
+
+def send_email(subject: str, body: str, to_env: str) -> bool:
+    recipients = [r.strip() for r in os.getenv(to_env, "").split(",") if r.strip()]
+    if BRIEF_DRY_RUN:
+        print(f"✉️  [dry run] {subject} → {', '.join(recipients) or to_env + ' (unset)'}\n\n{body}\n")
+        return True
+    if not recipients:
+        print(f"❌ No recipients configured. Set {to_env}.")
+        return False
+    if not SMTP_USER or not SMTP_PASSWORD:
+        print("❌ SMTP credentials not configured. Set ComplianceWorxs_EMAIL and ComplianceWorxs_EMAIL_PASSWORD.")
+        return False
+    msg = MIMEText(body, "plain", "utf-8")
+    msg["Subject"] = subject
+    msg["From"] = f"{SENDER_NAME} <{SENDER_EMAIL}>"
+    msg["To"] = ", ".join(recipients)
+    try:
+        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
+            server.starttls()
+            server.login(SMTP_USER, SMTP_PASSWORD)
+            server.send_message(msg)
+    except (OSError, smtplib.SMTPException) as e:
+        print(f"❌ Failed to send {subject}: {e}")
+        return False
+    print(f"✅ Sent {subject} to {len(recipients)} recipients")
+    return True
+
+
+# ----- briefs --------------------------------------------------------------------
+
+def _new_result(name: str) -> Dict[str, Any]:
+    return {"name": name, "ok": True, "source": None, "cached": False, "prompt": None,
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}, "sent": False, "errors": []}
+
+
+def _prepare(brief: Dict[str, Any], cache: Optional[CompletionCache]) -> Dict[str, Any]:
+    """Fetch and complete one brief; returns its result so far plus the email to send."""
+    name = brief.get("name") or brief["subject_prefix"]
+    model = brief["model"]
+    result = _new_result(name)
+    started = time.perf_counter()
+    report, result["source"] = fetch_report(brief["url_env"], brief.get("file_fallback"), brief["fallback_skeleton"])
+    state = load_state(name)
+    entry, key = None, None
+    try:
+        if cache and state.get("key") and _mask(state.get("report", "")) == _mask(report):
+            key = state["key"]  # same report as last sent: same commentary
+            entry = cache.get(key)
+            result["cached"] = entry is not None
+        if entry is None:
+            max_output = brief.get("max_output_tokens") or BRIEF_MAX_OUTPUT_TOKENS
+            room = ((brief.get("token_budget") or BRIEF_TOKEN_BUDGET) - max_output
+                    - estimate_tokens(brief["system_msg"]) - estimate_tokens(brief["user_prefix"]) - 2)
+            if room <= 0:
+                raise RuntimeError("token budget leaves no room for the report")
+            body, result["prompt"] = build_prompt(report, state.get("report"), state.get("sent_at"), room)
+            key = cache_key(model, brief["system_msg"], brief["user_prefix"], body)
+            entry = cache.get(key) if cache else None
+            result["cached"] = entry is not None
+            if entry is None:
+                entry = complete(model, brief["system_msg"], f"{brief['user_prefix']}\n\n{body}",
+                                 os.getenv(brief["openai_api_key_env"]), max_output)
+                usage = entry["usage"]
+                result["usage"] = {**usage, "cost_usd": cost_usd(model, usage["prompt_tokens"], usage["completion_tokens"])}
+                if cache:
+                    try:
+                        cache.put(key, {**entry, "model": model, "created_at": datetime.now(EST).isoformat()})
+                    except OSError as e:  # the completion is paid for: send it uncached
+                        print(f"⚠️  {name}: completion not cached ({e})")
+    except (requests.RequestException, RuntimeError, KeyError, ValueError) as e:
+        print(f"⚠️  {name}: commentary unavailable ({e}); sending the report alone")
+        entry, key = None, None
+        result["ok"] = False
+        result["errors"].append(f"completion failed: {e}")
+    commentary = entry["text"] if entry else ""
+    result["body"] = f"{commentary}\n\n---\n\n{report}" if commentary else report
+    result["subject"] = f"{brief['subject_prefix']} — {now_est_str()}"
+    result["report"], result["key"], result["state"] = report, key, state
+    result["wall_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def _prepare_or_fail(brief: Dict[str, Any], cache: Optional[CompletionCache]) -> Dict[str, Any]:
+    """_prepare, or for a brief it raised on (e.g. an unreadable file_fallback) a failed result
+    with nothing to send, so the briefs around it still go out."""
+    try:
+        return _prepare(brief, cache)
+    except Exception as e:
+        name = brief.get("name") or brief.get("subject_prefix") or "brief"
+        print(f"❌ {name}: brief failed ({e!r})")
+        result = _new_result(name)
+        result.update(ok=False, errors=[f"brief failed: {e!r}"], subject=None, body=None, report=None, key=None,
+                      state=None, wall_ms=0.0)
+        return result
+
+
+def _record(result: Dict[str, Any]):
+    """Add a run to its brief's history; a sent report also becomes the next delta's baseline."""
+    state, report, key = result.pop("state"), result.pop("report"), result.pop("key")
+    if state is None:  # the brief failed before its state was loaded
+        return
+    if result["sent"] and key:
+        state.update(report=report, sent_at=now_est_str(), key=key)
+    prompt = result["prompt"] or {}
+    state.setdefault("history", []).append({
+        "at": datetime.now(EST).isoformat(timespec="seconds"), "sent": result["sent"], "cached": result["cached"],
+        "mode": prompt.get("mode"), "estimated_tokens": prompt.get("tokens"), "full_tokens": prompt.get("full_tokens"),
+        **result["usage"]})
+    save_state(result["name"], state)
+
+
+def run_briefs(briefs: Sequence[Dict[str, Any]], workers: int = BRIEF_WORKERS) -> List[Dict[str, Any]]:
+    """Fetch and complete `briefs` concurrently on at most `workers` threads, then email them in
+    the given order. Returns one result per brief: name, ok, source, cached, prompt (how it was
+    compacted), usage (tokens and cost_usd), sent, wall_ms and errors. One brief failing does
+    not stop the others."""
+    cache = None
+    if BRIEF_CACHE:
+        try:
+            cache = CompletionCache(BRIEF_CACHE_DIR)
+            cache.prune(BRIEF_CACHE_DAYS)
+        except OSError as e:
+            print(f"⚠️  Completion cache unavailable ({e}); running uncached")
+            cache = None
+    with ThreadPoolExecutor(max_workers=min(workers, len(briefs)) or 1, thread_name_prefix="brief") as pool:
+        prepared = list(pool.map(lambda b: _prepare_or_fail(b, cache), briefs))
+    results = []
+    for brief, result in zip(briefs, prepared):
+        subject, body = result.pop("subject"), result.pop("body")
+        if body is not None:
+            result["sent"] = send_email(subject, body, brief["to_env"])
+            if not result["sent"]:
+                result["ok"] = False
+                result["errors"].append("email not sent")
+        try:
+            _record(result)
+        except OSError as e:
+            result["ok"] = False
+            result["errors"].append(f"history not saved: {e}")
+        usage, prompt = result["usage"], result["prompt"] or {}
+        spent = (f"{usage['prompt_tokens'] + usage['completion_tokens']} tokens"
+                 + (f" (${usage['cost_usd']:.4f})" if usage["cost_usd"] is not None else ""))
+        shape = f", {prompt['mode']} prompt {prompt['tokens']}/{prompt['full_tokens']} est. tokens" if prompt else ""
+        print(f"{'✅' if result['ok'] else '❌'} {result['name']}: {result['source'] or 'no'} report{shape}, "
+              f"{'cached commentary' if result['cached'] else spent}, {result['wall_ms']:.0f}ms")
+        results.append(result)
+    return results
+
+
+def run_brief(url_env: str, file_fallback: Optional[str], fallback_skeleton: str, openai_api_key_env: str,
+              model: str, system_msg: str, user_prefix: str, subject_prefix: str, to_env: str,
+              name: Optional[str] = None, token_budget: Optional[int] = None,
+              max_output_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """Run a single brief (see run_briefs); returns its result."""
+    brief = {"url_env": url_env, "file_fallback": file_fallback, "fallback_skeleton": fallback_skeleton,
+             "openai_api_key_env": openai_api_key_env, "model": model, "system_msg": system_msg,
+             "user_prefix": user_prefix, "subject_prefix": subject_prefix, "to_env": to_env, "name": name,
+             "token_budget": token_budget, "max_output_tokens": max_output_tokens}
+    return run_briefs([brief], workers=1)[0]
+
+
+if __name__ == "__main__":
+    # python brief_utils.py MODULE [MODULE ...]: run each module's BRIEF together
+    modules = sys.argv[1:]
+    if not modules:
+        sys.exit("usage: brief_utils.py BRIEF_MODULE [BRIEF_MODULE ...]")
+    results = run_briefs([importlib.import_module(m).BRIEF for m in modules])
+    print(json.dumps({"briefs": results, "spend_today": token_spend()}, indent=2))
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
@@ -53,15 +53,18 @@ USER_PREFIX = (
     "Connect every operational metric to business impact. Example: 'MTTR increase of 2min = potential $120/day revenue loss from delayed briefs'"
 )
 
+BRIEF = dict(
+    name="coo",
+    url_env="AGENT_COO_URL",
+    file_fallback="coo_brief_enhanced.txt",
+    fallback_skeleton=FALLBACK,
+    openai_api_key_env="OPENAI_API_KEY",
+    model="gpt-4o-mini",
+    system_msg=SYSTEM_MSG,
+    user_prefix=USER_PREFIX,
+    subject_prefix="COO Ops Intelligence",
+    to_env="TO_EMAILS_COO",
+)
+
 if __name__ == "__main__":
-    run_brief(
-        url_env="AGENT_COO_URL",
-        file_fallback="coo_brief_enhanced.txt",
-        fallback_skeleton=FALLBACK,
-        openai_api_key_env="OPENAI_API_KEY",
-        model="gpt-4o-mini",
-        system_msg=SYSTEM_MSG,
-        user_prefix=USER_PREFIX,
-        subject_prefix="COO Ops Intelligence",
-        to_env="TO_EMAILS_COO",
-    )
\ No newline at end of file
+    run_brief(**BRIEF)
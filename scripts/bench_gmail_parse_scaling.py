@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Parse/map scaling benchmark for gmail-pull's GMAIL_PARSE_PROCS process pool.
+
+Pre-generates `messages` SyntheticCorpus messages (server/services/gmail_fake.py) so fetch
+cost is out of the picture, then runs them through the in-process loop and through
+_process_in_pool with 1, 2, 4 ... cpu_count workers, checking every run maps to the same
+outputs. Reports messages/sec and speedup over the in-process loop.
+
+    python scripts/bench_gmail_parse_scaling.py [--messages 2000] [--procs 1,2,4] [--seed 0]
+"""
+import argparse, contextlib, importlib.util, io, os, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = os.path.join(ROOT, "server", "services")
+sys.path.insert(0, SERVICES)
+
+spec = importlib.util.spec_from_file_location("gmail_pull", os.path.join(SERVICES, "gmail-pull.py"))
+gp = importlib.util.module_from_spec(spec)
+sys.modules["gmail_pull"] = gp  # pool workers unpickle tasks by module name
+spec.loader.exec_module(gp)
+gp.MEMO = False  # measure parsing and mapping, not memo hits from the previous run
+from gmail_fake import SyntheticCorpus
+
+VOLATILE = {"timestamp", "date", "due"}
+
+
+def default_procs() -> str:
+    cpus, n, out = os.cpu_count() or 1, 1, []
+    while n < cpus:
+        out.append(n)
+        n *= 2
+    return ",".join(map(str, out + [cpus]))
+
+
+def run_loop(msgs):
+    collected = gp._collected()
+    gp._new_report()
+    for m, routes in msgs:
+        gp._process_message(m, routes, collected)
+    return collected
+
+
+def run_pool(msgs, procs: int):
+    gp.PARSE_PROCS, gp.PARSE_WINDOW = procs, 4 * procs
+    collected = gp._collected()
+    gp._new_report()
+    gp._process_in_pool(msgs, collected, None)
+    return collected
+
+
+def stable(obj):
+    """Outputs minus the wall-clock stamps mappers add, for comparing runs."""
+    if isinstance(obj, dict):
+        return {k: stable(v) for k, v in obj.items() if k not in VOLATILE}
+    if isinstance(obj, list):
+        return [stable(v) for v in obj]
+    return obj
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        collected = fn(*args)
+    return time.perf_counter() - started, stable(collected)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=2000)
+    ap.add_argument("--procs", default=default_procs(), help="comma-separated worker counts")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    corpus = SyntheticCorpus(args.messages, seed=args.seed)
+    msgs = [(m, gp._route(gp._headers(m))) for m in corpus]
+    print(f"{args.messages} messages, {os.cpu_count()} CPUs")
+
+    base, expected = timed(run_loop, msgs)
+    print(f"{'in-process':>10} {args.messages / base:>9.1f} msgs/s {base:>7.2f} s   1.00x")
+    for procs in (int(p) for p in args.procs.split(",")):
+        wall, got = timed(run_pool, msgs, procs)
+        if got != expected:
+            sys.exit(f"{procs} workers produced different outputs than the in-process loop")
+        print(f"{procs:>4} procs {args.messages / wall:>9.1f} msgs/s {wall:>7.2f} s {base / wall:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for gmail-pull's pull_and_write.
+
+Each size runs in a fresh process against a FakeGmailService serving a SyntheticCorpus
+(server/services/gmail_fake.py) with `latency` seconds per HTTP round-trip, writing into a
+throwaway DATA_DIR. Reports messages/sec, peak RSS and the run report's per-stage wall time.
+Calls are unpaced unless --quota sets GMAIL_QUOTA_UNITS, so the numbers measure the pipeline
+rather than Gmail's per-user rate limit.
+
+    python scripts/bench_gmail_pull.py [--sizes 10,1000,100000] [--latency 0.005] [--pipeline sync|async] [--procs N] [--quota UNITS] [--json]
+"""
+import argparse, importlib.util, io, json, os, resource, subprocess, sys, tempfile, time, contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = os.path.join(ROOT, "server", "services")
+STAGES = ("auth", "list", "fetch", "parse", "map", "write")
+
+
+def run_child(n: int, latency: float, seed: int) -> dict:
+    """Runs inside the per-size subprocess; DATA_DIR is already pointed at a temp dir."""
+    sys.path.insert(0, SERVICES)
+    spec = importlib.util.spec_from_file_location("gmail_pull", os.path.join(SERVICES, "gmail-pull.py"))
+    gp = importlib.util.module_from_spec(spec)
+    sys.modules["gmail_pull"] = gp  # GMAIL_PARSE_PROCS workers unpickle tasks by module name
+    spec.loader.exec_module(gp)
+    from gmail_fake import FakeGmailService, SyntheticCorpus
+
+    svc = FakeGmailService(SyntheticCorpus(n, seed=seed), latency=latency)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = gp.pull_and_write(svc)
+    wall = time.perf_counter() - started
+    return {
+        "messages": n,
+        "processed": report["messages_processed"],
+        "wall_s": round(wall, 3),
+        "msgs_per_sec": round(report["messages_processed"] / wall, 1) if wall else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "rss_before_mb": round(rss_before / 1024, 1),
+        "round_trips": svc.round_trips,
+        "stages_ms": {name: report["stages"][name]["wall_ms"] for name in STAGES},
+        "pipeline": os.getenv("GMAIL_PIPELINE", "sync"),
+        "parse_procs": gp.PARSE_PROCS,
+        "ok": report["ok"],
+    }
+
+
+def run_size(n: int, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="gmail-bench-") as data_dir:
+        env = {**os.environ, "DATA_DIR": data_dir, "GMAIL_METRICS_FILE": os.path.join(data_dir, "m.prom"),
+               "GMAIL_PIPELINE": args.pipeline, "GMAIL_PARSE_PROCS": args.procs, "GMAIL_QUOTA_UNITS": args.quota}
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", str(n), "--latency", str(args.latency), "--seed", str(args.seed)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="10,1000,100000", help="comma-separated corpus sizes")
+    ap.add_argument("--latency", type=float, default=0.005, help="seconds per fake HTTP round-trip")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--pipeline", choices=("sync", "async"), default=os.getenv("GMAIL_PIPELINE", "sync"))
+    ap.add_argument("--procs", default=os.getenv("GMAIL_PARSE_PROCS", "0"), help="parse/map worker processes (0, N or auto)")
+    ap.add_argument("--quota", default="0", help="Gmail quota units/sec to pace calls at (0 = unpaced)")
+    ap.add_argument("--json", action="store_true", help="print one JSON result per size instead of a table")
+    ap.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_child(args.child, args.latency, args.seed)))
+        return
+
+    if not args.json:
+        print(f"latency {args.latency * 1000:g} ms/round-trip, seed {args.seed}, {args.pipeline} pipeline, parse procs {args.procs}")
+        print(f"{'messages':>9} {'msgs/s':>9} {'wall s':>8} {'peak MB':>8} {'trips':>6}  "
+              + " ".join(f"{s + ' ms':>9}" for s in STAGES))
+    for n in (int(s) for s in args.sizes.split(",")):
+        r = run_size(n, args)
+        if args.json:
+            print(json.dumps(r))
+            continue
+        print(f"{r['messages']:>9} {r['msgs_per_sec']:>9} {r['wall_s']:>8} {r['peak_rss_mb']:>8} {r['round_trips']:>6}  "
+              + " ".join(f"{r['stages_ms'][s]:>9.0f}" for s in STAGES))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import type { Express } from "express";
 import { createServer, type Server } from "http";
 import path from "path";
 import { storage } from "./storage";
+import { LOGGED_COLLECTIONS, readCollection } from "./services/data-collections";
 import { agentMonitor } from "./services/agent-monitor";
 import { conflictResolver } from "./services/conflict-resolver";
 import { reportGenerator } from "./services/report-generator";
@@ -3514,13 +3515,17 @@ Provide your analysis as a structured JSON response with:
       
       for (const file of files) {
         try {
-          const content = await fs.readFile(path.join(dataPath, file), "utf-8");
-          const data = JSON.parse(content);
+          const name = file.replace('.json', '');
+          const data = await readCollection(dataPath, name);
+          // a logged collection's items are split between the .json snapshot and its .jsonl tail
+          const parts = LOGGED_COLLECTIONS.includes(name) ? [file, `${name}.jsonl`] : [file];
+          const stats = (await Promise.all(parts.map((f) => fs.stat(path.join(dataPath, f)).catch(() => null))))
+            .filter((s): s is NonNullable<typeof s> => s !== null);
           status[file] = {
             exists: true,
-            size: content.length,
+            size: stats.reduce((n, s) => n + s.size, 0),
             records: Array.isArray(data) ? data.length : 1,
-            last_updated: (await fs.stat(path.join(dataPath, file))).mtime
+            last_updated: stats.length ? new Date(Math.max(...stats.map((s) => s.mtime.getTime()))) : null
           };
         } catch {
           status[file] = { exists: false };
@@ -7,6 +7,7 @@ import { COODataSanityCheck } from "./coo-data-sanity-check";
 import { AgentBriefingSystem } from "./agent-briefing-system";
 import { ContinuousOptimizationSystem } from "./continuous-optimization-system";
 import { storage } from "../storage";
+import { readCollection } from "./data-collections";
 import fs from "fs/promises";
 import path from "path";
 
@@ -435,9 +436,7 @@ export class DailyOrchestrator {
     
     for (const file of [...requiredFiles, ...optionalFiles]) {
       try {
-        const filePath = path.join(dataPath, file);
-        const content = await fs.readFile(filePath, "utf-8");
-        JSON.parse(content); // Validate JSON format
+        await readCollection(dataPath, file.replace('.json', '')); // Validate JSON format
         availableSources.push(file.replace('.json', ''));
         console.log(`✅ ${file}: Available and valid`);
       } catch (error) {
@@ -0,0 +1,69 @@
+import fs from "fs/promises";
+import path from "path";
+
+/**
+ * Collections gmail-pull.py appends to instead of rewriting: each is a compacted
+ * <name>.json array plus a <name>.jsonl tail of items added since the last compaction
+ * (and, while a compaction runs, <name>.jsonl.<n>.compacting).
+ */
+export const LOGGED_COLLECTIONS = ["meetings", "insights", "decisions"];
+
+async function readLog(filePath: string): Promise<any[]> {
+  let content: string;
+  try {
+    content = await fs.readFile(filePath, "utf-8");
+  } catch {
+    return []; // compacted away since the directory was listed
+  }
+  const items: any[] = [];
+  for (const line of content.split("\n")) {
+    if (!line.trim()) continue;
+    try {
+      items.push(JSON.parse(line));
+    } catch {
+      // a torn final line from an interrupted append
+    }
+  }
+  return items;
+}
+
+/**
+ * The items of a collection as the one array its .json file will hold once compacted:
+ * the snapshot followed by any logged items it doesn't have yet (matched by "id").
+ * Files that are not logged collections are read as plain JSON. Throws like
+ * fs.readFile when neither the .json nor a log exists, and on invalid JSON.
+ */
+export async function readCollection(dataPath: string, name: string): Promise<any> {
+  const snapshotPath = path.join(dataPath, `${name}.json`);
+  if (!LOGGED_COLLECTIONS.includes(name)) {
+    return JSON.parse(await fs.readFile(snapshotPath, "utf-8"));
+  }
+
+  let snapshot: any[] | null = null;
+  try {
+    const data = JSON.parse(await fs.readFile(snapshotPath, "utf-8"));
+    snapshot = Array.isArray(data) ? data : [];
+  } catch (error) {
+    if ((error as NodeJS.ErrnoException).code !== "ENOENT") throw error;
+  }
+
+  const entries = await fs.readdir(dataPath).catch(() => [] as string[]);
+  const logs = entries.filter((f) => f.startsWith(`${name}.jsonl.`) && f.endsWith(".compacting")).sort();
+  if (entries.includes(`${name}.jsonl`)) logs.push(`${name}.jsonl`);
+  if (snapshot === null && logs.length === 0) {
+    throw Object.assign(new Error(`ENOENT: no ${name}.json or ${name}.jsonl in ${dataPath}`), { code: "ENOENT" });
+  }
+
+  const items = [...(snapshot ?? [])];
+  const seen = new Set(items.map((i) => i?.id).filter(Boolean));
+  for (const log of logs) {
+    for (const item of await readLog(path.join(dataPath, log))) {
+      if (item?.id) {
+        if (seen.has(item.id)) continue; // merged into the snapshot while we read
+        seen.add(item.id);
+      }
+      items.push(item);
+    }
+  }
+  return items;
+}
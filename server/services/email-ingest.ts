@@ -1,6 +1,7 @@
 import fs from "fs/promises";
 import path from "path";
-import { spawn } from "child_process";
+import readline from "readline";
+import { spawn, type ChildProcessWithoutNullStreams } from "child_process";
 // import { parse as parseHtml } from "node-html-parser"; // TODO: Install package if needed
 
 export interface EmailData {
@@ -11,11 +12,77 @@ export interface EmailData {
   html?: string;
 }
 
+export interface GmailStageTiming {
+  calls: number;
+  wall_ms: number;
+  cpu_ms: number;
+}
+
+/**
+ * Structured summary gmail-pull.py emits for every run
+ */
+export interface GmailRunReport {
+  ok: boolean;
+  started_at: string;
+  finished_at: string;
+  mode: "incremental" | "full" | "multi" | "backfill" | null;
+  messages_processed: number;
+  files_updated: string[];
+  messages: {
+    listed: number;
+    skipped: number;
+    metadata_fetched: number;
+    fetched: number;
+    processed: number;
+    memo_hits: number;
+    deferred: number; // given up on after repeated throttling; picked up by the next run
+    routed: Record<string, number>;
+  };
+  files: Record<string, number>;
+  errors: string[];
+  wall_ms: number;
+  cpu_ms: number;
+  stages: Record<"auth" | "list" | "fetch" | "parse" | "map" | "write", GmailStageTiming>;
+  quota: { units: number; wait_s: number; throttled: number; retries: number };
+  // present when GMAIL_SOURCES configures several mailboxes/labels
+  sources?: Record<string, {
+    ok: boolean;
+    mode: "incremental" | "full" | null;
+    messages_processed: number;
+    wall_ms: number;
+    errors: string[];
+  }>;
+}
+
 export interface GmailPullResult {
   success: boolean;
   messages_processed: number;
   files_updated: string[];
   errors: string[];
+  report?: GmailRunReport;
+}
+
+export interface ScoreboardSeriesQuery {
+  metric: string; // snapshot path, e.g. "revenue.realized_week" or "risk.high"
+  period?: "week" | "month"; // omit for every snapshot
+  agg?: "last" | "mean" | "min" | "max";
+  start?: string; // ISO dates, inclusive
+  end?: string;
+}
+
+export interface ScoreboardSeries {
+  metric: string;
+  period: "week" | "month" | null;
+  agg: "last" | "mean" | "min" | "max" | null;
+  points: [string, number | string | null][]; // [day or period start, value]
+}
+
+interface GmailWorkerReply {
+  id: number | null;
+  ok: boolean;
+  result?: any; // GmailRunReport for "pull", ScoreboardSeries for "series"
+  error?: string;
+  elapsed_ms?: number;
 }
 
 interface ParsedEmailData {
@@ -30,6 +97,9 @@ interface ParsedEmailData {
 export class EmailIngestService {
   private dataPath: string;
   private gmailPullScript: string;
+  private gmailWorker: ChildProcessWithoutNullStreams | null = null;
+  private gmailWorkerSeq = 0;
+  private gmailWorkerPending = new Map<number, (reply: GmailWorkerReply) => void>();
 
   constructor() {
     this.dataPath = path.join(process.cwd(), "server", "data");
@@ -37,9 +107,184 @@ export class EmailIngestService {
   }
 
   /**
-   * Pull emails from Gmail using Python service
+   * Pull emails from Gmail using Python service.
+   * Uses the long-lived gmail-pull worker unless GMAIL_PULL_WORKER=0.
    */
   async pullGmailEmails(): Promise<GmailPullResult> {
+    if (process.env.GMAIL_PULL_WORKER === "0") {
+      return this.pullGmailEmailsOnce();
+    }
+
+    console.log("📧 Starting Gmail email pull (worker)...");
+    const reply = await this.sendGmailWorkerCommand("pull");
+    if (reply.result) {
+      return this.resultFromReport(reply.result);
+    }
+    return {
+      success: false,
+      messages_processed: 0,
+      files_updated: [],
+      errors: [reply.error || "Gmail pull failed"]
+    };
+  }
+
+  private resultFromReport(report: GmailRunReport): GmailPullResult {
+    if (report.ok) {
+      const stages = Object.entries(report.stages)
+        .map(([name, t]) => `${name} ${Math.round(t.wall_ms)}ms`)
+        .join(", ");
+      console.log(`✅ Gmail pull completed: ${report.messages_processed} messages processed in ${Math.round(report.wall_ms)}ms (${stages})`);
+    }
+    return {
+      success: report.ok,
+      messages_processed: report.messages_processed,
+      files_updated: report.files_updated,
+      errors: report.errors,
+      report
+    };
+  }
+
+  /**
+   * Status of the long-lived Gmail worker (starts it if needed)
+   */
+  async getGmailWorkerStatus(): Promise<GmailWorkerReply> {
+    return this.sendGmailWorkerCommand("status");
+  }
+
+  /**
+   * Scoreboard history from the columnar store gmail-pull appends every CEO summary to.
+   * Asks the long-lived worker unless GMAIL_PULL_WORKER=0.
+   */
+  async getScoreboardSeries(query: ScoreboardSeriesQuery): Promise<ScoreboardSeries> {
+    if (process.env.GMAIL_PULL_WORKER === "0") {
+      return this.getScoreboardSeriesOnce(query);
+    }
+
+    const reply = await this.sendGmailWorkerCommand("series", query);
+    if (!reply.ok) {
+      throw new Error(reply.error || "Scoreboard series query failed");
+    }
+    return reply.result;
+  }
+
+  /**
+   * Query the scoreboard history with a one-shot `gmail-pull.py --series` process
+   */
+  private getScoreboardSeriesOnce(query: ScoreboardSeriesQuery): Promise<ScoreboardSeries> {
+    return new Promise((resolve, reject) => {
+      const pythonProcess = spawn("python3", [this.gmailPullScript, "--series", JSON.stringify(query)], {
+        env: { ...process.env, PYTHONPATH: process.cwd() },
+        cwd: process.cwd()
+      });
+
+      let stdout = "";
+      let stderr = "";
+      pythonProcess.stdout.on("data", (data) => {
+        stdout += data.toString();
+      });
+      pythonProcess.stderr.on("data", (data) => {
+        stderr += data.toString();
+      });
+
+      pythonProcess.on("close", (code) => {
+        const line = stdout.trim().split("\n").pop() || "";
+        try {
+          if (code === 0) {
+            resolve(JSON.parse(line));
+            return;
+          }
+        } catch {
+          // fall through to the error below
+        }
+        reject(new Error(stderr.trim() || `Scoreboard series query failed with exit code ${code}`));
+      });
+
+      pythonProcess.on("error", (error) => {
+        reject(new Error(`Failed to start scoreboard series query: ${error.message}`));
+      });
+    });
+  }
+
+  /**
+   * Ask the Gmail worker to exit
+   */
+  async stopGmailWorker(): Promise<void> {
+    if (!this.gmailWorker) return;
+    await this.sendGmailWorkerCommand("shutdown");
+  }
+
+  private ensureGmailWorker(): ChildProcessWithoutNullStreams {
+    if (this.gmailWorker) return this.gmailWorker;
+
+    const worker = spawn("python3", [this.gmailPullScript, "--worker"], {
+      env: { ...process.env, PYTHONPATH: process.cwd() },
+      cwd: process.cwd()
+    });
+
+    // stdout carries one JSON reply per line; progress logs arrive on stderr
+    readline.createInterface({ input: worker.stdout }).on("line", (line) => {
+      let reply: GmailWorkerReply;
+      try {
+        reply = JSON.parse(line);
+      } catch {
+        console.log(line.trim());
+        return;
+      }
+      const resolve = reply.id !== null ? this.gmailWorkerPending.get(reply.id) : undefined;
+      if (resolve) {
+        this.gmailWorkerPending.delete(reply.id as number);
+        resolve(reply);
+      }
+    });
+
+    worker.stderr.on("data", (data) => {
+      console.log(data.toString().trim());
+    });
+
+    const fail = (error: string) => {
+      if (this.gmailWorker === worker) this.gmailWorker = null;
+      this.gmailWorkerPending.forEach((resolve, id) => resolve({ id, ok: false, error }));
+      this.gmailWorkerPending.clear();
+    };
+    worker.on("exit", (code) => fail(`Gmail worker exited with code ${code}`));
+    worker.on("error", (error) => fail(`Failed to start Gmail worker: ${error.message}`));
+    worker.stdin.on("error", (error) => fail(`Gmail worker stdin closed: ${error.message}`));
+
+    this.gmailWorker = worker;
+    return worker;
+  }
+
+  /**
+   * Send one command to the worker. A command it has not answered within
+   * GMAIL_WORKER_TIMEOUT_MS (default 10 minutes for a pull, 30 seconds otherwise) fails,
+   * and the worker is killed so the next command starts a fresh one.
+   */
+  private sendGmailWorkerCommand(
+    cmd: "pull" | "status" | "series" | "shutdown",
+    params: object = {}
+  ): Promise<GmailWorkerReply> {
+    const worker = this.ensureGmailWorker();
+    const id = ++this.gmailWorkerSeq;
+    const timeoutMs = Number(process.env.GMAIL_WORKER_TIMEOUT_MS) || (cmd === "pull" ? 10 * 60 * 1000 : 30 * 1000);
+
+    return new Promise((resolve) => {
+      const timer = setTimeout(() => {
+        this.gmailWorkerPending.delete(id);
+        resolve({ id, ok: false, error: `Gmail worker did not answer "${cmd}" within ${timeoutMs}ms` });
+        worker.kill(); // its exit handler fails any other pending commands
+      }, timeoutMs);
+      this.gmailWorkerPending.set(id, (reply) => {
+        clearTimeout(timer);
+        resolve(reply);
+      });
+      worker.stdin.write(JSON.stringify({ ...params, id, cmd }) + "\n");
+    });
+  }
+
+  /**
+   * Pull emails by spawning a one-shot gmail-pull.py process; its stdout is the JSON run report
+   */
+  private async pullGmailEmailsOnce(): Promise<GmailPullResult> {
     console.log("📧 Starting Gmail email pull...");
     
     return new Promise((resolve) => {
@@ -51,7 +296,7 @@ export class EmailIngestService {
       };
 
       // Execute Python Gmail puller
-      const pythonProcess = spawn("python3", [this.gmailPullScript], {
+      const pythonProcess = spawn("python3", [this.gmailPullScript, "--report"], {
         env: { ...process.env, PYTHONPATH: process.cwd() },
         cwd: process.cwd()
       });
@@ -60,41 +305,28 @@ export class EmailIngestService {
       let stderr = "";
 
       pythonProcess.stdout.on("data", (data) => {
-        const output = data.toString();
-        stdout += output;
-        console.log(output.trim());
+        stdout += data.toString();
       });
 
+      // Progress logs arrive on stderr
       pythonProcess.stderr.on("data", (data) => {
-        const error = data.toString();
-        stderr += error;
-        console.error("Gmail pull error:", error.trim());
+        const output = data.toString();
+        stderr += output;
+        console.log(output.trim());
       });
 
       pythonProcess.on("close", (code) => {
-        if (code === 0) {
-          result.success = true;
-          
-          // Parse output to extract metrics
-          const lines = stdout.split("\n");
-          for (const line of lines) {
-            if (line.includes("Retrieved") && line.includes("messages")) {
-              const match = line.match(/(\d+) messages/);
-              if (match) result.messages_processed = parseInt(match[1]);
-            }
-            if (line.includes("Updated") || line.includes("Added")) {
-              const fileMatch = line.match(/(scoreboard|actions|meetings|insights|decisions)\.json/);
-              if (fileMatch) result.files_updated.push(fileMatch[1]);
-            }
-          }
-          
-          console.log(`✅ Gmail pull completed: ${result.messages_processed} messages processed`);
-        } else {
-          result.success = false;
-          result.errors.push(`Gmail pull failed with exit code ${code}`);
-          if (stderr) result.errors.push(stderr);
+        const reportLine = stdout.trim().split("\n").pop() || "";
+        try {
+          resolve(this.resultFromReport(JSON.parse(reportLine)));
+          return;
+        } catch {
+          // no report: the script died before writing one
         }
 
+        result.success = false;
+        result.errors.push(`Gmail pull failed with exit code ${code}`);
+        if (stderr) result.errors.push(stderr);
         resolve(result);
       });
 
@@ -164,7 +396,9 @@ export class EmailIngestService {
       data_dir: process.env.DATA_DIR || "server/data",
       has_service_account: !!process.env.GSA_JSON,
       has_oauth_config: !!(process.env.OAUTH_CLIENT_ID && process.env.OAUTH_CLIENT_SECRET && process.env.OAUTH_REFRESH_TOKEN),
-      has_impersonation: !!process.env.GMAIL_IMPERSONATE
+      has_impersonation: !!process.env.GMAIL_IMPERSONATE,
+      worker_mode: process.env.GMAIL_PULL_WORKER !== "0",
+      worker_running: !!this.gmailWorker
     };
   }
 
@@ -1,30 +1,42 @@
 # gmail_pull.py
-import os, json, base64, email
+import os, sys, json, base64, email, time, contextlib, copy, hashlib, threading, asyncio, uuid, weakref
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any, Optional
-import re, math
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Deque, Container, Set
+import re, math, bisect, itertools, glob
 
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google.oauth2 import service_account
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 
-from bs4 import BeautifulSoup
 import html2text
 
 # --- Helper functions for robust email parsing ---
+_MONEY_RE = re.compile(r"\$?\s*([0-9][0-9,]*(?:\.\d+)?)")
+_PERCENT_RE = re.compile(r"([+-]?\d+(?:\.\d+)?)\s*%")
+_INT_RE = re.compile(r"([0-9][0-9,]*)")
+_HOURS_RE = re.compile(r"([0-9]+)\s*h", re.I)
+
 def _money(s: str) -> float:
-    m = re.search(r"\$?\s*([0-9][0-9,]*(?:\.\d+)?)", s)
+    m = _MONEY_RE.search(s)
     return float(m.group(1).replace(",", "")) if m else 0.0
 
 def _percent(s: str) -> float:
-    m = re.search(r"([+-]?\d+(?:\.\d+)?)\s*%", s)
+    m = _PERCENT_RE.search(s)
     return float(m.group(1)) if m else 0.0
 
 def _int(s: str) -> int:
-    m = re.search(r"([0-9][0-9,]*)", s)
+    m = _INT_RE.search(s)
     return int(m.group(1).replace(",", "")) if m else 0
 
+def _hours(s: str) -> Optional[int]:
+    m = _HOURS_RE.search(s)
+    return int(m.group(1)) if m else None
+
 def _find_line(text: str, *keywords) -> str:
     """Return the first line containing all keywords (case-insensitive)."""
     for line in text.splitlines():
@@ -62,79 +74,770 @@ def _deep_fill(dst, src):
 DATA_DIR = os.getenv("DATA_DIR", "server/data")
 LABEL = os.getenv("GMAIL_LABEL", "cw/daily-reports")  # set this label in Gmail
 QUERY = os.getenv("GMAIL_QUERY", f'label:"{LABEL}" newer_than:2d')
+INCREMENTAL = os.getenv("GMAIL_INCREMENTAL", "1").lower() not in ("0", "false", "no")
+CURSOR_FILE = "gmail_cursor.json"  # last-seen historyId, relative to DATA_DIR
+LEDGER_FILE = "gmail_processed.json"  # message id -> epoch seconds first processed
+STORE = os.getenv("GMAIL_STORE", "json").lower()  # "json" files, or "sqlite" with JSON exports
+DB_PATH = os.getenv("GMAIL_DB_PATH", os.path.join(DATA_DIR, "gmail.db"))
+COMPACT_LINES = int(os.getenv("GMAIL_COMPACT_LINES", "100"))  # fold a collection log into its .json at this size
+COMPACT_SECONDS = float(os.getenv("GMAIL_COMPACT_SECONDS", "300"))  # ...or once the .json is this stale
+LEDGER_DAYS = float(os.getenv("GMAIL_LEDGER_DAYS", "30"))  # keep well above the query window
+PAGE_SIZE = max(1, min(500, int(os.getenv("GMAIL_PAGE_SIZE", "100"))))  # ids per messages().list page
+TOKEN_CACHE = os.getenv("GMAIL_TOKEN_CACHE", os.path.join(DATA_DIR, ".gmail_tokens.json"))
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+GMAIL_SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
+BODY_MAX_BYTES = int(os.getenv("GMAIL_BODY_MAX_BYTES", str(1024 * 1024)))  # decoded bytes per body part
+METADATA_HEADERS = ["Subject", "From", "To", "Date"]
+FETCH_BATCH = max(1, min(100, int(os.getenv("GMAIL_FETCH_BATCH", "25"))))  # Gmail caps batches at 100 calls
+QUOTA_UNITS = float(os.getenv("GMAIL_QUOTA_UNITS", "250"))  # Gmail quota units/sec to pace each user's calls at (0 = unpaced)
+QUOTA_RETRIES = int(os.getenv("GMAIL_QUOTA_RETRIES", "6"))  # retries of a throttled or 5xx call before giving up on it
+RETRY_BASE_SECONDS = float(os.getenv("GMAIL_RETRY_BASE_SECONDS", "1"))  # first backoff; doubles per retry
+RETRY_MAX_SECONDS = float(os.getenv("GMAIL_RETRY_MAX_SECONDS", "32"))
+ARCHIVE_DIR = os.path.join(DATA_DIR, "inbox", "segments")
+SERIES_DIR = os.path.join(DATA_DIR, "scoreboard_series")  # scoreboard history (gmail_series.py)
+ARCHIVE_SEGMENT_BYTES = int(os.getenv("GMAIL_ARCHIVE_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+ARCHIVE_DAYS = float(os.getenv("GMAIL_ARCHIVE_DAYS", "90"))  # drop archive segments older than this
+METRICS_FILE = os.getenv("GMAIL_METRICS_FILE", os.path.join(DATA_DIR, "gmail_metrics.prom"))  # Prometheus textfile
+METRICS_PORT = int(os.getenv("GMAIL_METRICS_PORT", "0"))  # worker mode: serve /metrics on 127.0.0.1:<port>
+PROFILE = os.getenv("GMAIL_PROFILE", "0").lower() not in ("0", "false", "no", "")  # run each pull under cProfile
+PROFILE_SORT = os.getenv("GMAIL_PROFILE_SORT", "cumulative")
+ROUTES_FILE = os.getenv("GMAIL_ROUTES", os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "config", "gmail-routes.json")))  # see gmail_routing.py
+SOURCES = os.getenv("GMAIL_SOURCES", "")  # JSON list of mailbox/label sources, or a path to one; see _load_sources
+SOURCE_WORKERS = max(1, int(os.getenv("GMAIL_SOURCE_WORKERS", "4")))  # sources pulled at once
+PIPELINE = os.getenv("GMAIL_PIPELINE", "sync").lower()  # "sync" loop, or "async" staged pipeline (_pipeline)
+QUEUE_SIZE = max(1, int(os.getenv("GMAIL_QUEUE_SIZE", str(2 * FETCH_BATCH))))  # messages buffered between stages
+_procs = os.getenv("GMAIL_PARSE_PROCS", "0").lower()
+PARSE_PROCS = (os.cpu_count() or 1) if _procs == "auto" else max(0, int(_procs))  # >0: parse/map in a process pool
+PARSE_WINDOW = 4 * max(1, PARSE_PROCS)  # messages in flight to the pool
+MEMO = os.getenv("GMAIL_MEMO", "1").lower() not in ("0", "false", "no")  # reuse parsed bodies of repeated messages
+MEMO_PATH = os.getenv("GMAIL_MEMO_PATH", os.path.join(DATA_DIR, "gmail_memo.db"))
+MEMO_ENTRIES = int(os.getenv("GMAIL_MEMO_ENTRIES", "5000"))  # least recently used entries beyond this are evicted
+MEMO_BYTES = int(os.getenv("GMAIL_MEMO_BYTES", str(64 * 1024 * 1024)))  # ...and beyond this much stored JSON
+BACKFILL_FILE = "gmail_backfill.json"  # backfill checkpoint, relative to DATA_DIR
+BACKFILL_WINDOW_DAYS = float(os.getenv("GMAIL_BACKFILL_WINDOW_DAYS", "7"))  # days listed per backfill window
+BACKFILL_QUOTA = float(os.getenv("GMAIL_BACKFILL_QUOTA", "100"))  # Gmail quota units/sec (per-user limit is 250)
+BACKFILL_MAX_UNITS = int(os.getenv("GMAIL_BACKFILL_MAX_UNITS", "0"))  # stop, resumably, after this many units; 0 = no cap
 
 def _ensure_dirs():
     os.makedirs(DATA_DIR, exist_ok=True)
     os.makedirs(os.path.join(DATA_DIR, "inbox"), exist_ok=True)
 
 def _save_json(name: str, obj: Any):
+    """Write DATA_DIR/name via a temp file and rename, so readers never see a partial file."""
+    _ensure_dirs()
+    path = os.path.join(DATA_DIR, name)
+    with _timed("save_json"):
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+def _open_archive():
+    """Open the inbox archive (gzip JSONL segments keyed by message id, see gmail_archive.py)."""
+    from gmail_archive import InboxArchive
+    return InboxArchive(ARCHIVE_DIR, segment_bytes=ARCHIVE_SEGMENT_BYTES, retention_days=ARCHIVE_DAYS)
+
+# ----- run report ----------------------------------------------------------------
+# One structured summary per pull: what was listed/fetched/routed, which files changed, errors,
+# and wall/CPU time per stage. Stages interleave (fetching is lazy), so each one is timed
+# around its own calls and summed; they never nest.
+
+STAGES = ("auth", "list", "fetch", "parse", "map", "write")
+
+class _RunReport:
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        self.mode: Optional[str] = None  # "incremental", "full", "multi" or "backfill"
+        self.messages = {"listed": 0, "skipped": 0, "metadata_fetched": 0, "fetched": 0, "processed": 0,
+                         "memo_hits": 0, "deferred": 0, "routed": {}}
+        self.quota = {"units": 0, "wait_s": 0.0, "throttled": 0, "retries": 0}  # Gmail API pacing and retries
+        self.files: Dict[str, int] = {}  # collection -> items written this run
+        self.errors: List[str] = []
+        self.stages = {name: {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0} for name in STAGES}
+        self.sources: Dict[str, Dict[str, Any]] = {}  # per-source summaries of a multi-source pull
+        self.backfill: Optional[Dict[str, Any]] = None  # range and progress of a backfill run
+        self._stopped: Optional[Tuple[float, float]] = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            st = self.stages[name]
+            st["calls"] += 1
+            st["wall_ms"] += (time.perf_counter() - wall) * 1000
+            st["cpu_ms"] += (time.process_time() - cpu) * 1000
+
+    def route(self, routes: List[str]):
+        routed = self.messages["routed"]
+        for r in routes or ["unrouted"]:
+            routed[r] = routed.get(r, 0) + 1
+
+    def stop(self):
+        """Freeze the report's total wall/CPU time (for a source finishing before the run does)."""
+        self._stopped = (time.perf_counter(), time.process_time())
+
+    def add_stages(self, stages: Dict[str, Dict[str, float]]):
+        """Add stage times measured elsewhere (another source's thread, a pool worker)."""
+        for stage, st in stages.items():
+            for k, v in st.items():
+                self.stages[stage][k] += v
+
+    def merge(self, name: str, sub: "_RunReport"):
+        """Fold a source's report into this one. Stage times add up across sources pulled
+        concurrently, so they can exceed the run's wall time."""
+        for key, n in sub.messages.items():
+            if key != "routed":
+                self.messages[key] += n
+        for r, n in sub.messages["routed"].items():
+            self.messages["routed"][r] = self.messages["routed"].get(r, 0) + n
+        self.add_stages(sub.stages)
+        for key, n in sub.quota.items():
+            self.quota[key] += n
+        self.errors += sub.errors
+        done = sub.to_dict()
+        self.sources[name] = {k: done[k] for k in ("ok", "mode", "messages_processed", "wall_ms", "errors")}
+
+    def to_dict(self) -> Dict[str, Any]:
+        wall, cpu = self._stopped or (time.perf_counter(), time.process_time())
+        return {
+            "ok": not self.errors,
+            "started_at": self.started_at,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "mode": self.mode,
+            # kept at the top level for callers of the earlier summary
+            "messages_processed": self.messages["processed"],
+            "files_updated": list(self.files),
+            "messages": self.messages,
+            "files": self.files,
+            "errors": self.errors,
+            "wall_ms": round((wall - self._wall) * 1000, 1),
+            "cpu_ms": round((cpu - self._cpu) * 1000, 1),
+            "stages": {name: {k: round(v, 1) for k, v in st.items()} for name, st in self.stages.items()},
+            "quota": {k: round(v, 3) for k, v in self.quota.items()},
+            **({"sources": self.sources} if self.sources else {}),
+            **({"backfill": self.backfill} if self.backfill else {}),
+        }
+
+# The current run's report, per thread: pull_and_write starts a fresh one, and each source of a
+# multi-source pull records into its own until it is merged.
+_reports = threading.local()
+
+def _new_report() -> _RunReport:
+    _reports.current = _RunReport()
+    return _reports.current
+
+def _current_report() -> _RunReport:
+    return getattr(_reports, "current", None) or _new_report()
+
+@contextlib.contextmanager
+def _stage(name: str, op: Optional[str] = None):
+    """Time a block into the report's `name` stage and the `op` latency histogram."""
+    with _timed(op or name, stage=name), _current_report().stage(name):
+        yield
+
+# ----- metrics and profiling -----------------------------------------------------
+# Cumulative counters and latency histograms (gmail_metrics.Registry), saved after every
+# pull as a Prometheus textfile plus the JSON state the next process resumes from.
+
+_metrics = None
+
+def _registry():
+    global _metrics
+    if _metrics is None:
+        from gmail_metrics import Registry
+        _metrics = Registry()
+        _metrics.counter("gmail_pull_runs_total", "Pulls finished, by result")
+        _metrics.counter("gmail_pull_messages_total", "Messages seen by the pull pipeline, by kind")
+        _metrics.counter("gmail_pull_routed_total", "Processed messages, by mapper route")
+        _metrics.counter("gmail_pull_items_written_total", "Items written to the data files, by collection")
+        _metrics.counter("gmail_pull_errors_total", "Errors recorded in run reports")
+        _metrics.counter("gmail_pull_throttled_total", "Gmail API calls rejected with a rate limit")
+        _metrics.counter("gmail_pull_retries_total", "Gmail API calls retried after a backoff")
+        _metrics.histogram("gmail_pull_op_seconds", "Latency of individual pipeline operations")
+        _metrics.histogram("gmail_pull_run_seconds", "Wall time of whole pulls")
+        _metrics.load(METRICS_FILE + ".state.json")
+    return _metrics
+
+@contextlib.contextmanager
+def _timed(op: str, stage: str = "write"):
+    """Observe a block's wall time in gmail_pull_op_seconds{stage, op}."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _op_sink is not None:
+            _op_sink.append((stage, op, time.perf_counter() - started))
+        else:
+            _registry().observe("gmail_pull_op_seconds", time.perf_counter() - started, stage=stage, op=op)
+
+def _record_run(result: Dict[str, Any]):
+    """Fold a finished run report into the counters and write the metrics files."""
+    reg = _registry()
+    reg.inc("gmail_pull_runs_total", result="ok" if result["ok"] else "error")
+    for kind, n in result["messages"].items():
+        if kind != "routed" and n:
+            reg.inc("gmail_pull_messages_total", n, kind=kind)
+    for route, n in result["messages"]["routed"].items():
+        reg.inc("gmail_pull_routed_total", n, route=route)
+    for name, n in result["files"].items():
+        reg.inc("gmail_pull_items_written_total", n, file=name)
+    reg.inc("gmail_pull_errors_total", len(result["errors"]))
+    reg.inc("gmail_pull_throttled_total", result["quota"]["throttled"])
+    reg.inc("gmail_pull_retries_total", result["quota"]["retries"])
+    reg.observe("gmail_pull_run_seconds", result["wall_ms"] / 1000)
+    os.makedirs(os.path.dirname(METRICS_FILE) or ".", exist_ok=True)
+    reg.save(METRICS_FILE, METRICS_FILE + ".state.json")
+
+def _profiled(fn, *args):
+    """Run fn(*args) under cProfile; raw stats go to DATA_DIR/gmail_profile.prof and the top
+    functions by PROFILE_SORT to DATA_DIR/gmail_profile.txt."""
+    import cProfile, io, pstats
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn, *args)
+    finally:
+        _ensure_dirs()
+        prof.dump_stats(os.path.join(DATA_DIR, "gmail_profile.prof"))
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats(PROFILE_SORT).print_stats(40)
+        with open(os.path.join(DATA_DIR, "gmail_profile.txt"), "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        print(f"🔬 Profile written to {os.path.join(DATA_DIR, 'gmail_profile.txt')} (sorted by {PROFILE_SORT})")
+
+# ----- quota-aware scheduling ----------------------------------------------------
+# Every Gmail call goes through the scheduler of the client it is made on, so sources pulling
+# different mailboxes are paced against their own per-user quota. The scheduler
+# (gmail_quota.AdaptiveScheduler) paces calls at QUOTA_UNITS units/sec and shrinks the batch
+# window and that rate AIMD-style when Gmail throttles, regrowing them as batches go through.
+# Throttled and 5xx calls are retried after a jittered exponential backoff. A batch re-sends
+# only the gets that failed, and gets still failing after QUOTA_RETRIES are deferred to the
+# next run (their ids never reach the ledger, and the cursor is not advanced past them)
+# rather than failing this one.
+
+_schedulers = weakref.WeakKeyDictionary()  # Gmail client -> AdaptiveScheduler
+_schedulers_lock = threading.Lock()
+
+def _new_scheduler(units_per_sec: float):
+    from gmail_quota import AdaptiveScheduler
+    return AdaptiveScheduler(units_per_sec, FETCH_BATCH, base_delay=RETRY_BASE_SECONDS, max_delay=RETRY_MAX_SECONDS)
+
+def _scheduler(svc):
+    with _schedulers_lock:
+        sched = _schedulers.get(svc)
+        if sched is None:
+            sched = _schedulers[svc] = _new_scheduler(QUOTA_UNITS)
+    return sched
+
+def _charge(svc, method: str, calls: int = 1, stage: str = "list"):
+    """Charge Gmail calls against the client's quota budget, sleeping while it is spent."""
+    from gmail_quota import COSTS
+    with _timed("quota_wait", stage=stage):
+        wait = _scheduler(svc).charge(method, calls)
+    quota = _current_report().quota
+    quota["units"] += COSTS.get(method, 1) * calls
+    quota["wait_s"] += wait
+
+def _retry_wait(sched, attempt: int, exc: Exception, stage: str):
+    from gmail_quota import error_reason, retry_after
+    delay = sched.backoff(attempt, retry_after(exc))
+    quota = _current_report().quota
+    quota["retries"] += 1
+    quota["wait_s"] += delay
+    print(f"⏳ Gmail {_http_status(exc)} {error_reason(exc) or 'error'}, retry {attempt}/{QUOTA_RETRIES} in {delay:.1f}s")
+    with _timed("retry_backoff", stage=stage):
+        time.sleep(delay)
+
+def _throttled(sched, n: int = 1):
+    sched.on_throttle()
+    _current_report().quota["throttled"] += n
+
+def _execute(svc, method: str, request, stage: str, op: str) -> Dict[str, Any]:
+    """Run `request()`.execute() paced by the client's scheduler, retrying throttled and 5xx
+    responses up to QUOTA_RETRIES times; any other error, or the last retry's, is raised."""
+    from gmail_quota import is_retryable, is_throttle
+    sched = _scheduler(svc)
+    for attempt in itertools.count(1):
+        _charge(svc, method, stage=stage)
+        try:
+            with _stage(stage, op):
+                res = request().execute()
+        except HttpError as e:
+            if not is_retryable(e) or attempt > QUOTA_RETRIES:
+                raise
+            if is_throttle(e):
+                _throttled(sched)
+            _retry_wait(sched, attempt, e, stage)
+            continue
+        sched.on_success()
+        return res
+
+# ----- append-only collections ---------------------------------------------------
+# meetings/insights/decisions are appended to DATA_DIR/<name>.jsonl and folded into the
+# DATA_DIR/<name>.json array once the log reaches COMPACT_LINES items or the array is
+# COMPACT_SECONDS old, so a run's write costs its own items rather than the whole history.
+# Readers see both through _read_collection here and readCollection in
+# server/services/data-collections.ts. Logged items carry an "id", so a compaction merges
+# them into whatever the .json holds by then, including items EmailIngestService wrote to it.
+
+def _read_json_array(path: str) -> List[Any]:
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except:
+        return []
+
+def _read_log(path: str) -> List[Any]:
+    """Items of a JSONL log; a torn final line from an interrupted append is skipped."""
+    items = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    pass
+    return items
+
+def _item_id(item: Any) -> str:
+    """Identity of a collection item: its "id", else (items from before ids) its canonical JSON."""
+    if isinstance(item, dict) and item.get("id"):
+        return str(item["id"])
+    return json.dumps(item, sort_keys=True, separators=(",", ":"))
+
+def _finish_compactions(name: str):
+    """Merge staged logs into the .json snapshot, including ones a crash left behind. Items
+    are matched by _item_id, so a log merged before the crash is not added twice and items
+    written to the snapshot by anyone else are kept."""
+    snapshot = os.path.join(DATA_DIR, f"{name}.json")
+    for staged in sorted(glob.glob(os.path.join(DATA_DIR, f"{name}.jsonl.*.compacting"))):
+        items = _read_json_array(snapshot)
+        seen = {_item_id(i) for i in items}
+        new = [i for i in _read_log(staged) if _item_id(i) not in seen]
+        if new:
+            _save_json(f"{name}.json", items + new)
+        os.remove(staged)
+
+def _read_collection(name: str) -> List[Any]:
+    """Every item of a collection: the compacted .json array followed by the uncompacted log."""
+    _finish_compactions(name)
+    return _read_json_array(os.path.join(DATA_DIR, f"{name}.json")) + _read_log(os.path.join(DATA_DIR, f"{name}.jsonl"))
+
+def _append_items(name: str, items: List[Any]):
+    """Append items to DATA_DIR/<name>.jsonl in a single write, flushed to disk. Items without
+    an "id" are given one, so compactions can tell them apart."""
+    _ensure_dirs()
+    _finish_compactions(name)
+    items = [i if not isinstance(i, dict) or i.get("id") else {"id": f"{name}-{uuid.uuid4().hex[:16]}", **i}
+             for i in items]
+    data = "".join(json.dumps(i, separators=(",", ":")) + "\n" for i in items).encode("utf-8")
+    with _timed("append_jsonl"), open(os.path.join(DATA_DIR, f"{name}.jsonl"), "ab+") as f:
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":  # previous append was torn; start on a fresh line
+                data = b"\n" + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _compact(name: str, force: bool = False) -> bool:
+    """Fold the collection log into its .json snapshot once it reaches COMPACT_LINES items or
+    the snapshot is COMPACT_SECONDS old. Returns True if a compaction ran."""
+    _finish_compactions(name)
+    log = os.path.join(DATA_DIR, f"{name}.jsonl")
+    snapshot = os.path.join(DATA_DIR, f"{name}.json")
+    if not os.path.exists(log) or os.path.getsize(log) == 0:
+        return False
+    if not force:
+        with open(log, "rb") as f:
+            lines = sum(1 for _ in f)
+        age = time.time() - os.path.getmtime(snapshot) if os.path.exists(snapshot) else float("inf")
+        if lines < COMPACT_LINES and age < COMPACT_SECONDS:
+            return False
+    staged = f"{log}.{time.time_ns()}.compacting"
+    os.replace(log, staged)
+    _finish_compactions(name)
+    return True
+
+def _compact_all():
+    """Force-compact every collection log (gmail-pull.py --compact)."""
+    for name in ("meetings", "insights", "decisions"):
+        if _compact(name, force=True):
+            print(f"🗜️  Compacted {name}.jsonl into {name}.json")
+
+def _drop_message_items(name: str, message_ids: Container[str]) -> int:
+    """Remove the items mapped from `message_ids` from a collection (backfill --remap) by
+    folding its log into the snapshot and rewriting that; returns how many were removed."""
+    _compact(name, force=True)
+    items = _read_json_array(os.path.join(DATA_DIR, f"{name}.json"))
+    kept = [i for i in items if not (isinstance(i, dict) and i.get("message_id") in message_ids)]
+    if len(kept) < len(items):
+        _save_json(f"{name}.json", kept)
+    return len(items) - len(kept)
+
+def _state_file(name: str, source: Optional[str]) -> str:
+    """Per-source variant of a state file: gmail_cursor.json -> gmail_cursor.<source>.json."""
+    if source is None:
+        return name
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{source}{ext}"
+
+def _load_cursor(source: Optional[str] = None) -> Dict[str, Any]:
+    path = os.path.join(DATA_DIR, _state_file(CURSOR_FILE, source))
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return {}
+
+def _save_cursor(cursor: Dict[str, Any], source: Optional[str] = None):
+    _save_json(_state_file(CURSOR_FILE, source), {**cursor, "updated_at": datetime.now(timezone.utc).isoformat()})
+
+def _load_ledger(source: Optional[str] = None) -> Dict[str, int]:
+    path = os.path.join(DATA_DIR, _state_file(LEDGER_FILE, source))
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return {}
+
+def _save_ledger(ledger: Dict[str, int], source: Optional[str] = None):
+    """Persist the processed-id ledger compactly, evicting entries older than LEDGER_DAYS."""
+    cutoff = int(datetime.now(timezone.utc).timestamp() - LEDGER_DAYS * 86400)
+    kept = {k: v for k, v in ledger.items() if v >= cutoff}
     _ensure_dirs()
-    with open(os.path.join(DATA_DIR, name), "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2)
+    # temp file and rename like _save_json: a torn ledger would read as empty and re-ingest everything
+    path = os.path.join(DATA_DIR, _state_file(LEDGER_FILE, source))
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(kept, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
 
-def _save_inbox(msg: Dict[str, Any], suffix="raw"):
-    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-    safe_subj = "".join(c for c in msg.get("subject","") if c.isalnum() or c in (" ","-","_"))[:80].strip().replace(" ","_")
-    fname = f"inbox/{ts}_{safe_subj}_{suffix}.json"
-    _save_json(fname, msg)
+def _http_status(exc: Exception) -> Optional[int]:
+    return getattr(getattr(exc, "resp", None), "status", None)
 
-def _gmail_service():
+def _load_token_cache() -> Dict[str, Any]:
+    if not os.path.exists(TOKEN_CACHE):
+        return {}
+    try:
+        with open(TOKEN_CACHE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return {}
+
+def _save_token_cache(cache: Dict[str, Any]):
+    """Write the token cache atomically, readable by the owner only."""
+    os.makedirs(os.path.dirname(TOKEN_CACHE) or ".", exist_ok=True)
+    tmp = TOKEN_CACHE + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, TOKEN_CACHE)
+
+_token_cache_lock = threading.Lock()
+
+def _warm_credentials(creds, key: str):
+    """Reuse the cached access token for `key` (auth mode + subject) and only call the token
+    endpoint once it is within TOKEN_REFRESH_MARGIN of expiry, caching the new token."""
+    cache = _load_token_cache()
+    entry = cache.get(key)
+    if entry:
+        creds.token = entry["token"]
+        creds.expiry = datetime.fromisoformat(entry["expiry"])  # naive UTC, as google-auth expects
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if not creds.token or not creds.expiry or creds.expiry - now < TOKEN_REFRESH_MARGIN:
+        creds.refresh(Request())
+        with _token_cache_lock:  # sources authenticating concurrently share the cache file
+            cache = _load_token_cache()
+            cache[key] = {"token": creds.token, "expiry": creds.expiry.isoformat()}
+            _save_token_cache(cache)
+    return creds
+
+def _gmail_service(mailbox: Optional[str] = None, refresh_token: Optional[str] = None):
+    """Authenticated Gmail client for `mailbox` (service mode, default GMAIL_IMPERSONATE) or
+    `refresh_token` (oauth mode, default OAUTH_REFRESH_TOKEN)."""
+    with _stage("auth", "gmail_service"):
+        return _build_service(mailbox, refresh_token)
+
+def _build_service(mailbox: Optional[str], refresh_token: Optional[str]):
     mode = os.getenv("GMAIL_AUTH_MODE", "service").lower()
     if mode == "service":
         gsa_json = os.getenv("GSA_JSON")
         if not gsa_json: 
             raise RuntimeError("Missing GSA_JSON secret")
         info = json.loads(gsa_json)
-        creds = service_account.Credentials.from_service_account_info(
-            info, scopes=["https://www.googleapis.com/auth/gmail.readonly"]
-        )
-        user = os.getenv("GMAIL_IMPERSONATE")
+        creds = service_account.Credentials.from_service_account_info(info, scopes=GMAIL_SCOPES)
+        user = mailbox or os.getenv("GMAIL_IMPERSONATE")
         if not user: 
             raise RuntimeError("Missing GMAIL_IMPERSONATE")
-        creds = creds.with_subject(user)
-        return build("gmail", "v1", credentials=creds, cache_discovery=False)
+        creds = _warm_credentials(creds.with_subject(user), f"service:{info.get('client_email', '')}:{user}")
     elif mode == "oauth":
         cid = os.getenv("OAUTH_CLIENT_ID")
         cs = os.getenv("OAUTH_CLIENT_SECRET")
-        rt = os.getenv("OAUTH_REFRESH_TOKEN")
+        rt = refresh_token or os.getenv("OAUTH_REFRESH_TOKEN")
         if not all([cid, cs, rt]): 
             raise RuntimeError("Missing OAuth secrets")
         creds = Credentials(None, refresh_token=rt, token_uri="https://oauth2.googleapis.com/token",
-                            client_id=cid, client_secret=cs, scopes=["https://www.googleapis.com/auth/gmail.readonly"])
-        if not creds.valid:
-            creds.refresh(Request())
-        return build("gmail", "v1", credentials=creds, cache_discovery=False)
+                            client_id=cid, client_secret=cs, scopes=GMAIL_SCOPES)
+        # Key on a digest of the refresh token so a rotated token never reuses stale access tokens
+        creds = _warm_credentials(creds, f"oauth:{cid}:{hashlib.sha256(rt.encode()).hexdigest()[:16]}")
     else:
         raise RuntimeError("GMAIL_AUTH_MODE must be 'service' or 'oauth'")
+    # Discovery doc comes from the copy bundled with google-api-python-client: no network call
+    return build("gmail", "v1", credentials=creds, cache_discovery=False, static_discovery=True)
 
-def _list_messages(svc, q: str, max_results=25) -> List[Dict[str, Any]]:
-    res = svc.users().messages().list(userId="me", q=q, maxResults=max_results).execute()
-    msgs = res.get("messages", [])
-    out = []
-    for m in msgs:
-        out.append(svc.users().messages().get(userId="me", id=m["id"], format="full").execute())
-    return out
+def _iter_messages(svc, ids: Iterable[str], fmt: str = "full", batch_size: int = FETCH_BATCH,
+                   deferred: Optional[set] = None) -> Iterator[Dict[str, Any]]:
+    """Fetch messages by id in Gmail batch HTTP requests, one round-trip per `batch_size` ids
+    (fewer while the scheduler's window is cut after throttling), yielding them in the order of
+    `ids` while holding at most one batch in memory. Messages deleted in the meantime are
+    dropped. Throttled and 5xx gets are retried on their own after a backoff; ids still failing
+    after QUOTA_RETRIES are left out, counted as deferred and added to `deferred` if given.
+    Any other failed get is re-raised."""
+    sched = _scheduler(svc)
+    it = iter(ids)
+    while True:
+        chunk = [i for _, i in zip(range(min(batch_size, sched.window)), it)]
+        if not chunk:
+            return
+        out: Dict[str, Dict[str, Any]] = {}
+        pending = chunk
+        for attempt in itertools.count(1):
+            failed: List[Tuple[str, Exception]] = []
+            start = 0
+            while start < len(pending):
+                sub = pending[start:start + sched.window]
+                start += len(sub)
+                failed += _batch_get(svc, sched, sub, fmt, out)
+            if not failed:
+                break
+            if attempt > QUOTA_RETRIES:
+                _current_report().messages["deferred"] += len(failed)
+                if deferred is not None:
+                    deferred.update(msg_id for msg_id, _ in failed)
+                print(f"⚠️  Deferring {len(failed)} messages to the next run: still failing after {QUOTA_RETRIES} retries")
+                break
+            _retry_wait(sched, attempt, failed[0][1], "fetch")
+            pending = [msg_id for msg_id, _ in failed]
+        got = [out[i] for i in chunk if i in out]
+        _current_report().messages["fetched" if fmt == "full" else "metadata_fetched"] += len(got)
+        yield from got
+
+def _batch_get(svc, sched, ids: List[str], fmt: str, out: Dict[str, Dict[str, Any]]) -> List[Tuple[str, Exception]]:
+    """One batch of gets into `out`; returns the (id, error) pairs worth retrying."""
+    from gmail_quota import is_retryable, is_throttle
+    errors: List[Exception] = []
+    failed: List[Tuple[str, Exception]] = []
+
+    def on_result(request_id, response, exception):
+        msg_id = ids[int(request_id)]
+        if exception is None:
+            out[msg_id] = response
+        elif is_retryable(exception):
+            failed.append((msg_id, exception))
+        elif _http_status(exception) != 404:  # deleted since it was listed
+            errors.append(exception)
+
+    extra = {"metadataHeaders": METADATA_HEADERS} if fmt == "metadata" else {}
+    batch = svc.new_batch_http_request(callback=on_result)
+    for n, msg_id in enumerate(ids):
+        batch.add(svc.users().messages().get(userId="me", id=msg_id, format=fmt, **extra), request_id=str(n))
+    _charge(svc, "messages.get", len(ids), stage="fetch")
+    try:
+        with _stage("fetch", f"batch_get_{fmt}"):
+            batch.execute()
+    except HttpError as e:  # the batch request itself was rejected
+        if not is_retryable(e):
+            raise
+        failed = [(msg_id, e) for msg_id in ids if msg_id not in out]
+    if errors:
+        raise errors[0]
+    throttles = sum(1 for _, e in failed if is_throttle(e))
+    if throttles:
+        _throttled(sched, throttles)
+    elif not failed:
+        sched.on_success()
+    return failed
+
+def _iter_routed(svc, ids: Iterable[str]) -> Iterator[Tuple[Dict[str, Any], List[str]]]:
+    """
+    Two-phase fetch: classify each message from its `format=metadata` headers, then fetch the
+    full payload only for messages some mapper will consume. Yields (message, routes) in list
+    order; unrouted messages come back as their metadata resource (headers + snippet only).
+    """
+    metas = _iter_messages(svc, ids, fmt="metadata")
+    labels = _label_names(svc) if _routing().uses_labels else {}
+    deferred: set = set()
+    while True:
+        chunk = [m for _, m in zip(range(FETCH_BATCH), metas)]
+        if not chunk:
+            return
+        routes = [_route(_headers(m), (labels.get(i, i) for i in m.get("labelIds", []))) for m in chunk]
+        full = {m["id"]: m for m in _iter_messages(svc, [m["id"] for m, r in zip(chunk, routes) if r],
+                                                   deferred=deferred)}
+        for m, r in zip(chunk, routes):
+            if m["id"] in full:
+                yield full[m["id"]], r
+            elif m["id"] not in deferred:
+                yield m, []
+
+def _iter_message_ids(svc, q: str, page_size: int = PAGE_SIZE) -> Iterator[str]:
+    """Yield every id matching `q`, following nextPageToken one list page at a time."""
+    token = None
+    while True:
+        res = _execute(svc, "messages.list",
+                       lambda: svc.users().messages().list(userId="me", q=q, maxResults=page_size, pageToken=token),
+                       "list", "messages_list")
+        for m in res.get("messages", []):
+            yield m["id"]
+        token = res.get("nextPageToken")
+        if not token:
+            return
+
+def _unprocessed(ids: Iterable[str], ledger: Container[str]) -> Iterator[str]:
+    skipped = 0
+    for msg_id in ids:
+        _current_report().messages["listed"] += 1
+        if msg_id in ledger:
+            skipped += 1
+        else:
+            yield msg_id
+    _current_report().messages["skipped"] += skipped
+    if skipped:
+        print(f"⏭️  Skipping {skipped} already-processed messages")
+
+def _label_names(svc) -> Dict[str, str]:
+    """Label id -> name for the mailbox."""
+    res = _execute(svc, "labels.list", lambda: svc.users().labels().list(userId="me"), "list", "labels_list")
+    return {label["id"]: label.get("name", "") for label in res.get("labels", [])}
+
+def _label_id(svc, name: str) -> Optional[str]:
+    return next((label_id for label_id, n in _label_names(svc).items() if n == name), None)
+
+def _history_message_ids(svc, start_history_id: str, label_id: str) -> Tuple[List[str], str]:
+    """Ids of messages that gained `label_id` since `start_history_id`, plus the mailbox's current historyId.
+    Raises HttpError 404 when the start id is too old for Gmail to serve."""
+    ids, seen, token = [], set(), None
+    while True:
+        res = _execute(svc, "history.list", lambda: svc.users().history().list(
+            userId="me", startHistoryId=start_history_id, labelId=label_id,
+            historyTypes=["messageAdded", "labelAdded"], pageToken=token
+        ), "list", "history_list")
+        for h in res.get("history", []):
+            for rec in h.get("messagesAdded", []) + h.get("labelsAdded", []):
+                m = rec["message"]
+                if label_id in m.get("labelIds", [label_id]) and m["id"] not in seen:
+                    seen.add(m["id"])
+                    ids.append(m["id"])
+        token = res.get("nextPageToken")
+        if not token:
+            return ids, res.get("historyId", start_history_id)
+
+def _pull_messages(svc, cursor: Dict[str, Any], ledger: Dict[str, int], label: str = LABEL,
+                   query: str = QUERY) -> Tuple[Iterator[Tuple[Dict[str, Any], List[str]]], Dict[str, Any]]:
+    """
+    Stream (message, routes) pairs for this run and return them with the cursor to persist afterwards.
+    With a cursor from an earlier run for the same query, only messages added to `label` since
+    its historyId are fetched (one history().list call when nothing changed). Without one, or
+    once Gmail has expired it, this falls back to a full `query` scan and starts a new cursor.
+    Ids already in the processed `ledger` are dropped before any full message is fetched.
+    """
+    ids, new_cursor = None, {}
+    if INCREMENTAL and cursor.get("historyId") and cursor.get("label_id") and cursor.get("query") == query:
+        try:
+            ids, history_id = _history_message_ids(svc, cursor["historyId"], cursor["label_id"])
+            print(f"🔁 Incremental sync from historyId {cursor['historyId']}: {len(ids)} new")
+            _current_report().mode = "incremental"
+            new_cursor = {**cursor, "historyId": history_id}
+        except HttpError as e:
+            if _http_status(e) != 404:
+                raise
+            print("⚠️  History cursor expired, falling back to full scan")
+
+    if ids is None:
+        _current_report().mode = "full"
+        if INCREMENTAL:
+            # Snapshot the historyId before listing so nothing added mid-scan is missed next run
+            history_id = _execute(svc, "getProfile", lambda: svc.users().getProfile(userId="me"),
+                                  "list", "get_profile").get("historyId")
+            new_cursor = {"historyId": history_id, "label_id": _label_id(svc, label), "query": query}
+        ids = _iter_message_ids(svc, query)
+
+    return _iter_routed(svc, _unprocessed(ids, ledger)), new_cursor
+
+def _charset(part: Dict[str, Any]) -> str:
+    for h in part.get("headers", []):
+        if h.get("name", "").lower() == "content-type":
+            m = re.search(r'charset="?([\w.:-]+)', h.get("value", ""), re.I)
+            if m:
+                return m.group(1)
+    return "utf-8"
+
+def _decode_part(part: Dict[str, Any], data: str) -> str:
+    """Decode at most BODY_MAX_BYTES of a part's base64url body."""
+    limit = -(-BODY_MAX_BYTES // 3) * 4  # whole base64 quanta covering the byte budget
+    raw = base64.urlsafe_b64decode(data[:limit].encode("utf-8"))[:BODY_MAX_BYTES]
+    try:
+        return raw.decode(_charset(part), "ignore")
+    except LookupError:
+        return raw.decode("utf-8", "ignore")
 
 def _parse_body(payload: Dict[str, Any]) -> Dict[str, str]:
     def walk(p):
         if "parts" in p:
-            for part in p["parts"]:
+            parts = p["parts"]
+            if p.get("mimeType", "") == "multipart/alternative":
+                # Alternatives carry the same content; a text/plain one needs no HTML conversion
+                parts = sorted(parts, key=lambda q: q.get("mimeType", "") != "text/plain")
+            for part in parts:
                 r = walk(part)
                 if r: return r
         mime = p.get("mimeType","")
         body = p.get("body",{}).get("data")
         if body:
-            raw = base64.urlsafe_b64decode(body.encode("utf-8"))
             if "text/html" in mime:
-                soup = BeautifulSoup(raw, "html.parser")
-                html = str(soup)
-                text = html2text.html2text(html)
-                return {"html": html, "text": text}
+                html = _decode_part(p, body)
+                h = html2text.HTML2Text()
+                h.unicode_snob = True  # entities become the same characters a BeautifulSoup pass produced
+                return {"html": html, "text": h.handle(html)}
             elif "text/plain" in mime:
-                return {"html": "", "text": raw.decode("utf-8", "ignore")}
+                return {"html": "", "text": _decode_part(p, body)}
         return None
     return walk(payload) or {"html":"", "text":""}
 
+# ----- routing ---------------------------------------------------------------------
+# Which mappers a message is sent to is configured in ROUTES_FILE: subject, sender and label
+# patterns per route (gmail_routing.RouteRegistry). A route's mapper is one of MAPPERS or a
+# "module:function" taking the body text and returning collection -> items to add, so a new
+# report type needs a config entry rather than a change here.
+
+_routes = None
+_routes_lock = threading.Lock()
+
+def _routing():
+    global _routes
+    with _routes_lock:
+        if _routes is None:
+            from gmail_routing import RouteRegistry
+            registry = RouteRegistry.load(ROUTES_FILE)
+            for route in registry.routes:
+                _mapper(route.mapper)  # fail on a bad mapper name up front, not mid-run
+            _routes = registry
+    return _routes
+
+def _route(hdr: Dict[str, str], labels: Iterable[str] = ()) -> List[str]:
+    """Names of the routes a message's headers (and label names) select."""
+    return _routing().classify(hdr["subject"], hdr["from"], list(labels))
+
 def _headers(msg) -> Dict[str,str]:
     h = {x["name"].lower(): x["value"] for x in msg.get("payload",{}).get("headers", [])}
     return {
@@ -144,8 +847,92 @@ def _headers(msg) -> Dict[str,str]:
         "date": h.get("date","")
     }
 
+# ----- single-pass line extraction ---------------------------------------------
+
+class _LineRules:
+    """
+    Compiled form of a rule table of (field, keyword alternatives, extractor, target path).
+    For each field the first line containing every keyword of an alternative is taken, trying
+    alternatives in order exactly like chained `_find_line` calls; `extractor` turns that line
+    into a value (None keeps the line itself). All keyword sets are resolved in one pass: a
+    combined regex of anchor keywords runs once over the lower-cased text, and only the lines
+    it hits are checked against the sets still pending.
+    """
+    def __init__(self, rules):
+        self.rules = [(field, [tuple(k.lower() for k in ks) for ks in alts], extractor, path)
+                      for field, alts, extractor, path in rules]
+        self.keysets = list(dict.fromkeys(ks for _, alts, _, _ in self.rules for ks in alts))
+        # A line can only satisfy a keyword set if it contains that set's longest keyword
+        anchors = sorted({max(ks, key=len) for ks in self.keysets}, key=len, reverse=True)
+        self.prefilter = re.compile("|".join(re.escape(w) for w in anchors))
+
+    def scan(self, text: str) -> Dict[Tuple[str, ...], str]:
+        found, pending = {}, list(self.keysets)
+        lines = text.splitlines()
+        low_text = text.lower()
+        if len(low_text) != len(text):  # lower() changed offsets; fall back to per-line matching
+            candidates = [i for i, line in enumerate(lines) if self.prefilter.search(line.lower())]
+        else:
+            starts = [0, *itertools.accumulate(map(len, text.splitlines(True)))]
+            candidates = dict.fromkeys(bisect.bisect_right(starts, m.start()) - 1
+                                       for m in self.prefilter.finditer(low_text))
+        for i in candidates:
+            L = lines[i].strip()
+            low = L.lower()
+            hits = [ks for ks in pending if all(k in low for k in ks)]
+            if hits:
+                for ks in hits:
+                    found[ks] = L
+                pending = [ks for ks in pending if ks not in found]
+                if not pending:
+                    break
+        return found
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        found = self.scan(text)
+        out = {}
+        for field, alts, extractor, _ in self.rules:
+            L = next((found[ks] for ks in alts if ks in found), "")
+            if L:
+                out[field] = extractor(L) if extractor else L
+        return out
+
+def _first_line(s: str) -> str:
+    return (s.splitlines() or [""])[0].strip()
+
 # ----- mappers: adapt these 2–3 functions to your email formats ----------------
 
+CEO_RULES = [
+    ("upsells", [("upsell",)], _money, ("revenue", "upsells")),
+    ("autonomy", [("autonomy",)], _percent, ("autonomy", "auto_resolve_pct")),
+    ("quiz_to_paid", [("quiz", "paid")], _percent, ("narrative", "quiz_to_paid_delta_pct")),
+    ("linkedin_er", [("linkedin", "er")], _percent, ("narrative", "linkedin_er_delta_pct")),
+    ("email_ctr", [("email", "ctr")], _percent, ("narrative", "email_ctr_delta_pct")),
+    ("conversions", [("conversion",), ("paid",)], _int, ("narrative", "conversions")),
+    ("risk_high", [("high",)], _int, ("risk", "high")),
+    ("risk_medium", [("medium",)], _int, ("risk", "medium")),
+    ("next_deadline", [("deadline",)], _hours, ("risk", "next_deadline_hours")),
+    ("risk_score", [("risk", "score")], _int, ("risk", "score")),
+    ("top_theme", [("top theme",)], None, None),
+    ("narrative", [("narrative:",)], None, None),
+]
+
+CONTENT_RULES = [
+    ("top_piece", [("top piece",)], None, None),
+    ("paid", [("conversion",), ("paid",)], _int, None),
+    ("influenced", [("influenced",)], _money, None),
+    ("persona", [("persona",)], None, None),
+    ("linkedin_er", [("linkedin", "er")], _percent, None),
+    ("email_ctr", [("email", "ctr")], _percent, None),
+]
+
+_CEO_LINES = _LineRules(CEO_RULES)
+_CONTENT_LINES = _LineRules(CONTENT_RULES)
+_MRR_RE = re.compile(r"Net\s*New\s*MRR[:\s]+\$?\s*([0-9,]+)(?:.*?target[^$]*\$?\s*([0-9,]+))?", re.I|re.S)
+_MTTR_RE = re.compile(r"mttr[:\s]+([0-9]+(?:\.[0-9]+)?)\s*m", re.I)
+_PAID_COUNT_RE = re.compile(r"paid\s*[:=]\s*[1-9]", re.I)
+_ACTION_LINE_RE = re.compile(r"(?im)^\s*Action[:\-]\s*(.+)$")
+
 def map_ceo_to_scoreboard(text: str) -> dict:
     """
     Parse your CEO Summary into the scoreboard shape.
@@ -159,6 +946,7 @@ def map_ceo_to_scoreboard(text: str) -> dict:
       - 'Conversions: 4 paid'
       - 'Risk: High 2 • Medium 1 • Next deadline 4h'
     Anything not present stays at 0 and can be filled by your dashboards later.
+    Line-based fields come from CEO_RULES.
     """
     lines = text.replace("\u2192", "->")  # normalize arrow
     out = {
@@ -172,66 +960,31 @@ def map_ceo_to_scoreboard(text: str) -> dict:
     }
 
     # Net New MRR + target (used to proxy weekly pace if present)
-    m = re.search(r"Net\s*New\s*MRR[:\s]+\$?\s*([0-9,]+)(?:.*?target[^$]*\$?\s*([0-9,]+))?", lines, re.I|re.S)
+    m = _MRR_RE.search(lines)
     if m:
         realized = float(m.group(1).replace(",", ""))
         target = float(m.group(2).replace(",", "")) if m.group(2) else 0.0
         out["revenue"]["realized_week"] = realized if realized else 0
         out["revenue"]["target_week"] = target if target else 0
 
-    # Upsells (if mentioned explicitly)
-    L = _find_line(lines, "upsell")
-    if L: out["revenue"]["upsells"] = _money(L)
-
-    # Autonomy %
-    L = _find_line(lines, "autonomy")
-    if L: out["autonomy"]["auto_resolve_pct"] = _percent(L)
-
     # MTTR minutes (e.g., 'MTTR 4.3m' or 'MTTR: 5 min')
-    m = re.search(r"mttr[:\s]+([0-9]+(?:\.[0-9]+)?)\s*m", lines, re.I)
+    m = _MTTR_RE.search(lines)
     if m: out["autonomy"]["mttr_min"] = float(m.group(1))
 
-    # Quiz->Paid %
-    L = _find_line(lines, "quiz", "paid")
-    if L: out["narrative"]["quiz_to_paid_delta_pct"] = _percent(L)
-
-    # LinkedIn ER %
-    L = _find_line(lines, "linkedin", "er")
-    if L: out["narrative"]["linkedin_er_delta_pct"] = _percent(L)
-
-    # Email CTR %
-    L = _find_line(lines, "email", "ctr")
-    if L: out["narrative"]["email_ctr_delta_pct"] = _percent(L)
-
-    # Conversions: 'Conversions: 4 paid' or 'paid: 4'
-    L = _find_line(lines, "conversion")
-    if not L: L = _find_line(lines, "paid")
-    if L:
-        n = _int(L)
-        if n: out["narrative"]["conversions"] = n
+    # Upsells, autonomy %, channel deltas, conversions and risk counts in one pass
+    found = _CEO_LINES.extract(lines)
+    for field, _, _, path in CEO_RULES:
+        if path and found.get(field) is not None:
+            out[path[0]][path[1]] = found[field]
 
     # Narrative topic (quoted or plain)
-    L = _find_line(lines, "top theme")
-    topic = _quoted(L) or _extract_after(L or lines, "Top theme:").splitlines()[0].strip()
+    L = found.get("top_theme", "")
+    topic = _quoted(L) or _first_line(_extract_after(L or lines, "Top theme:"))
     if not topic:
-        L = _find_line(lines, "narrative:")
-        topic = _extract_after(L or "", "narrative:").splitlines()[0].strip()
+        topic = _first_line(_extract_after(found.get("narrative", ""), "narrative:"))
     if topic:
         out["narrative"]["topic"] = topic.strip(" .")
 
-    # Risk summary (e.g., 'High 2 • Medium 1 • Next deadline 4h' or 'Risk: score 78')
-    L = _find_line(lines, "high")
-    if L: out["risk"]["high"] = max(out["risk"]["high"], _int(L))
-    L = _find_line(lines, "medium")
-    if L: out["risk"]["medium"] = max(out["risk"]["medium"], _int(L))
-    L = _find_line(lines, "deadline")
-    if L:
-        m = re.search(r"([0-9]+)\s*h", L, re.I); 
-        if m: out["risk"]["next_deadline_hours"] = int(m.group(1))
-    # Optional overall risk score
-    L = _find_line(lines, "risk", "score")
-    if L: out["risk"]["score"] = max(out["risk"]["score"], _int(L))
-
     return out
 
 def map_content_to_actions(text: str) -> Dict[str, Any]:
@@ -246,11 +999,12 @@ def map_content_to_actions(text: str) -> Dict[str, Any]:
     Output merges into actions.json & meetings.json.
     """
     lines = text
+    found = _CONTENT_LINES.extract(lines)
     actions = []
     meeting_summary = []
 
     # Top Piece
-    L = _find_line(lines, "top piece")
+    L = found.get("top_piece")
     if L:
         title = _quoted(L) or _extract_after(L, "Top Piece:").strip()
         if title:
@@ -263,20 +1017,17 @@ def map_content_to_actions(text: str) -> Dict[str, Any]:
             meeting_summary.append(f"Top piece: {title}")
 
     # Conversions from content
-    L = _find_line(lines, "conversion")
-    if not L: L = _find_line(lines, "paid")
-    paid = _int(L) if L else 0
+    paid = found.get("paid", 0)
     if paid:
         meeting_summary.append(f"Paid from content: {paid}")
 
     # Influenced revenue
-    rev_line = _find_line(lines, "influenced")
-    influenced = _money(rev_line) if rev_line else 0.0
+    influenced = found.get("influenced", 0.0)
     if influenced:
         meeting_summary.append(f"Influenced revenue: ${int(influenced)}")
 
     # Persona winners (VS, RL, Architect)
-    persona_line = _find_line(lines, "persona")
+    persona_line = found.get("persona")
     if persona_line:
         # Prefer VS if mentioned with advantage
         if re.search(r"\bVS\b", persona_line, re.I):
@@ -287,7 +1038,7 @@ def map_content_to_actions(text: str) -> Dict[str, Any]:
                 "reason": "Persona signal favors VS in Content Digest"
             })
             meeting_summary.append("Persona winner: VS")
-        if re.search(r"Architect", persona_line, re.I) and not re.search(r"paid\s*[:=]\s*[1-9]", lines, re.I):
+        if re.search(r"Architect", persona_line, re.I) and not _PAID_COUNT_RE.search(lines):
             actions.append({
                 "title": "Draft Architect brief (fast-track)",
                 "owner": "Content",
@@ -297,7 +1048,7 @@ def map_content_to_actions(text: str) -> Dict[str, Any]:
             meeting_summary.append("Architect gap detected")
 
     # Explicit "Action:" lines → convert to tasks
-    for m in re.finditer(r"(?im)^\s*Action[:\-]\s*(.+)$", lines):
+    for m in _ACTION_LINE_RE.finditer(lines):
         txt = m.group(1).strip().rstrip(".")
         actions.append({
             "title": txt[:100],
@@ -307,25 +1058,25 @@ def map_content_to_actions(text: str) -> Dict[str, Any]:
         })
 
     # Channel lifts → quick directives
-    L = _find_line(lines, "linkedin", "er")
-    if L and _percent(L) >= 10:
+    lift = found.get("linkedin_er")
+    if lift is not None and lift >= 10:
         actions.append({
             "title": "Double LinkedIn cadence for 72h (winning theme)",
             "owner": "CMO",
             "eta_days": 3,
-            "reason": f"LinkedIn ER lift {_percent(L)}% in digest"
+            "reason": f"LinkedIn ER lift {lift}% in digest"
         })
-        meeting_summary.append(f"LinkedIn ER {int(_percent(L))}%")
+        meeting_summary.append(f"LinkedIn ER {int(lift)}%")
 
-    L = _find_line(lines, "email", "ctr")
-    if L and _percent(L) >= 8:
+    lift = found.get("email_ctr")
+    if lift is not None and lift >= 8:
         actions.append({
             "title": "Extend winning email subject to VS segment",
             "owner": "CMO",
             "eta_days": 2,
-            "reason": f"Email CTR lift {_percent(L)}% in digest"
+            "reason": f"Email CTR lift {lift}% in digest"
         })
-        meeting_summary.append(f"Email CTR {int(_percent(L))}%")
+        meeting_summary.append(f"Email CTR {int(lift)}%")
 
     # Build a compact meeting snapshot (if we have at least one signal)
     meetings = []
@@ -367,149 +1118,979 @@ def map_operational_to_insights(text: str) -> Dict[str, Any]:
     
     return {"insights": insights, "decisions": decisions}
 
+# ----- mapper memo (GMAIL_MEMO) ------------------------------------------------
+# Re-sent and CC'd reports arrive with identical bodies. A routed message is keyed by a hash
+# of its text/* body parts (still base64, as Gmail returned them), its routes and
+# _mapper_version(); a hit hands back the body text parsed from the first copy (see
+# gmail_memo.py), skipping the MIME walk and html2text. The mappers still run on every copy:
+# their outputs carry wall-clock stamps (dates, timestamps, due dates) that must be the
+# current message's. _mapper_version hashes the source of the parse and map code, the rule
+# tables and regexes, so editing any of them invalidates the memo; bump MAPPER_VERSION for
+# anything it misses.
+
+MAPPER_VERSION = "2"
+_memo = None
+_memo_lock = threading.Lock()
+_mapper_digest: Optional[str] = None
+
+def _mapper_version() -> str:
+    global _mapper_digest
+    if _mapper_digest is None:
+        import inspect
+        h = hashlib.sha256(f"{MAPPER_VERSION}|{BODY_MAX_BYTES}|{html2text.__version__}".encode())
+        for fn in (_charset, _decode_part, _parse_body, _money, _percent, _int, _hours, _extract_after, _quoted,
+                   _first_line, _LineRules, map_ceo_to_scoreboard, map_content_to_actions,
+                   map_operational_to_insights, _map_message):
+            h.update(inspect.getsource(fn).encode("utf-8"))
+        h.update(json.dumps([CEO_RULES, CONTENT_RULES], default=lambda fn: fn.__name__).encode("utf-8"))
+        h.update(_routing().signature().encode("utf-8"))
+        for route in _routing().routes:
+            fn = _mapper(route.mapper)[0]
+            if fn.__module__ != __name__:
+                h.update(inspect.getsource(fn).encode("utf-8"))
+        for pattern in sorted(str(v.pattern) for v in globals().values() if isinstance(v, re.Pattern)):
+            h.update(pattern.encode("utf-8"))
+        _mapper_digest = h.hexdigest()[:16]
+    return _mapper_digest
+
+def _open_memo():
+    """The shared MapperMemo, opened on first use; None with GMAIL_MEMO=0."""
+    global _memo
+    if not MEMO:
+        return None
+    with _memo_lock:
+        if _memo is None:
+            from gmail_memo import MapperMemo
+            _ensure_dirs()
+            _memo = MapperMemo(MEMO_PATH, _mapper_version(), max_entries=MEMO_ENTRIES, max_bytes=MEMO_BYTES)
+    return _memo
+
+def _memo_key(m: Dict[str, Any], routes: List[str]) -> Optional[str]:
+    """Hash of a routed message's text body parts, routes and mapper version; None if unrouted."""
+    if not routes:
+        return None
+    h = hashlib.sha256(f"{_mapper_version()}|{','.join(sorted(routes))}".encode())
+    stack = [m.get("payload", {})]
+    while stack:
+        p = stack.pop()
+        stack.extend(reversed(p.get("parts", [])))
+        data = p.get("body", {}).get("data")
+        if data and p.get("mimeType", "").startswith("text/"):
+            h.update(f"|{p['mimeType']}|".encode())
+            h.update(data.encode("ascii"))
+    return h.hexdigest()
+
+def _recall(m: Dict[str, Any], routes: List[str], source: Optional[str] = None):
+    """(memo key, _parse_message result rebuilt from the body text stored for it, or None)."""
+    memo = _open_memo()
+    key = _memo_key(m, routes) if memo is not None else None
+    if key is None:
+        return None, None
+    with _stage("parse", "memo_lookup"):
+        hit = memo.get(key)
+    if hit is None:
+        return key, None
+    hdr = _headers(m)
+    _current_report().messages["memo_hits"] += 1
+    print(f"♻️  Reusing parsed body for: {hdr['subject']}")
+    return key, (hdr, hit["text"], _archive_entry(m, hdr, hit["text"], source))
+
+def _remember(key: Optional[str], text: str):
+    if key is not None:
+        with _stage("write", "memo_put"):
+            _open_memo().put(key, {"text": text})
+
+def _flush_memo():
+    if _memo is not None:
+        with _stage("write", "memo_flush"):
+            _memo.flush()
+
 # ----- main entry --------------------------------------------------------------
 
-def pull_and_write():
-    """Main function to pull emails and update data files."""
-    print("📧 Starting Gmail pull process...")
-    
-    try:
-        svc = _gmail_service()
-        print("✅ Gmail service authenticated successfully")
-    except Exception as e:
-        print(f"❌ Gmail authentication failed: {e}")
-        return
-    
+def _collected() -> Dict[str, Any]:
+    """Accumulator for one run's mapper outputs, filled by _process_message."""
+    return {"scoreboard": None, "snapshots": [], "actions": [], "meetings": [], "insights": [], "decisions": []}
+
+def _process_message(m: Dict[str, Any], routes: List[str], collected: Dict[str, Any], archive=None,
+                     source: Optional[str] = None):
+    """Parse one message (or recall its body from the memo) and run the mappers it was routed
+    to into `collected`, then archive it if an `archive` is given (keyed by `source`:id for
+    named sources)."""
+    record = _map_parsed(_recall_or_parse(m, routes, source), routes, collected)
+    if archive is not None:
+        _archive_record(archive, record)
+
+def _recall_or_parse(m: Dict[str, Any], routes: List[str], source: Optional[str] = None):
+    """(memo key, _parse_message result, whether it came from the memo)."""
+    key, hit = _recall(m, routes, source)
+    return key, hit or _parse_message(m, source), hit is not None
+
+def _map_parsed(item, routes: List[str], collected: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a _recall_or_parse result into `collected`, memoizing a freshly parsed body.
+    Returns its archive record."""
+    key, (hdr, text, record), recalled = item
+    _map_message(hdr, text, routes, collected, record["id"])
+    if not recalled:
+        _remember(key, text)
+    return record
+
+def _parse_message(m: Dict[str, Any], source: Optional[str] = None) -> Tuple[Dict[str, str], str, Dict[str, Any]]:
+    """Headers, body text and the inbox archive record of one message."""
+    with _stage("parse", "parse_body"):
+        hdr = _headers(m)
+        body = _parse_body(m.get("payload",{}))
+    return hdr, body["text"], _archive_entry(m, hdr, body["text"], source)
+
+def _archive_entry(m: Dict[str, Any], hdr: Dict[str, str], body_text: str,
+                   source: Optional[str] = None) -> Dict[str, Any]:
+    record = {
+        "headers": hdr, 
+        "snippet": m.get("snippet",""), 
+        "body_text": body_text[:5000]
+    }
+    if source is None:
+        record["id"] = m.get("id")
+    else:
+        record.update(id=f"{source}:{m.get('id')}", source=source)
+    return record
+
+def _archive_record(archive, record: Dict[str, Any]):
+    with _stage("write", "archive"):
+        archive.add(record)
+
+# Built-in mappers a route can name: mapper -> (function, the collection its output is, or
+# None when it returns collection -> items, progress line)
+MAPPERS = {
+    "ceo": (map_ceo_to_scoreboard, "scoreboard", "🎯 Processing CEO summary"),
+    "content": (map_content_to_actions, None, "📝 Processing content digest"),
+    "operations": (map_operational_to_insights, None, "⚙️  Processing operational email"),
+}
+_plugin_mappers: Dict[str, Tuple[Any, Optional[str], str]] = {}
+
+def _mapper(name: str) -> Tuple[Any, Optional[str], str]:
+    """A MAPPERS entry, or one for the "module:function" `name` (imported on first use)."""
+    if name in MAPPERS:
+        return MAPPERS[name]
+    if name not in _plugin_mappers:
+        import importlib
+        module, _, attr = name.partition(":")
+        if not attr:
+            raise ValueError(f"unknown mapper {name!r}: use one of {sorted(MAPPERS)} or module:function")
+        _plugin_mappers[name] = (getattr(importlib.import_module(module), attr), None, f"📨 Processing {attr}")
+    return _plugin_mappers[name]
+
+# Collections whose items record the message they were mapped from, as "message_id" (its
+# archive record id): a backfill skips messages already in them, and --remap replaces them.
+TAGGED = ("actions", "meetings", "insights", "decisions")
+
+def _map_message(hdr: Dict[str, str], text: str, routes: List[str], collected: Dict[str, Any],
+                 msg_id: Optional[str] = None):
+    """Run the mappers a message was routed to, accumulating their outputs into `collected`.
+    With a `msg_id`, TAGGED items are stamped with it."""
+    for route in _routing().routes:
+        if route.name not in routes:
+            continue
+        fn, into, note = _mapper(route.mapper)
+        print(f"{note}: {hdr['subject']}")
+        with _stage("map", fn.__name__):
+            mapped = fn(text)
+        part = {into: mapped} if into else mapped
+        unknown = set(part) - set(collected)
+        if unknown:
+            raise ValueError(f"mapper {route.mapper} returned unknown collections {sorted(unknown)}")
+        if msg_id is not None:
+            part = {k: [{**i, "message_id": msg_id} if isinstance(i, dict) else i for i in v] if k in TAGGED else v
+                    for k, v in part.items()}
+        if part.get("scoreboard"):
+            # dated by this message's own header, so a re-sent summary lands on its new day
+            board = {**part["scoreboard"], "date": _snapshot_day(hdr, part["scoreboard"])}
+            part = {**part, "scoreboard": board, "snapshots": [[board["date"], board]]}
+        _fold_collected(collected, part)
+
+def _snapshot_day(hdr: Dict[str, str], scoreboard: Dict[str, Any]) -> str:
+    """Day a scoreboard snapshot is for, kept as its "date" and filed under in the history:
+    its message's Date header, so backfilled summaries land on their own day, else the day
+    it was mapped."""
     try:
-        msgs = _list_messages(svc, QUERY, max_results=30)
-        print(f"📥 Retrieved {len(msgs)} messages")
-        
-        if not msgs:
-            print("ℹ️  No new messages found")
-            return
+        return parsedate_to_datetime(hdr["date"]).date().isoformat()
+    except (TypeError, ValueError, IndexError):
+        return scoreboard.get("date") or datetime.now().date().isoformat()
 
-        ceo_scoreboard = None
-        collected_actions = []
-        collected_meetings = []
-        collected_insights = []
-        collected_decisions = []
-
-        for m in msgs:
-            hdr = _headers(m)
-            body = _parse_body(m.get("payload",{}))
-            record = {
-                "headers": hdr, 
-                "snippet": m.get("snippet",""), 
-                "body_text": body["text"][:5000]
-            }
-            _save_inbox({**record, "id": m.get("id")}, suffix="msg")
-
-            subj = hdr["subject"].lower()
-            from_addr = hdr["from"].lower()
-            
-            # CEO Summary emails
-            if any(term in subj for term in ["ceo oversight", "ceo summary", "executive summary"]):
-                print(f"🎯 Processing CEO summary: {hdr['subject']}")
-                ceo_scoreboard = map_ceo_to_scoreboard(body["text"])
-            
-            # Content Digest emails
-            if any(term in subj for term in ["content digest", "content report", "marketing summary"]):
-                print(f"📝 Processing content digest: {hdr['subject']}")
-                mapped = map_content_to_actions(body["text"])
-                collected_actions += mapped.get("actions", [])
-                collected_meetings += mapped.get("meetings", [])
-            
-            # Operational emails
-            if any(term in subj for term in ["operations", "workflow", "process", "bottleneck"]):
-                print(f"⚙️  Processing operational email: {hdr['subject']}")
-                mapped = map_operational_to_insights(body["text"])
-                collected_insights += mapped.get("insights", [])
-                collected_decisions += mapped.get("decisions", [])
-
-        # Write aggregated data files with smart merging
-        if ceo_scoreboard:
-            # Merge with existing scoreboard using _deep_fill (non-destructive)
-            path = os.path.join(DATA_DIR, "scoreboard.json")
-            if os.path.exists(path):
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        existing = json.load(f)
-                except:
-                    existing = {}
-            else:
+def _fold_collected(collected: Dict[str, Any], part: Dict[str, Any]):
+    """Add one message's outputs (all or some collections) into `collected`: lists (including
+    the scoreboard snapshots kept for the history) are appended, and the scoreboard with the
+    latest date wins. Gmail lists newest first, so on a tie the one folded first is kept."""
+    for key, items in part.items():
+        if key != "scoreboard":
+            collected[key] += items
+        elif items is not None and (collected["scoreboard"] is None
+                                    or _scoreboard_day(items) > _scoreboard_day(collected["scoreboard"])):
+            collected["scoreboard"] = items
+
+def _scoreboard_day(board: Dict[str, Any]) -> str:
+    return str(board.get("date") or "")[:10]
+
+def _scoreboard_merge(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """The current scoreboard after snapshot `new`: if it is dated on or after `old`, its
+    values win and metrics it left empty (0 or "") keep the old ones; an older snapshot
+    leaves `old` as it is. The full history is in the scoreboard series."""
+    if old and _scoreboard_day(new) < _scoreboard_day(old):
+        return old
+    return _deep_fill(copy.deepcopy(new), old)
+
+def _write_json_files(collected: Dict[str, Any], replace: Container[str] = ()) -> List[str]:
+    """Merge one run's outputs into the JSON data files; returns the collections touched.
+    Items mapped earlier from the messages in `replace` are removed first."""
+    files_updated = []
+
+    # Write aggregated data files with smart merging
+    if collected["scoreboard"]:
+        # Merge over the existing scoreboard; metrics this summary lacks keep their values
+        path = os.path.join(DATA_DIR, "scoreboard.json")
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    existing = json.load(f)
+            except:
                 existing = {}
-            merged = _deep_fill(existing, ceo_scoreboard)
+        else:
+            existing = {}
+        merged = _scoreboard_merge(existing, collected["scoreboard"])
+        if merged is existing:
+            print(f"ℹ️  Kept scoreboard.json: it is newer than the CEO summary of {_scoreboard_day(collected['scoreboard'])}")
+        else:
             _save_json("scoreboard.json", merged)
+            files_updated.append("scoreboard")
+            _current_report().files["scoreboard"] = 1
             print("💾 Updated scoreboard.json from CEO summary (non-destructive merge)")
-        
-        if collected_actions:
-            # Merge with deduplication by title
-            path = os.path.join(DATA_DIR, "actions.json")
-            if os.path.exists(path):
-                try:
-                    with open(path, "r", encoding="utf-8") as f: 
-                        existing = json.load(f)
-                except:
-                    existing = []
-            else:
+    
+    if collected["actions"] or replace:
+        # Merge with deduplication by title
+        path = os.path.join(DATA_DIR, "actions.json")
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f: 
+                    existing = json.load(f)
+            except:
                 existing = []
-            
-            # Dedupe by title
-            titles = {a.get("title","") for a in existing}
-            new_count = 0
-            for a in collected_actions:
-                if a.get("title") not in titles:
-                    existing.append(a)
-                    titles.add(a.get("title"))
-                    new_count += 1
-            
-            _save_json("actions.json", existing)
-            print(f"💾 Added {new_count} new actions to actions.json (deduped)")
-        
-        if collected_meetings:
-            path = os.path.join(DATA_DIR, "meetings.json")
-            existing_meetings = []
-            if os.path.exists(path):
-                try:
-                    with open(path, "r", encoding="utf-8") as f: 
-                        existing_meetings = json.load(f)
-                except:
-                    existing_meetings = []
-            
-            _save_json("meetings.json", existing_meetings + collected_meetings)
-            print(f"💾 Added {len(collected_meetings)} meetings to meetings.json")
+        else:
+            existing = []
+        if replace:
+            kept = [a for a in existing if not (isinstance(a, dict) and a.get("message_id") in replace)]
+            if len(kept) < len(existing):
+                print(f"♻️  Removed {len(existing) - len(kept)} actions mapped earlier from re-mapped messages")
+            existing = kept
         
-        if collected_insights:
-            path = os.path.join(DATA_DIR, "insights.json")
-            existing_insights = []
-            if os.path.exists(path):
-                try:
-                    with open(path, "r", encoding="utf-8") as f: 
-                        existing_insights = json.load(f)
-                except:
-                    existing_insights = []
-            
-            _save_json("insights.json", existing_insights + collected_insights)
-            print(f"💾 Added {len(collected_insights)} insights to insights.json")
-        
-        if collected_decisions:
-            path = os.path.join(DATA_DIR, "decisions.json")
-            existing_decisions = []
-            if os.path.exists(path):
-                try:
-                    with open(path, "r", encoding="utf-8") as f: 
-                        existing_decisions = json.load(f)
-                except:
-                    existing_decisions = []
-            
-            _save_json("decisions.json", existing_decisions + collected_decisions)
-            print(f"💾 Added {len(collected_decisions)} decisions to decisions.json")
+        # Dedupe by title
+        titles = {a.get("title","") for a in existing}
+        new_count = 0
+        for a in collected["actions"]:
+            if a.get("title") not in titles:
+                existing.append(a)
+                titles.add(a.get("title"))
+                new_count += 1
         
+        _save_json("actions.json", existing)
+        files_updated.append("actions")
+        _current_report().files["actions"] = new_count
+        print(f"💾 Added {new_count} new actions to actions.json (deduped)")
+    
+    for name in ("meetings", "insights", "decisions"):
+        dropped = _drop_message_items(name, replace) if replace else 0
+        if dropped:
+            print(f"♻️  Removed {dropped} {name} mapped earlier from re-mapped messages")
+        if collected[name]:
+            _append_items(name, collected[name])
+            files_updated.append(name)
+            _current_report().files[name] = len(collected[name])
+            print(f"💾 Added {len(collected[name])} {name} to {name}.jsonl")
+        elif dropped:
+            files_updated.append(name)
+    
+    for name in ("meetings", "insights", "decisions"):
+        if _compact(name):
+            print(f"🗜️  Compacted {name}.jsonl into {name}.json")
+    return files_updated
+
+def _read_scoreboard() -> Dict[str, Any]:
+    path = os.path.join(DATA_DIR, "scoreboard.json")
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except:
+            pass
+    return {}
+
+def _open_store():
+    """Open the SQLite store, seeding a new database from the existing JSON data files."""
+    from gmail_store import SqliteStore
+    store = SqliteStore(DB_PATH)
+    if store.is_empty():
+        store.import_existing(
+            actions=_read_json_array(os.path.join(DATA_DIR, "actions.json")),
+            collections={name: _read_collection(name) for name in ("meetings", "insights", "decisions")},
+            scoreboard=_read_scoreboard(),
+        )
+        print(f"🗄️  Seeded {DB_PATH} from existing JSON data files")
+    return store
+
+def _sync_store(store, names: Iterable[str]):
+    """Pull into the store what EmailIngestService merged into the JSON files `names` since
+    they were last exported, so exporting them again does not drop it."""
+    names = set(names)
+    added = store.import_missing(
+        _item_id,
+        actions=_read_json_array(os.path.join(DATA_DIR, "actions.json")) if "actions" in names else (),
+        collections={name: _read_collection(name) for name in ("meetings", "insights", "decisions") if name in names},
+        scoreboard=_read_scoreboard() if "scoreboard" in names else None,
+        merge=_scoreboard_merge,
+    )
+    if added:
+        print(f"🗄️  Imported {added} entries added to the JSON data files outside gmail-pull")
+
+def _write_sqlite(collected: Dict[str, Any], replace: Container[str] = ()) -> List[str]:
+    """Write one run's outputs to the SQLite store and re-export the JSON files it changed.
+    Items mapped earlier from the messages in `replace` are removed first."""
+    files_updated = []
+    with _open_store() as store:
+        with _timed("sqlite_sync"):
+            _sync_store(store, [name for name in ("scoreboard", "actions", "meetings", "insights", "decisions")
+                                if collected[name] or (replace and name in TAGGED)])
+        if replace:
+            for name, n in store.remove_messages(replace).items():
+                files_updated.append(name)
+                print(f"♻️  Removed {n} {name} mapped earlier from re-mapped messages")
+        if collected["scoreboard"]:
+            current = store.scoreboard()
+            if store.add_scoreboard(collected["scoreboard"], _scoreboard_merge) == current:
+                print(f"ℹ️  Kept the scoreboard: it is newer than the CEO summary of {_scoreboard_day(collected['scoreboard'])}")
+            else:
+                files_updated.append("scoreboard")
+                _current_report().files["scoreboard"] = 1
+                print("💾 Updated scoreboard from CEO summary (non-destructive merge)")
+        if collected["actions"]:
+            new_count = store.add_actions(collected["actions"])
+            if "actions" not in files_updated:
+                files_updated.append("actions")
+            _current_report().files["actions"] = new_count
+            print(f"💾 Added {new_count} new actions to actions.json (deduped)")
+        for name in ("meetings", "insights", "decisions"):
+            if collected[name]:
+                store.add_items(name, collected[name])
+                if name not in files_updated:
+                    files_updated.append(name)
+                _current_report().files[name] = len(collected[name])
+                print(f"💾 Added {len(collected[name])} {name} to {name}.json")
+        store.export(_save_json, files_updated)
+    return files_updated
+
+def _persist(collected: Dict[str, Any], replace: Container[str] = ()) -> List[str]:
+    if STORE == "sqlite":
+        files_updated = _write_sqlite(collected, replace)
+    else:
+        files_updated = _write_json_files(collected, replace)
+    if collected["snapshots"]:
+        from gmail_series import ScoreboardSeries
+        with _timed("scoreboard_series"):
+            added = ScoreboardSeries(SERIES_DIR).append(collected["snapshots"])
+        files_updated.append("scoreboard_series")
+        _current_report().files["scoreboard_series"] = added
+        print(f"📈 Added {added} scoreboard snapshots to the history")
+    return files_updated
+
+def pull_and_write(svc=None, report: Optional[_RunReport] = None) -> Dict[str, Any]:
+    """Main function to pull emails and update data files.
+    Pass an already-authenticated `svc` to reuse it, with the `report` its authentication was
+    timed in; without one, every GMAIL_SOURCES source is pulled (or the default mailbox).
+    Returns the run report (_RunReport.to_dict), also saved as gmail_last_run.json and folded
+    into the metrics files. Authentication failures, and any failure of a single source, are
+    returned as a failed report; other errors are recorded and re-raised.
+    GMAIL_PROFILE=1 runs it under cProfile (source threads are not profiled)."""
+    report = report or _new_report()
+    _reports.current = report
+    result = None
+    try:
+        result = _profiled(_pull, svc, report) if PROFILE else _pull(svc, report)
+        return result
+    finally:
+        result = result or report.to_dict()
+        with contextlib.suppress(OSError):
+            _save_json("gmail_last_run.json", result)
+            _record_run(result)
+
+def _fetch_and_map(svc, archive, source: Optional[str] = None, label: str = LABEL,
+                   query: str = QUERY) -> Dict[str, Any]:
+    """List, fetch, parse, archive and map one mailbox's new messages. Returns the run state
+    _record_progress needs once the outputs are written: collected outputs, ids, cursor, ledger."""
+    ledger = _load_ledger(source)
+    msgs, cursor = _pull_messages(svc, _load_cursor(source), ledger, label, query)
+    collected = _collected()
+    processed_ids = _process_all(msgs, collected, archive, source)
+    return {"source": source, "collected": collected, "ids": processed_ids, "cursor": cursor, "ledger": ledger,
+            "deferred": _current_report().messages["deferred"]}
+
+def _process_all(msgs: Iterable[Tuple[Dict[str, Any], List[str]]], collected: Dict[str, Any], archive,
+                 source: Optional[str] = None) -> List[str]:
+    """Parse, archive and map (message, routes) pairs into `collected` in the configured mode
+    (in this thread, the async pipeline or the process pool); returns the processed ids."""
+    report = _current_report()
+    if PARSE_PROCS:
+        processed_ids = _process_in_pool(msgs, collected, archive, source)
+    elif PIPELINE == "async":
+        processed_ids = asyncio.run(_pipeline(msgs, collected, archive, source))
+    else:
+        processed_ids = []
+        for m, routes in msgs:
+            processed_ids.append(m["id"])
+            report.route(routes)
+            _process_message(m, routes, collected, archive, source)
+    report.messages["processed"] += len(processed_ids)
+    _flush_memo()
+    return processed_ids
+
+def _record_progress(run: Dict[str, Any]):
+    """Mark a run's messages processed and advance its cursor; only call once its outputs are written.
+    The cursor stays put while messages were deferred, so the next run lists them again."""
+    now = int(datetime.now(timezone.utc).timestamp())
+    for msg_id in run["ids"]:
+        run["ledger"].setdefault(msg_id, now)
+    _save_ledger(run["ledger"], run["source"])
+    if run["cursor"] and not run.get("deferred"): _save_cursor(run["cursor"], run["source"])
+
+def _pull(svc, report: _RunReport) -> Dict[str, Any]:
+    sources = _load_sources() if svc is None else []
+    if sources:
+        return _pull_sources(sources, report)
+
+    print("📧 Starting Gmail pull process...")
+    
+    try:
+        if svc is None:
+            try:
+                svc = _gmail_service()
+                print("✅ Gmail service authenticated successfully")
+            except Exception as e:
+                print(f"❌ Gmail authentication failed: {e}")
+                report.errors.append(f"Gmail authentication failed: {e}")
+                return report.to_dict()
+
+        with _stage("write", "archive"):
+            archive = _open_archive()
+        run = _fetch_and_map(svc, archive)
+        with _stage("write", "archive"):
+            archive.close()
+
+        print(f"📥 Retrieved {len(run['ids'])} messages")
+        if run["deferred"]:
+            print(f"⚠️  {run['deferred']} messages deferred to the next run (Gmail throttling)")
+        if not run["ids"]:
+            with _stage("write", "progress"):
+                _record_progress(run)
+            print("ℹ️  No new messages found")
+            return report.to_dict()
+
+        with _stage("write", "persist"):
+            _persist(run["collected"])
+            # Record progress only once everything above has been written
+            _record_progress(run)
         print("✅ Gmail pull process completed successfully")
+        return report.to_dict()
         
     except Exception as e:
         print(f"❌ Gmail pull failed: {e}")
+        report.errors.append(str(e))
         raise
 
+# ----- staged async pipeline (GMAIL_PIPELINE=async) ----------------------------
+# fetch -> parse -> map -> archive, each stage a coroutine driving one worker thread and
+# connected to the next by a bounded asyncio.Queue. Network waits in the fetch thread overlap
+# with parsing and mapping, while full queues stall upstream stages so at most a few
+# QUEUE_SIZEs of messages are in flight. One thread per stage keeps messages in list order.
+
+_DONE = object()
+
+def _in_report(report: _RunReport, fn, *args):
+    """Run fn(*args) on an executor thread, recording into the pipeline's report."""
+    _reports.current = report
+    return fn(*args)
+
+async def _pipeline(msgs: Iterable[Tuple[Dict[str, Any], List[str]]], collected: Dict[str, Any], archive,
+                    source: Optional[str] = None) -> List[str]:
+    """Process (message, routes) pairs like the loop in _process_all; returns the processed ids."""
+    loop = asyncio.get_running_loop()
+    report = _current_report()
+    fetched: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+    parsed: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+    to_archive: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+    processed_ids: List[str] = []
+    pools = {name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"gmail-{name}")
+             for name in ("fetch", "parse", "map", "write")}
+
+    def run(stage: str, fn, *args):
+        return loop.run_in_executor(pools[stage], _in_report, report, fn, *args)
+
+    async def fetch():
+        it = iter(msgs)
+        while True:
+            item = await run("fetch", next, it, _DONE)  # blocking Gmail batch calls happen here
+            await fetched.put(item)
+            if item is _DONE:
+                return
+
+    async def parse():
+        while (item := await fetched.get()) is not _DONE:
+            m, routes = item
+            await parsed.put((m["id"], routes, await run("parse", _recall_or_parse, m, routes, source)))
+        await parsed.put(_DONE)
+
+    async def map_():
+        while (item := await parsed.get()) is not _DONE:
+            msg_id, routes, parsed_item = item
+            processed_ids.append(msg_id)
+            report.route(routes)
+            await to_archive.put(await run("map", _map_parsed, parsed_item, routes, collected))
+        await to_archive.put(_DONE)
+
+    async def write():
+        while (record := await to_archive.get()) is not _DONE:
+            if archive is not None:
+                await run("write", _archive_record, archive, record)
+
+    try:
+        await asyncio.gather(fetch(), parse(), map_(), write())
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+    return processed_ids
+
+# ----- process-pool parse/map (GMAIL_PARSE_PROCS) ------------------------------
+# html2text and the mapper regexes are CPU-bound, so with the GIL one process parses one
+# message at a time. With GMAIL_PARSE_PROCS set, _process_all keeps fetching in this process
+# and ships each message's id, snippet and payload (still base64, as Gmail returned it) to a
+# ProcessPoolExecutor. Workers send back only the archive record, the mapper outputs and
+# their timings. Results are folded in list order, and at most PARSE_WINDOW messages are
+# in flight. The pool relies on the module being importable by name in the workers: run
+# gmail-pull.py as a script, or register it in sys.modules when loading it another way.
+
+_op_sink: Optional[List[Tuple[str, str, float]]] = None  # set in pool workers: op timings are shipped back
+
+def _init_parse_worker():
+    global _op_sink
+    _op_sink = []
+    sys.stdout = sys.stderr  # in worker mode the inherited stdout is the reply channel
+
+def _parse_and_map(msg: Dict[str, Any], routes: List[str], source: Optional[str], memoize: bool):
+    """Pool task: parse and map one message. Returns (archive record, mapper outputs,
+    report stages, op timings, body text to memoize or None) for the parent to fold in."""
+    report = _new_report()
+    del _op_sink[:]
+    part = _collected()
+    hdr, text, record = _parse_message(msg, source)
+    _map_message(hdr, text, routes, part, record["id"])
+    return record, part, report.stages, list(_op_sink), text if memoize else None
+
+def _process_in_pool(msgs: Iterable[Tuple[Dict[str, Any], List[str]]], collected: Dict[str, Any], archive,
+                     source: Optional[str] = None) -> List[str]:
+    """Process (message, routes) pairs like the loop in _process_all; returns the processed ids."""
+    report = _current_report()
+    processed_ids: List[str] = []
+    window: Deque[Tuple[str, List[str], Optional[str], Any]] = deque()
+
+    def fold_oldest():
+        msg_id, routes, key, future = window.popleft()
+        record, part, stages, ops, text = future.result()
+        if text is not None:
+            _remember(key, text)
+        processed_ids.append(msg_id)
+        report.route(routes)
+        report.add_stages(stages)
+        for stage, op, seconds in ops:
+            _registry().observe("gmail_pull_op_seconds", seconds, stage=stage, op=op)
+        _fold_collected(collected, part)
+        if archive is not None:
+            _archive_record(archive, record)
+
+    with ProcessPoolExecutor(max_workers=PARSE_PROCS, initializer=_init_parse_worker) as pool:
+        for m, routes in msgs:
+            key, hit = _recall(m, routes, source)
+            if hit is not None:  # memo hits skip parsing, so they are mapped in this process
+                hdr, text, record = hit
+                part = _collected()
+                _map_message(hdr, text, routes, part, record["id"])
+                future = Future()
+                future.set_result((record, part, {}, [], None))
+                window.append((m["id"], routes, None, future))
+            else:
+                slim = {"id": m["id"], "snippet": m.get("snippet", ""), "payload": m.get("payload", {})}
+                window.append((m["id"], routes, key,
+                               pool.submit(_parse_and_map, slim, routes, source, key is not None)))
+            if len(window) >= PARSE_WINDOW:
+                fold_oldest()
+        while window:
+            fold_oldest()
+    return processed_ids
+
+# ----- multiple sources --------------------------------------------------------
+# GMAIL_SOURCES lists mailbox/label pairs to pull in one run, e.g.
+#   [{"name": "ceo", "mailbox": "ceo@complianceworxs.com", "label": "cw/daily-reports"},
+#    {"name": "ops", "mailbox": "ops@complianceworxs.com", "query": "label:ops-alerts newer_than:2d",
+#     "refresh_token_env": "OAUTH_REFRESH_TOKEN_OPS"}]
+# Each source authenticates separately (service mode impersonates `mailbox`; oauth mode reads
+# the refresh token from `refresh_token_env`) and keeps its own cursor and ledger files.
+# Sources are fetched and mapped concurrently on up to SOURCE_WORKERS threads, then merged
+# in configuration order and written once, so the data files don't depend on which
+# mailbox answered first.
+
+_source_services: Dict[str, Any] = {}  # source name -> authenticated client, reused across worker pulls
+
+def _load_sources() -> List[Dict[str, Any]]:
+    """Parsed GMAIL_SOURCES (inline JSON or a file path); empty for the single default source."""
+    if not SOURCES.strip():
+        return []
+    if SOURCES.lstrip().startswith("["):
+        raw = json.loads(SOURCES)
+    else:
+        with open(SOURCES, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    sources, names = [], set()
+    for src in raw:
+        name = str(src.get("name", ""))
+        if not re.fullmatch(r"[A-Za-z0-9_-]+", name) or name in names:
+            raise RuntimeError(f"GMAIL_SOURCES: each source needs a unique name of letters, digits, - or _ (got {name!r})")
+        names.add(name)
+        label = src.get("label", LABEL)
+        sources.append({
+            "name": name,
+            "mailbox": src.get("mailbox"),
+            "label": label,
+            "query": src.get("query", f'label:"{label}" newer_than:2d'),
+            "refresh_token": os.getenv(src["refresh_token_env"]) if src.get("refresh_token_env") else None,
+        })
+    return sources
+
+def _pull_source(source: Dict[str, Any], archive) -> Tuple[Optional[Dict[str, Any]], _RunReport]:
+    """Fetch and map one source on the calling thread, recording into a report of its own.
+    Returns (run, report); run is None when the source failed, with the error in its report."""
+    report = _new_report()
+    name = source["name"]
+    try:
+        svc = _source_services.get(name)
+        if svc is None:
+            svc = _source_services[name] = _gmail_service(source["mailbox"], source["refresh_token"])
+        return _fetch_and_map(svc, archive, name, source["label"], source["query"]), report
+    except Exception as e:
+        _source_services.pop(name, None)  # re-authenticate on the next pull
+        print(f"❌ Gmail pull failed for source {name}: {e}")
+        report.errors.append(f"{name}: {e}")
+        return None, report
+    finally:
+        report.stop()
+
+def _merge_collected(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-source outputs in the given order: lists concatenate, and the latest-dated
+    scoreboard wins (the first source's on a tie) with the others only filling its gaps (as
+    _deep_fill merges)."""
+    merged = _collected()
+    for part in parts:
+        if part["scoreboard"]:
+            if merged["scoreboard"] is None:
+                merged["scoreboard"] = part["scoreboard"]
+            elif _scoreboard_day(part["scoreboard"]) > _scoreboard_day(merged["scoreboard"]):
+                merged["scoreboard"] = _deep_fill(copy.deepcopy(part["scoreboard"]), merged["scoreboard"])
+            else:
+                merged["scoreboard"] = _deep_fill(merged["scoreboard"], part["scoreboard"])
+        for key in ("snapshots", "actions", "meetings", "insights", "decisions"):
+            merged[key] += part[key]
+    return merged
+
+def _pull_sources(sources: List[Dict[str, Any]], report: _RunReport) -> Dict[str, Any]:
+    print(f"📧 Starting Gmail pull for {len(sources)} sources...")
+    with _stage("write", "archive"):
+        archive = _open_archive()
+    with ThreadPoolExecutor(max_workers=min(SOURCE_WORKERS, len(sources)), thread_name_prefix="gmail-source") as pool:
+        results = list(pool.map(lambda src: _pull_source(src, archive), sources))  # in configuration order
+    with _stage("write", "archive"):
+        archive.close()
+
+    runs = []
+    for source, (run, sub) in zip(sources, results):
+        report.merge(source["name"], sub)
+        if run is not None:
+            runs.append(run)
+    report.mode = "multi"
+
+    print(f"📥 Retrieved {report.messages['processed']} messages from {len(runs)}/{len(sources)} sources")
+    with _stage("write", "persist"):
+        if any(run["ids"] for run in runs):
+            _persist(_merge_collected([run["collected"] for run in runs]))
+        for run in runs:
+            _record_progress(run)
+    if report.errors:
+        print(f"⚠️  Gmail pull finished with errors in {len(sources) - len(runs)} source(s)")
+    else:
+        print("✅ Gmail pull process completed successfully")
+    return report.to_dict()
+
+# ----- historical backfill -----------------------------------------------------
+# `--backfill START END` ingests LABEL between two dates (UTC, both inclusive), e.g. history
+# from before the pulls started. The range is listed in BACKFILL_WINDOW_DAYS windows, oldest
+# first, with `after:`/`before:` epoch bounds instead of QUERY's newer_than. Each window goes
+# through the same parse/map path and _persist merge as pull_and_write, adding what it
+# processed to the ledger and never moving the history cursor. Messages already ingested are
+# skipped: ones in the ledger, and ones any TAGGED item carries as its "message_id". The
+# ledger forgets ids after LEDGER_DAYS (and the archive after ARCHIVE_DAYS), but the items stay,
+# so a range pulled long ago is not written twice. Messages that produced no items (e.g. CEO
+# summaries) may be mapped again; their snapshots are already in the series, which skips them.
+# `--remap` maps every message in the range again instead, e.g. after a mapper change: items
+# mapped earlier from those messages are removed and the new ones written in their place.
+# Backfilled CEO summaries only go to the scoreboard series: scoreboard.json stays the latest
+# pulled one.
+# The checkpoint in gmail_backfill.json advances only after a window is written, so an
+# interrupted backfill started again with the same arguments resumes at the first window
+# that was not finished. Its scheduler paces calls at BACKFILL_QUOTA units/sec rather than
+# QUOTA_UNITS, leaving headroom for the scheduled pull on the same mailbox; with
+# BACKFILL_MAX_UNITS set the run also stops at the first window boundary past that many
+# units, and a window with deferred messages stops it before anything is written, both to
+# resume on a later run.
+
+def _backfill_windows(first: datetime, stop: datetime, days: float) -> List[Tuple[datetime, datetime]]:
+    step = timedelta(days=days)
+    windows = []
+    while first < stop:
+        windows.append((first, min(first + step, stop)))
+        first += step
+    return windows
+
+def _load_backfill_checkpoint() -> Dict[str, Any]:
+    try:
+        with open(os.path.join(DATA_DIR, BACKFILL_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _ingested_ids(ledger: Dict[str, int]) -> Set[str]:
+    """Ids of the messages already ingested: the ledger's, and every TAGGED item's "message_id"."""
+    ids = set(ledger)
+    if STORE == "sqlite":
+        with _open_store() as store:
+            ids |= store.message_ids()
+        return ids
+    for name in TAGGED:
+        items = _read_json_array(os.path.join(DATA_DIR, "actions.json")) if name == "actions" else _read_collection(name)
+        ids.update(i["message_id"] for i in items if isinstance(i, dict) and i.get("message_id"))
+    return ids
+
+def backfill(start: str, end: str, svc=None, label: str = LABEL, restart: bool = False,
+             remap: bool = False) -> Dict[str, Any]:
+    """Ingest `label` from `start` through `end` (YYYY-MM-DD, UTC), resuming a matching
+    checkpoint unless `restart`. Messages already ingested are skipped, or with `remap` mapped
+    again to replace their earlier items. Returns the run report, whose `backfill` entry says
+    how far it got; it is folded into the metrics files but not saved as gmail_last_run.json."""
+    report = _new_report()
+    report.mode = "backfill"
+    first = datetime.strptime(start, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    stop = datetime.strptime(end, "%Y-%m-%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+    windows = _backfill_windows(first, stop, BACKFILL_WINDOW_DAYS)
+    key = {"label": label, "start": start, "end": end, "window_days": BACKFILL_WINDOW_DAYS, "remap": remap}
+    checkpoint = _load_backfill_checkpoint()
+    if restart or checkpoint.get("key") != key:
+        checkpoint = {"key": key, "next": first.isoformat(), "windows_done": 0, "messages": 0}
+    resume_at = datetime.fromisoformat(checkpoint["next"])
+    pending = [w for w in windows if w[0] >= resume_at]
+    if len(pending) < len(windows):
+        print(f"↩️  Resuming backfill at {resume_at:%Y-%m-%d} ({len(windows) - len(pending)}/{len(windows)} windows done)")
+
+    if pending and svc is None:
+        try:
+            svc = _gmail_service()
+        except Exception as e:
+            print(f"❌ Gmail authentication failed: {e}")
+            report.errors.append(f"Gmail authentication failed: {e}")
+            pending = []
+
+    previous = _schedulers.get(svc) if svc is not None else None
+    if svc is not None:
+        _schedulers[svc] = _new_scheduler(BACKFILL_QUOTA)
+    archive = None
+    try:
+        if pending:
+            with _stage("write", "archive"):
+                archive = _open_archive()
+            ledger = _load_ledger()
+            ingested = set() if remap else _ingested_ids(ledger)
+        for lo, hi in pending:
+            if BACKFILL_MAX_UNITS and report.quota["units"] >= BACKFILL_MAX_UNITS:
+                print(f"⏸️  Quota budget of {BACKFILL_MAX_UNITS} units spent; run again to resume at {lo:%Y-%m-%d}")
+                break
+            query = f'label:"{label}" after:{int(lo.timestamp())} before:{int(hi.timestamp())}'
+            msgs = _iter_routed(svc, _unprocessed(_iter_message_ids(svc, query), ingested))
+            collected = _collected()
+            deferred = report.messages["deferred"]
+            ids = _process_all(msgs, collected, archive)
+            if report.messages["deferred"] > deferred:
+                # Writing part of a window would duplicate its items when the window is redone
+                report.errors.append(f"Gmail kept throttling in the window from {lo:%Y-%m-%d}; "
+                                     f"run the backfill again to resume there")
+                print(f"⏸️  {report.errors[-1]}")
+                break
+            with _stage("write", "persist"):
+                if ids:
+                    collected["scoreboard"] = None  # history only; see above
+                    _persist(collected, replace=set(ids) if remap else ())
+                _record_progress({"source": None, "collected": collected, "ids": ids, "cursor": {}, "ledger": ledger})
+                checkpoint.update(next=hi.isoformat(), windows_done=checkpoint["windows_done"] + 1,
+                                  messages=checkpoint["messages"] + len(ids))
+                _save_json(BACKFILL_FILE, {**checkpoint, "updated_at": datetime.now(timezone.utc).isoformat()})
+            print(f"📦 Backfilled {lo:%Y-%m-%d} → {hi:%Y-%m-%d}: {len(ids)} messages")
+    except Exception as e:
+        print(f"❌ Gmail backfill failed: {e}")
+        report.errors.append(str(e))
+        raise
+    finally:
+        if archive is not None:
+            with _stage("write", "archive"):
+                archive.close()
+        report.backfill = {"start": start, "end": end, "windows": len(windows),
+                           "windows_done": checkpoint["windows_done"], "next": checkpoint["next"],
+                           "complete": checkpoint["windows_done"] >= len(windows)}
+        if svc is not None:
+            if previous is not None:
+                _schedulers[svc] = previous
+            else:
+                _schedulers.pop(svc, None)
+        result = report.to_dict()
+        with contextlib.suppress(OSError):
+            _record_run(result)
+    if result["backfill"]["complete"] and not result["errors"]:
+        print("✅ Gmail backfill completed successfully")
+    return result
+
+# ----- scoreboard history ------------------------------------------------------
+
+def scoreboard_series(metric: Optional[str] = None, period: Optional[str] = None, agg: str = "last",
+                      start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+    """Scoreboard history for trend charts: `metric`'s snapshots (or its "week"/"month" `agg`
+    rollup) between ISO dates `start` and `end`, as [day, value] points. Without a metric,
+    the metrics recorded. Raises KeyError for an unknown metric."""
+    from gmail_series import ScoreboardSeries
+    series = ScoreboardSeries(SERIES_DIR)
+    if metric is None:
+        return {"metrics": series.metrics(), "snapshots": len(series)}
+    points = series.rollup(metric, period, agg, start, end) if period else series.points(metric, start, end)
+    return {"metric": metric, "period": period, "agg": agg if period else None, "points": points}
+
+def _series_args(query: Dict[str, Any]) -> Dict[str, Any]:
+    """scoreboard_series' arguments from a JSON series query (a worker command or --series)."""
+    return {k: query[k] for k in ("metric", "period", "agg", "start", "end") if query.get(k) is not None}
+
+# ----- worker mode -------------------------------------------------------------
+
+def serve_worker(stdin=sys.stdin, stdout=sys.stdout):
+    """
+    Long-lived mode for EmailIngestService: read one JSON command per line from stdin and
+    answer each with one JSON line on stdout, keeping the authenticated Gmail service warm
+    between pulls. Commands: {"id": 1, "cmd": "pull" | "status" | "series" | "shutdown"}; a
+    series command carries scoreboard_series' arguments as fields.
+    A pull's result is its run report; progress prints go to stderr so stdout carries only replies.
+    """
+    state = {"svc": None, "started_at": datetime.now(timezone.utc).isoformat(), "pulls": 0, "last_pull_at": None,
+             "last_run": None}
+    if METRICS_PORT:
+        _registry().serve(METRICS_PORT)
+        print(f"📈 Serving metrics on http://127.0.0.1:{METRICS_PORT}/metrics", file=sys.stderr)
+
+    def reply(req_id, ok: bool, **fields):
+        stdout.write(json.dumps({"id": req_id, "ok": ok, **fields}) + "\n")
+        stdout.flush()
+
+    for line in iter(stdin.readline, ""):
+        if not line.strip():
+            continue
+        try:
+            req = json.loads(line)
+            req_id, cmd = req.get("id"), req.get("cmd")
+        except (ValueError, AttributeError) as e:
+            reply(None, False, error=f"Invalid command: {e}")
+            continue
+
+        if cmd == "pull":
+            started = time.perf_counter()
+            report = _new_report()
+            try:
+                with contextlib.redirect_stdout(sys.stderr):
+                    if state["svc"] is None and not _load_sources():  # sources keep their own clients
+                        try:
+                            state["svc"] = _gmail_service()
+                        except Exception as e:
+                            report.errors.append(f"Gmail authentication failed: {e}")
+                            _record_run(report.to_dict())
+                            raise
+                        print("✅ Gmail service authenticated successfully")
+                    result = pull_and_write(state["svc"], report)
+                state["pulls"] += 1
+                state["last_pull_at"] = datetime.now(timezone.utc).isoformat()
+            except Exception as e:
+                state["svc"] = None  # re-authenticate on the next pull
+                result = report.to_dict()
+            state["last_run"] = {k: result[k] for k in ("ok", "finished_at", "messages_processed", "wall_ms")}
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            if result["ok"]:
+                reply(req_id, True, result=result, elapsed_ms=elapsed_ms)
+            else:
+                reply(req_id, False, error="; ".join(result["errors"]), result=result, elapsed_ms=elapsed_ms)
+        elif cmd == "status":
+            reply(req_id, True, result={"pid": os.getpid(),
+                                        "authenticated": state["svc"] is not None or bool(_source_services),
+                                        **{k: v for k, v in state.items() if k != "svc"}})
+        elif cmd == "series":
+            try:
+                reply(req_id, True, result=scoreboard_series(**_series_args(req)))
+            except (KeyError, ValueError) as e:
+                reply(req_id, False, error=f"Invalid series query: {e}")
+        elif cmd == "shutdown":
+            reply(req_id, True)
+            return
+        else:
+            reply(req_id, False, error=f"Unknown command: {cmd}")
+
 if __name__ == "__main__":
-    pull_and_write()
\ No newline at end of file
+    if "--worker" in sys.argv[1:]:
+        serve_worker()
+    elif "--compact" in sys.argv[1:]:
+        _compact_all()
+    elif "--backfill" in sys.argv[1:]:
+        # --backfill START END [--restart] [--remap]; see "historical backfill" above
+        i = sys.argv.index("--backfill")
+        result = backfill(*sys.argv[i + 1:i + 3], restart="--restart" in sys.argv[1:], remap="--remap" in sys.argv[1:])
+        sys.exit(0 if result["ok"] else 1)
+    elif "--series" in sys.argv[1:]:
+        # --series [METRIC [week|month [AGG]]], or --series '<query>' with a worker series
+        # command's JSON fields (EmailIngestService with GMAIL_PULL_WORKER=0); JSON on stdout
+        i = sys.argv.index("--series")
+        args = sys.argv[i + 1:i + 4]
+        try:
+            if args and args[0].lstrip().startswith("{"):
+                result = scoreboard_series(**_series_args(json.loads(args[0])))
+            else:
+                result = scoreboard_series(*args)
+        except (KeyError, ValueError) as e:
+            print(f"Invalid series query: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(result))
+    elif "--export" in sys.argv[1:]:
+        with _open_store() as store:
+            _sync_store(store, ["scoreboard", "actions", "meetings", "insights", "decisions"])
+            store.export(_save_json)
+    elif "--report" in sys.argv[1:]:
+        # One JSON run report on stdout (progress goes to stderr), for EmailIngestService
+        report = _new_report()
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                result = pull_and_write(report=report)
+        except Exception:
+            result = report.to_dict()
+        print(json.dumps(result))
+        sys.exit(0 if result["ok"] else 1)
+    else:
+        pull_and_write()
\ No newline at end of file
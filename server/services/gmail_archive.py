@@ -0,0 +1,184 @@
+# gmail_archive.py
+"""
+Inbox archive for gmail-pull.py, replacing one pretty-printed JSON file per message per run.
+
+Records are appended to gzip-compressed JSONL segments under DATA_DIR/inbox/segments/. Each
+record is its own gzip member, so a segment is still a valid .jsonl.gz (`zcat` reads it) and
+any record can be read back by seeking to its offset. index.json maps a record key (Gmail
+message id, or a body hash for messages without one) to (segment, offset, length, archived_at):
+messages already archived are skipped, and lookups are one dict hit plus one read. Records
+written after the last saved index are re-indexed from the segment tail on the next open.
+
+Segments roll over at `segment_bytes`; whole segments whose newest record is older than
+`retention_days` are deleted together with their index entries.
+"""
+import gzip, hashlib, json, os, threading, time, zlib
+from typing import Any, Dict, Iterator, Optional
+
+INDEX_FILE = "index.json"
+
+
+def record_key(record: Dict[str, Any]) -> str:
+    """Gmail message id, or a hash of the body for records without one."""
+    if record.get("id"):
+        return str(record["id"])
+    return "sha256:" + hashlib.sha256(record.get("body_text", "").encode("utf-8")).hexdigest()
+
+
+class InboxArchive:
+    def __init__(self, root: str, segment_bytes: int = 4 * 1024 * 1024, retention_days: float = 90):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.retention_days = retention_days
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()  # add() may be called from several source threads
+        self._dirty = False
+        self._load_index()
+        self._recover()
+
+    def __enter__(self) -> "InboxArchive":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    # --- index --------------------------------------------------------------------
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.root, INDEX_FILE), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        # segment name -> {"end": indexed byte length, "newest": epoch of its last record}
+        self.segments: Dict[str, Dict[str, int]] = index.get("segments", {})
+        # record key -> [segment, offset, length, archived_at]
+        self.entries: Dict[str, list] = index.get("entries", {})
+
+    def _save_index(self):
+        path = os.path.join(self.root, INDEX_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"segments": self.segments, "entries": self.entries}, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+        self._dirty = False
+
+    def _recover(self):
+        """Index records appended after the last saved index (a run that died before close(),
+        or a lost index.json) and cut off a torn record left by an interrupted write."""
+        for name in sorted(os.listdir(self.root)):
+            if not name.endswith(".jsonl.gz"):
+                continue
+            path = os.path.join(self.root, name)
+            seg = self.segments.setdefault(name, {"end": 0, "newest": 0})
+            if os.path.getsize(path) == seg["end"]:
+                continue
+            with open(path, "rb") as f:
+                f.seek(seg["end"])
+                data = f.read()
+            mtime = int(os.path.getmtime(path))
+            pos = 0
+            while pos < len(data):
+                d = zlib.decompressobj(wbits=31)
+                try:
+                    record = json.loads(d.decompress(data[pos:]))
+                except (zlib.error, ValueError):
+                    break
+                if not d.eof:
+                    break
+                length = len(data) - pos - len(d.unused_data)
+                self.entries.setdefault(record_key(record), [name, seg["end"] + pos, length, mtime])
+                pos += length
+            if pos < len(data):
+                with open(path, "r+b") as f:
+                    f.truncate(seg["end"] + pos)
+            seg["end"] += pos
+            seg["newest"] = max(seg["newest"], mtime)
+            if seg["end"] == 0:
+                os.remove(path)
+                del self.segments[name]
+            self._dirty = True
+
+    # --- writes -------------------------------------------------------------------
+
+    def _active_segment(self, size: int) -> str:
+        if self.segments:
+            name = max(self.segments)
+            if self.segments[name]["end"] + size <= self.segment_bytes:
+                return name
+            seq = int(name.split("-")[1].split(".")[0]) + 1
+        else:
+            seq = 1
+        name = f"seg-{seq:06d}.jsonl.gz"
+        self.segments[name] = {"end": 0, "newest": 0}
+        return name
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """Append `record` unless its key is already archived; returns whether it was written."""
+        key = record_key(record)
+        if key in self.entries:
+            return False
+        blob = gzip.compress((json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8"), mtime=0)
+        with self._lock:
+            return self._append(key, blob)
+
+    def _append(self, key: str, blob: bytes) -> bool:
+        if key in self.entries:
+            return False
+        name = self._active_segment(len(blob))
+        seg = self.segments[name]
+        with open(os.path.join(self.root, name), "ab") as f:
+            f.write(blob)
+        now = int(time.time())
+        self.entries[key] = [name, seg["end"], len(blob), now]
+        seg["end"] += len(blob)
+        seg["newest"] = now
+        self._dirty = True
+        return True
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete whole segments past retention (never the active one); returns how many."""
+        cutoff = (now if now is not None else time.time()) - self.retention_days * 86400
+        active = max(self.segments) if self.segments else None
+        expired = {name for name, seg in self.segments.items() if name != active and seg["newest"] < cutoff}
+        if not expired:
+            return 0
+        for name in expired:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+            del self.segments[name]
+        self.entries = {k: e for k, e in self.entries.items() if e[0] not in expired}
+        self._dirty = True
+        return len(expired)
+
+    def close(self):
+        """Prune expired segments and persist the index."""
+        self.prune()
+        if self._dirty:
+            self._save_index()
+
+    # --- reads --------------------------------------------------------------------
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        name, offset, length, _ = entry
+        with open(os.path.join(self.root, name), "rb") as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(length)))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Every archived record, oldest segment first."""
+        for name in sorted(self.segments):
+            with gzip.open(os.path.join(self.root, name), "rt", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
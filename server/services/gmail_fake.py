@@ -0,0 +1,414 @@
+# gmail_fake.py
+"""
+In-process stand-in for the Gmail API client returned by `_gmail_service` in gmail-pull.py.
+
+Implements just enough of `svc.users().messages()` and batch HTTP requests to run the
+pull pipeline offline. Every HTTP round-trip sleeps `latency` seconds and is counted in
+`svc.round_trips`, so fetch strategies can be compared without a Google account. List
+queries honour `after:<epoch>` / `before:<epoch>` against each message's internalDate and
+ignore every other search term.
+
+`quota` (units/second, charged per call as Gmail does) and `throttle_rate` (the chance any
+call is rejected regardless) make the fake answer like a throttled mailbox: the call, or the
+item inside a batch, fails with 429 rateLimitExceeded and is counted in `svc.throttled`.
+
+    svc = FakeGmailService([make_message("m1", "CEO Summary", "Autonomy: 92%")], latency=0.05)
+
+SyntheticCorpus generates a reproducible mailbox of CEO summaries, content digests,
+operations emails and unrouted mail with realistic MIME nesting and sizes, one message at
+a time, so benchmarks can serve 100k messages without holding them in memory.
+"""
+import base64, functools, json, random, re, time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+LABEL_ID = "Label_1"
+LABEL_NAME = "cw/daily-reports"
+
+
+def _b64(s: str) -> str:
+    return base64.urlsafe_b64encode(s.encode("utf-8")).decode("ascii")
+
+
+def _not_found(what: str) -> HttpError:
+    return HttpError(httplib2.Response({"status": 404}), f"Requested entity was not found: {what}".encode())
+
+
+def make_message(msg_id: str, subject: str, body: str, mime: str = "text/plain",
+                 sender: str = "reports@complianceworxs.com", date: str = "Mon, 1 Jan 2024 09:00:00 +0000",
+                 history_id: int = 1, label_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Build a Gmail `format=full` message resource with a single body part."""
+    payload = {"mimeType": mime, "body": {"size": len(body), "data": _b64(body)}}
+    return _resource(msg_id, subject, payload, body[:100], sender, date, history_id, label_ids)
+
+
+def make_multipart(msg_id: str, subject: str, text: Optional[str], html: Optional[str],
+                   attachments: Sequence[Tuple[str, str, int]] = (), **kwargs) -> Dict[str, Any]:
+    """
+    Build a `format=full` message the way mail clients send reports: a multipart/alternative
+    of whichever of `text` / `html` are given, wrapped in multipart/mixed together with
+    (filename, mimeType, size) attachment stubs when there are any.
+    """
+    bodies = [_part("text/plain", text) if text is not None else None,
+              _part("text/html", html) if html is not None else None]
+    bodies = [b for b in bodies if b]
+    payload = bodies[0] if len(bodies) == 1 else {"mimeType": "multipart/alternative", "body": {"size": 0},
+                                                  "parts": bodies}
+    if attachments:
+        stubs = [{"mimeType": mime, "filename": name,
+                  "body": {"size": size, "attachmentId": f"att-{msg_id}-{n}"}}
+                 for n, (name, mime, size) in enumerate(attachments)]
+        payload = {"mimeType": "multipart/mixed", "body": {"size": 0}, "parts": [payload, *stubs]}
+    return _resource(msg_id, subject, payload, (text or html or "")[:100], **kwargs)
+
+
+def _part(mime: str, body: str) -> Dict[str, Any]:
+    return {"mimeType": mime, "headers": [{"name": "Content-Type", "value": f'{mime}; charset="UTF-8"'}],
+            "body": {"size": len(body), "data": _b64(body)}}
+
+
+def _resource(msg_id: str, subject: str, payload: Dict[str, Any], snippet: str,
+              sender: str = "reports@complianceworxs.com", date: str = "Mon, 1 Jan 2024 09:00:00 +0000",
+              history_id: int = 1, label_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    payload["headers"] = [
+        {"name": "From", "value": sender},
+        {"name": "To", "value": "cos@complianceworxs.com"},
+        {"name": "Subject", "value": subject},
+        {"name": "Date", "value": date},
+    ] + payload.get("headers", [])
+    return {
+        "id": msg_id,
+        "threadId": msg_id,
+        "historyId": str(history_id),
+        "internalDate": str(int(parsedate_to_datetime(date).timestamp() * 1000)),
+        "labelIds": label_ids if label_ids is not None else [LABEL_ID],
+        "snippet": snippet,
+        "payload": payload,
+    }
+
+
+# ----- synthetic corpus --------------------------------------------------------
+
+_FILLER = [
+    "Pipeline review covered the week's inbound and nurture sequences.",
+    "Weekly cohort retention held steady across tiers, with no churn spike after the pricing page test.",
+    "Team notes: nothing blocking, two items carried over from the previous cycle.",
+    "Regulatory watch: no new guidance published this cycle; the audit calendar is unchanged.",
+    "Support volume was within forecast and first-response time stayed under the SLA.",
+    "Partner referrals contributed a small but steady share of qualified trials.",
+]
+_THEMES = ["OpenAI critique", "Validation shortcuts that fail audits", "CSV evidence packs", "Part 11 myths"]
+_STYLE = "<style>body{font-family:Arial,sans-serif}td{padding:4px 8px;border:1px solid #ddd}.k{color:#555}</style>"
+
+
+def _ceo_lines(rng: random.Random, i: int) -> List[str]:
+    return [
+        f"Net New MRR: ${rng.randint(100, 5000):,} (target $1,200)",
+        f"Autonomy: {rng.randint(70, 99)}%",
+        f"Quiz\u2192Paid: {rng.uniform(2, 12):.1f}%",
+        f"LinkedIn ER: +{rng.randint(1, 30)}%",
+        f"Email CTR: +{rng.randint(1, 20)}%",
+        f'Top theme: "{rng.choice(_THEMES)}"',
+        f"Conversions: {rng.randint(1, 9)} paid (${rng.randint(100, 2000)} influenced)",
+        f"Risk: High {rng.randint(0, 4)} \u2022 Medium {rng.randint(0, 6)} \u2022 Next deadline {rng.randint(1, 48)}h",
+        f"Risk score {rng.randint(20, 95)}",
+        f"MTTR {rng.uniform(1, 9):.1f}m",
+        f"Upsells: ${rng.randint(0, 3000):,}",
+    ]
+
+
+def _content_lines(rng: random.Random, i: int) -> List[str]:
+    return [
+        f'Top Piece: "{rng.choice(_THEMES)} #{i}"',
+        f"Conversions: {rng.randint(0, 9)} paid (${rng.randint(100, 2000)} influenced)",
+        f"Persona: {rng.choice(['VS 3x > RL', 'Architect lagging', 'RL steady'])}",
+        f"LinkedIn ER: +{rng.randint(1, 30)}%",
+        f"Email CTR: +{rng.randint(1, 20)}%",
+        *(f"Action: Follow up on digest {i} item {n}." for n in range(rng.randint(0, 3))),
+    ]
+
+
+_rng = random.Random(0)
+_LOG_LINES = [f"[{n:05d}] workflow step {_rng.randint(1, 40)} completed in {_rng.randint(1, 900)}ms"
+              for n in range(4000)]  # sliced per message: generating log lines one by one dominates otherwise
+
+
+def _ops_lines(rng: random.Random, i: int) -> List[str]:
+    start = rng.randrange(2000)
+    return [f"Bottleneck: {rng.choice(['invoice approvals', 'QA sign-off', 'vendor onboarding'])} queue #{i}",
+            *_LOG_LINES[start:start + rng.randint(50, 2000)]]
+
+
+# kind -> (share of the corpus, subject template, signal-line generator)
+KINDS = {
+    "ceo": (0.2, "CEO Summary \u2014 day {i}", _ceo_lines),
+    "content": (0.3, "Content Digest #{i}", _content_lines),
+    "operations": (0.2, "Operations: workflow report {i}", _ops_lines),
+    "other": (0.3, "Weekly newsletter {i}", lambda rng, i: []),
+}
+
+
+def _html(lines: List[str], filler: List[str]) -> str:
+    rows = "".join(f'<tr><td class="k">{l.split(":")[0]}</td><td>{l}</td></tr>' for l in lines[:20])
+    if len(lines) > 20:
+        rows += '<tr><td colspan="2"><pre>' + "\n".join(lines[20:]) + "</pre></td></tr>"
+    paras = "".join(f"<p>{p} &mdash; see the <a href=\"https://example.com/r\">report</a>.</p>" for p in filler)
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\">{_STYLE}</head><body>"
+            f"<h2>Daily report</h2><table>{rows}</table>{paras}<p style=\"color:#999\">Sent automatically</p></body></html>")
+
+
+class SyntheticCorpus(Sequence):
+    """
+    `n` reproducible messages, generated on access from (seed, index) rather than stored.
+    Message shapes rotate between multipart/alternative, multipart/mixed with a PDF stub,
+    HTML-only and plain-text-only; bodies run from a few KB to a few hundred KB.
+    """
+
+    def __init__(self, n: int, seed: int = 0):
+        self.n, self.seed = n, seed
+        self._kinds = [k for k, (share, _, _) in KINDS.items() for _ in range(round(share * 10))]
+        # metadata and full fetches of the same message land close together
+        self._message = functools.lru_cache(maxsize=256)(self._message)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.n))]
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        return self._message(i)
+
+    def ids(self) -> List[str]:
+        return [f"syn-{i:07d}" for i in range(self.n)]
+
+    def _date(self, i: int) -> datetime:
+        return datetime(2024, 1, 1, i // 3600 % 24, i // 60 % 60, i % 60, tzinfo=timezone.utc)
+
+    def internal_date(self, i: int) -> int:
+        """Message i's internalDate in epoch seconds, without generating the message."""
+        return int(self._date(i).timestamp())
+
+    def _message(self, i: int) -> Dict[str, Any]:
+        rng = random.Random(self.seed * 1_000_003 + i)
+        kind = self._kinds[i % len(self._kinds)]
+        _, subject, signals = KINDS[kind]
+        lines = signals(rng, i)
+        filler = [rng.choice(_FILLER) for _ in range(int(rng.paretovariate(1.5) * 8))]
+        text = "\n".join(lines + filler)
+        shape = i % 4
+        kwargs = {"date": format_datetime(self._date(i)), "history_id": i + 1}
+        msg_id = f"syn-{i:07d}"
+        if shape == 0:
+            return make_multipart(msg_id, subject.format(i=i), text, _html(lines, filler), **kwargs)
+        if shape == 1:
+            return make_multipart(msg_id, subject.format(i=i), text, _html(lines, filler),
+                                  attachments=[(f"report-{i}.pdf", "application/pdf", rng.randint(20_000, 400_000))],
+                                  **kwargs)
+        if shape == 2:
+            return make_multipart(msg_id, subject.format(i=i), None, _html(lines, filler), **kwargs)
+        return make_message(msg_id, subject.format(i=i), text, **kwargs)
+
+
+def _throttled() -> HttpError:
+    content = {"error": {"code": 429, "message": "User-rate limit exceeded.",
+                         "errors": [{"reason": "rateLimitExceeded", "domain": "usageLimits"}]}}
+    return HttpError(httplib2.Response({"status": 429}), json.dumps(content).encode())
+
+
+class _Request:
+    def __init__(self, svc: "FakeGmailService", method: str, fn, kwargs: Dict[str, Any]):
+        self._svc, self.method, self._fn, self._kwargs = svc, method, fn, kwargs
+
+    def _call(self):
+        exc = self._svc._admit(self.method)
+        if exc is not None:
+            raise exc
+        return self._fn(**self._kwargs)
+
+    def execute(self, num_retries: int = 0):
+        self._svc._round_trip()
+        return self._call()
+
+
+class _Batch:
+    def __init__(self, svc: "FakeGmailService", callback=None):
+        self._svc, self._callback, self._items = svc, callback, []
+
+    def add(self, request: _Request, callback=None, request_id: Optional[str] = None):
+        if len(self._items) >= 100:
+            raise ValueError("Exceeded maximum calls (100) in a single batch")
+        self._items.append((request, callback or self._callback, request_id or str(len(self._items))))
+
+    def execute(self, http=None):
+        self._svc._round_trip()
+        for request, callback, request_id in self._items:
+            try:
+                response, exc = request._call(), None
+            except Exception as e:
+                response, exc = None, e
+            if callback:
+                callback(request_id, response, exc)
+
+
+class _Messages:
+    def __init__(self, svc: "FakeGmailService"):
+        self._svc = svc
+
+    def list(self, userId: str, q: str = "", maxResults: int = 100, pageToken: Optional[str] = None):
+        return _Request(self._svc, "messages.list", self._svc._list, {"q": q, "max_results": maxResults, "page_token": pageToken})
+
+    def get(self, userId: str, id: str, format: str = "full", metadataHeaders: Optional[List[str]] = None):
+        return _Request(self._svc, "messages.get", self._svc._get, {"msg_id": id, "fmt": format})
+
+
+class _History:
+    def __init__(self, svc: "FakeGmailService"):
+        self._svc = svc
+
+    def list(self, userId: str, startHistoryId: str, labelId: Optional[str] = None,
+             historyTypes: Optional[List[str]] = None, pageToken: Optional[str] = None, maxResults: int = 100):
+        return _Request(self._svc, "history.list", self._svc._history, {"start": int(startHistoryId), "label_id": labelId})
+
+
+class _Labels:
+    def __init__(self, svc: "FakeGmailService"):
+        self._svc = svc
+
+    def list(self, userId: str):
+        return _Request(self._svc, "labels.list", lambda: {"labels": [{"id": LABEL_ID, "name": LABEL_NAME, "type": "user"}]}, {})
+
+
+class _Users:
+    def __init__(self, svc: "FakeGmailService"):
+        self._svc = svc
+
+    def messages(self):
+        return _Messages(self._svc)
+
+    def history(self):
+        return _History(self._svc)
+
+    def labels(self):
+        return _Labels(self._svc)
+
+    def getProfile(self, userId: str):
+        return _Request(self._svc, "getProfile", lambda: {"emailAddress": "cos@complianceworxs.com",
+                                            "historyId": str(self._svc.history_id)}, {})
+
+
+class FakeGmailService:
+    def __init__(self, messages: Sequence[Dict[str, Any]], latency: float = 0.0, quota: Optional[float] = None,
+                 throttle_rate: float = 0.0, seed: int = 0):
+        # A SyntheticCorpus is read lazily; anything else is copied
+        self.messages = messages if isinstance(messages, SyntheticCorpus) else list(messages)
+        self.latency = latency
+        self.round_trips = 0
+        self.gets = 0
+        self.full_gets = 0
+        if isinstance(messages, SyntheticCorpus):
+            self._ids = messages.ids()
+            self.history_id = len(messages) or 1
+        else:
+            self._ids = [m["id"] for m in self.messages]
+            self.history_id = max([int(m["historyId"]) for m in self.messages] or [1])
+        self._index = {msg_id: n for n, msg_id in enumerate(self._ids)}
+        self.history_floor = 0  # startHistoryIds below this are treated as expired
+        self.quota, self.throttle_rate = quota, throttle_rate
+        self.throttled = 0
+        self.units = 0  # quota units of the calls answered
+        self._tokens, self._refilled = quota or 0.0, time.monotonic()
+        self._rng = random.Random(seed)
+        self._query_ids: Dict[str, List[str]] = {}  # date-bounded list query -> matching ids
+
+    def add(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Deliver a new message, advancing the mailbox historyId."""
+        self.history_id += 1
+        message["historyId"] = str(self.history_id)
+        self._index[message["id"]] = len(self.messages)
+        self._ids.append(message["id"])
+        self.messages.append(message)
+        self._query_ids.clear()
+        return message
+
+    def _admit(self, method: str) -> Optional[HttpError]:
+        """None if the call goes through, else the throttling error to answer it with."""
+        from gmail_quota import COSTS
+        cost = COSTS.get(method, 1)
+        if self.quota is not None:
+            now = time.monotonic()
+            self._tokens = min(self.quota, self._tokens + (now - self._refilled) * self.quota)
+            self._refilled = now
+        if (self.throttle_rate and self._rng.random() < self.throttle_rate) or \
+                (self.quota is not None and self._tokens < cost):
+            self.throttled += 1
+            return _throttled()
+        if self.quota is not None:
+            self._tokens -= cost
+        self.units += cost
+        return None
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _list(self, q: str, max_results: int, page_token: Optional[str]):
+        ids = self._matching(q)
+        start = int(page_token or 0)
+        page = ids[start:start + max_results]
+        res = {"messages": [{"id": msg_id, "threadId": msg_id} for msg_id in page],
+               "resultSizeEstimate": len(ids)}
+        if start + max_results < len(ids):
+            res["nextPageToken"] = str(start + max_results)
+        return res
+
+    def _matching(self, q: str) -> List[str]:
+        """Ids whose internalDate falls in the query's `after:<epoch>` / `before:<epoch>` bounds
+        (after inclusive, before exclusive); every other search term is ignored."""
+        after, before = (re.search(rf"\b{op}:(\d+)\b", q or "") for op in ("after", "before"))
+        if not after and not before:
+            return self._ids
+        lo, hi = int(after.group(1)) if after else 0, int(before.group(1)) if before else float("inf")
+        if q not in self._query_ids:
+            self._query_ids[q] = [msg_id for n, msg_id in enumerate(self._ids) if lo <= self._internal_date(n) < hi]
+        return self._query_ids[q]
+
+    def _internal_date(self, n: int) -> int:
+        if isinstance(self.messages, SyntheticCorpus):
+            return self.messages.internal_date(n)
+        return int(self.messages[n]["internalDate"]) // 1000
+
+    def _get(self, msg_id: str, fmt: str):
+        self.gets += 1
+        if msg_id not in self._index:
+            raise _not_found(msg_id)
+        m = self.messages[self._index[msg_id]]
+        if fmt == "full":
+            self.full_gets += 1
+            return m
+        payload = {"mimeType": m["payload"]["mimeType"], "headers": m["payload"]["headers"]}
+        return {**{k: v for k, v in m.items() if k != "payload"}, "payload": payload}
+
+    def _history(self, start: int, label_id: Optional[str]):
+        if start < self.history_floor:
+            raise _not_found(f"startHistoryId {start}")
+        added = [m for m in self.messages
+                 if int(m["historyId"]) > start and (label_id is None or label_id in m["labelIds"])]
+        history = [{"id": m["historyId"], "messagesAdded": [{"message": {"id": m["id"], "threadId": m["threadId"],
+                                                                          "labelIds": m["labelIds"]}}]}
+                   for m in added]
+        return {"history": history, "historyId": str(self.history_id)}
+
+    def users(self):
+        return _Users(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self, callback)
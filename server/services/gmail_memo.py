@@ -0,0 +1,91 @@
+# gmail_memo.py
+"""
+Persistent memo of parsed message bodies for gmail-pull.py (GMAIL_MEMO=1).
+
+The same report often arrives more than once (re-sent, CC'd to several labels, or pulled by
+two sources). gmail-pull keys each message by a hash of its text body parts, the mappers it
+was routed to and a mapper version, and stores the body text parsing produced. A repeat then
+costs one hash and one indexed lookup instead of the MIME walk and html2text; the map_*
+scans still run, since their outputs are stamped with the current time.
+
+Entries live in a small SQLite table. Lookups refresh an entry's last-used time; on `flush`
+the least recently used entries beyond `max_entries` or `max_bytes` are evicted. Opening the
+memo with a different `version` drops every entry, so changed mapping rules never serve
+stale results.
+"""
+import json, sqlite3, threading, time
+from typing import Any, Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memo (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS memo_used_at ON memo(used_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class MapperMemo:
+    def __init__(self, path: str, version: str, max_entries: int = 5000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()  # shared by source threads and pipeline stages
+        self._touched: Dict[str, float] = {}  # key -> last hit, written back on flush
+        self.hits = self.misses = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if row is None or row[0] != version:
+            self.conn.execute("DELETE FROM memo")
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (version,))
+            self.conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM memo WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]):
+        blob = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO memo (key, value, size, used_at) VALUES (?, ?, ?, ?)",
+                              (key, blob, len(blob), time.time()))
+
+    def flush(self):
+        """Record hits, evict least recently used entries past the limits, and commit."""
+        with self._lock:
+            self.conn.executemany("UPDATE memo SET used_at = ? WHERE key = ?",
+                                  [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+            self.conn.execute(
+                "DELETE FROM memo WHERE key IN (SELECT key FROM memo ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.conn.execute(
+                "DELETE FROM memo WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER "
+                "(ORDER BY used_at DESC, rowid DESC) AS running FROM memo) WHERE running > ?)",
+                (self.max_bytes,),
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM memo").fetchone()[0]
@@ -0,0 +1,151 @@
+# gmail_metrics.py
+"""
+Counters and latency histograms for gmail-pull.py, rendered in the Prometheus text format.
+
+The registry is saved as JSON next to the rendered .prom file after each run and loaded
+again on the next, so counters keep growing across scheduled one-shot runs the way a
+node_exporter textfile collector expects. In worker mode `serve` also exposes it over HTTP.
+
+    registry = Registry()
+    registry.histogram("gmail_pull_op_seconds", "Latency of pipeline operations")
+    registry.observe("gmail_pull_op_seconds", 0.012, stage="fetch", op="batch_get_full")
+"""
+import json, os, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str, Sequence[float]]] = {}  # name -> (type, help, buckets)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        # name -> labels -> [per-bucket counts (non-cumulative, +Inf last), sum, count]
+        self._histograms: Dict[str, Dict[Labels, list]] = {}
+
+    # --- declaration --------------------------------------------------------------
+
+    def counter(self, name: str, help: str):
+        self._meta[name] = ("counter", help, ())
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self._meta[name] = ("histogram", help, tuple(buckets))
+        self._histograms.setdefault(name, {})
+
+    # --- updates ------------------------------------------------------------------
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = self._meta[name][2]
+        key = _labels(labels)
+        with self._lock:
+            h = self._histograms[name].get(key)
+            if h is None:
+                h = self._histograms[name][key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            i = next((n for n, b in enumerate(buckets) if value <= b), len(buckets))
+            h[0][i] += 1
+            h[1] += value
+            h[2] += 1
+
+    # --- output -------------------------------------------------------------------
+
+    def render(self) -> str:
+        """The registry in the Prometheus text exposition format (version 0.0.4)."""
+        out: List[str] = []
+        with self._lock:
+            for name, (kind, help, buckets) in sorted(self._meta.items()):
+                out.append(f"# HELP {name} {help}")
+                out.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for labels, v in sorted(self._counters[name].items()):
+                        out.append(f"{name}{_fmt_labels(labels)} {_fmt_value(v)}")
+                    continue
+                for labels, (counts, total, count) in sorted(self._histograms[name].items()):
+                    running = 0
+                    for bound, n in zip(list(buckets) + ["+Inf"], counts):
+                        running += n
+                        le = bound if bound == "+Inf" else _fmt_value(bound)
+                        out.append(f"{name}_bucket{_fmt_labels(labels, ('le', le))} {running}")
+                    out.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(round(total, 6))}")
+                    out.append(f"{name}_count{_fmt_labels(labels)} {count}")
+        return "\n".join(out) + "\n"
+
+    def save(self, prom_path: str, state_path: str):
+        """Write the rendered metrics and the JSON state `load` restores, each via temp file + rename."""
+        with self._lock:
+            state = {
+                "counters": {n: [[list(map(list, k)), v] for k, v in s.items()] for n, s in self._counters.items()},
+                "histograms": {n: [[list(map(list, k)), h] for k, h in s.items()] for n, s in self._histograms.items()},
+            }
+        for path, text in ((state_path, json.dumps(state, separators=(",", ":"))), (prom_path, self.render())):
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(path + ".tmp", path)
+
+    def load(self, state_path: str):
+        """Restore values saved by `save` for the metrics declared on this registry."""
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for name, series in state.get("counters", {}).items():
+                if name in self._counters:
+                    for key, v in series:
+                        self._counters[name][tuple(map(tuple, key))] = v
+            for name, series in state.get("histograms", {}).items():
+                if name in self._histograms:
+                    n_buckets = len(self._meta[name][2]) + 1
+                    for key, h in series:
+                        if len(h[0]) == n_buckets:  # skip state saved under different buckets
+                            self._histograms[name][tuple(map(tuple, key))] = h
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve GET /metrics from a daemon thread."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="gmail-metrics", daemon=True).start()
+        return server
@@ -0,0 +1,140 @@
+# gmail_quota.py
+"""
+Gmail API quota budget and adaptive request scheduling for gmail-pull.py.
+
+Gmail charges each method a number of quota units (messages.get and messages.list cost 5,
+history.list 2) against a per-user limit of 250 units/second, and every call inside a
+batch request is charged separately. QuotaBudget is a token bucket over those units:
+`charge` takes the call's units and sleeps the caller once the bucket runs dry, so a long
+backfill stays under `units_per_sec` instead of tripping 429s that the live pull shares.
+
+    budget = QuotaBudget(100)
+    budget.charge("messages.get", calls=25)  # one batch of 25 gets: 125 units
+
+AdaptiveScheduler adds the reaction to throttling (429, or 403 rateLimitExceeded /
+userRateLimitExceeded). Its concurrency window, the number of gets sent in one batch,
+and its pacing rate are both adjusted AIMD-style: halved on a throttle, at most once per
+`cooldown` seconds so one burst of rejections counts once, and grown back by one call and
+RATE_STEP of the ceiling after each batch that went through clean. `backoff` gives the
+jittered exponential delay before retrying the calls that were throttled.
+"""
+import json, random, threading, time
+from typing import Dict, Optional
+
+# https://developers.google.com/gmail/api/reference/quota
+COSTS: Dict[str, int] = {
+    "messages.list": 5,
+    "messages.get": 5,
+    "history.list": 2,
+    "labels.list": 1,
+    "getProfile": 1,
+}
+
+
+class QuotaBudget:
+    def __init__(self, units_per_sec: float, burst: Optional[float] = None):
+        self.rate = float(units_per_sec)
+        self.burst = float(burst if burst is not None else units_per_sec)
+        self._lock = threading.Lock()  # shared by concurrent source threads
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self.spent = 0.0  # units charged so far
+        self.waited = 0.0  # seconds callers slept for quota
+
+    def charge(self, method: str, calls: int = 1) -> float:
+        """Charge `calls` calls of `method`; returns the seconds slept to stay within budget."""
+        return self.spend(COSTS.get(method, 1) * calls)
+
+    def spend(self, units: float) -> float:
+        """Take `units` from the bucket. A charge larger than what is left (e.g. a full batch)
+        is allowed to go into debt, and the caller sleeps until the debt is repaid."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= units
+            self.spent += units
+            wait = -self._tokens / self.rate if self._tokens < 0 and self.rate > 0 else 0.0
+            self.waited += wait
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+RATE_STEP = 0.05  # share of the ceiling the pacing rate regains per clean batch
+MIN_RATE = 0.05  # ...and the floor it can be cut to, as a share of the ceiling
+
+
+def error_reason(exc: Exception) -> str:
+    """The `reason` of a Google API error response (e.g. "rateLimitExceeded"), or ""."""
+    try:
+        return json.loads(exc.content)["error"]["errors"][0]["reason"]
+    except (AttributeError, KeyError, IndexError, TypeError, ValueError):
+        return ""
+
+
+def is_throttle(exc: Exception) -> bool:
+    status = getattr(getattr(exc, "resp", None), "status", None)
+    return status == 429 or (status == 403 and error_reason(exc) in ("rateLimitExceeded", "userRateLimitExceeded"))
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Throttles and transient backend errors, which Google asks clients to retry with backoff."""
+    return is_throttle(exc) or getattr(getattr(exc, "resp", None), "status", None) in (500, 502, 503, 504)
+
+
+def retry_after(exc: Exception) -> float:
+    """Seconds from a Retry-After header (delta-seconds form), or 0."""
+    try:
+        return float(exc.resp.get("retry-after", 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+class AdaptiveScheduler:
+    def __init__(self, units_per_sec: float, max_window: int, min_window: int = 1, base_delay: float = 1.0,
+                 max_delay: float = 32.0, cooldown: float = 1.0, rng: Optional[random.Random] = None):
+        self.ceiling = float(units_per_sec)
+        self.budget = QuotaBudget(units_per_sec)
+        self.max_window, self.min_window = max_window, min_window
+        self.base_delay, self.max_delay, self.cooldown = base_delay, max_delay, cooldown
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._window = float(max_window)
+        self._last_decrease = float("-inf")
+        self.throttled = 0  # throttled responses seen
+        self.decreases = 0  # times the window and rate were cut
+
+    @property
+    def window(self) -> int:
+        """Calls to send in the next batch."""
+        return max(self.min_window, int(self._window))
+
+    @property
+    def rate(self) -> float:
+        return self.budget.rate
+
+    def charge(self, method: str, calls: int = 1) -> float:
+        return self.budget.charge(method, calls)
+
+    def on_success(self):
+        with self._lock:
+            self._window = min(float(self.max_window), self._window + 1)
+            self.budget.rate = min(self.ceiling, self.budget.rate + self.ceiling * RATE_STEP)
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttled += 1
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.decreases += 1
+            self._window = max(float(self.min_window), self._window / 2)
+            self.budget.rate = max(self.ceiling * MIN_RATE, self.budget.rate / 2)
+
+    def backoff(self, attempt: int, not_before: float = 0.0) -> float:
+        """Delay before retry number `attempt` (1-based): uniformly jittered over the upper half
+        of base_delay * 2^(attempt-1), capped at max_delay, and never shorter than `not_before`."""
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return max(not_before, self._rng.uniform(cap / 2, cap))
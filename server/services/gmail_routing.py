@@ -0,0 +1,122 @@
+# gmail_routing.py
+"""
+Routing registry for gmail-pull.py: which mappers each message is sent to.
+
+Routes come from a JSON config (GMAIL_ROUTES, default server/config/gmail-routes.json):
+
+    {"routes": [
+        {"name": "ceo", "subject": ["ceo summary", "executive summary"]},
+        {"name": "vendor", "mapper": "vendor_mappers:map_invoice",
+         "from": ["re:@(billing|invoices)\\."], "label": ["finance"]}
+    ]}
+
+A route matches when any of its patterns matches the message's subject, From header or one
+of its label names. Patterns are case-insensitive substrings, or regular expressions when
+prefixed with "re:". `mapper` names one of gmail-pull's built-in mappers or a
+"module:function" to import, and defaults to the route's name.
+
+Matching does not loop over terms or routes. For each header, the literal terms of every
+route are compiled into one regex and found in a single scan of the header, however many
+report types are configured (see _HeaderMatcher).
+"""
+import json, re
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+HEADERS = ("subject", "from", "label")
+
+
+class Route(NamedTuple):
+    name: str
+    mapper: str
+
+
+def _trie_pattern(terms: Sequence[str]) -> str:
+    """Regex matching the longest of `terms` at a position, factored into a trie of common
+    prefixes so the engine follows one branch per character instead of trying every term."""
+    trie: Dict[str, Any] = {}
+    for t in terms:
+        node = trie
+        for ch in t:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        if "" in node:
+            return "(?:%s)?" % "|".join(alts)
+        return alts[0] if len(alts) == 1 else "(?:%s)" % "|".join(alts)
+
+    return build(trie)
+
+
+class _HeaderMatcher:
+    """All routes' patterns for one header. Literal terms share one trie-shaped regex scanned
+    once, which finds the longest term starting at each position; that term also credits the
+    routes of every shorter term that is its prefix, since those matched there too. Regex
+    patterns, which cannot be reasoned about that way, get an optional lookahead group per route."""
+
+    def __init__(self, patterns: Sequence[Tuple[int, str]]):
+        terms: Dict[str, set] = {}
+        regexes: Dict[int, List[str]] = {}
+        for i, p in patterns:
+            if p.startswith("re:"):
+                regexes.setdefault(i, []).append(p[3:])
+            elif p:
+                terms.setdefault(p.lower(), set()).add(i)
+        self.credits = {t: frozenset(i for u, ids in terms.items() if t.startswith(u) for i in ids) for t in terms}
+        self.literal = re.compile("(?=(%s))" % _trie_pattern(list(terms)), re.IGNORECASE) if terms else None
+        self.regex_ids = list(regexes)
+        self.regex = re.compile("".join(rf"(?:(?=[\s\S]*?(?P<r{i}>{'|'.join(alts)})))?" for i, alts in regexes.items()),
+                                re.IGNORECASE) if regexes else None
+
+    def routes(self, text: str) -> set:
+        hit = set()
+        if self.literal is not None:
+            for m in self.literal.finditer(text):
+                hit |= self.credits.get(m.group(1).lower(), frozenset())
+        if self.regex is not None:
+            m = self.regex.match(text)
+            hit.update(i for i in self.regex_ids if m.group(f"r{i}") is not None)
+        return hit
+
+    def signature(self) -> List[Any]:
+        return [self.literal and self.literal.pattern, self.regex_ids, self.regex and self.regex.pattern]
+
+
+class RouteRegistry:
+    def __init__(self, routes: Sequence[Dict[str, Any]]):
+        self.routes: List[Route] = []
+        per_header: Dict[str, List[Tuple[int, str]]] = {h: [] for h in HEADERS}
+        for i, spec in enumerate(routes):
+            name = str(spec.get("name", ""))
+            if not re.fullmatch(r"[A-Za-z0-9_-]+", name) or name in self.names():
+                raise ValueError(f"routes: each route needs a unique name of letters, digits, - or _ (got {name!r})")
+            if not any(spec.get(h) for h in HEADERS):
+                raise ValueError(f"routes: {name} has no subject, from or label patterns")
+            self.routes.append(Route(name, str(spec.get("mapper") or name)))
+            for h in HEADERS:
+                per_header[h] += [(i, str(p)) for p in spec.get(h) or []]
+        self._matchers = {h: _HeaderMatcher(patterns) for h, patterns in per_header.items() if patterns}
+        self.uses_labels = "label" in self._matchers
+
+    @classmethod
+    def load(cls, path: str) -> "RouteRegistry":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["routes"])
+
+    def names(self) -> List[str]:
+        return [r.name for r in self.routes]
+
+    def classify(self, subject: str, sender: str = "", labels: Sequence[str] = ()) -> List[str]:
+        """Names of the routes a message matches, in config order."""
+        hit = set()
+        for h, text in (("subject", subject), ("from", sender), ("label", "\n".join(labels))):
+            if text and h in self._matchers:
+                hit |= self._matchers[h].routes(text)
+        return [self.routes[i].name for i in sorted(hit)]
+
+    def signature(self) -> str:
+        """Stable text of the routes and their compiled patterns, for cache keys."""
+        return json.dumps([self.routes, {h: m.signature() for h, m in sorted(self._matchers.items())}])
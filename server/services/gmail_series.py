@@ -0,0 +1,270 @@
+# gmail_series.py
+"""
+Scoreboard history for gmail-pull.py as a small columnar time-series store.
+
+Every scoreboard snapshot map_ceo_to_scoreboard produces is kept as a row, dated by the
+message it came from. Each metric is a typed column named by its path in the snapshot
+("revenue.realized_week", "autonomy.auto_resolve_pct", "risk.high"): numbers are float64
+arrays with NaN where a snapshot lacked the metric, and text such as "narrative.topic" is
+dictionary-encoded into int32 codes (-1 when absent). Rows are sorted by day, so a date
+range is two bisects on the day column followed by one read of just the requested slice.
+
+Weekly (ISO weeks, keyed by their Monday) and monthly rollups are kept alongside: for every
+numeric metric the last value of the period and its mean, min and max. Appending recomputes
+only the periods that gained rows.
+
+    series = ScoreboardSeries("server/data/scoreboard_series")
+    series.append([("2024-01-01", snapshot)])
+    series.points("risk.high", start="2024-01-01")       # [("2024-01-01", 2.0), ...]
+    series.rollup("revenue.realized_week", "month", "mean")
+
+All tables live in one binary file of concatenated arrays, replaced as a whole on append
+and described by series.json (row counts, column types and offsets, text dictionaries), so
+readers never see a half-written store.
+"""
+import bisect, json, math, os, sys, threading
+from array import array
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+MANIFEST = "series.json"
+PERIODS = ("week", "month")
+AGGS = ("last", "mean", "min", "max")
+NAN = float("nan")
+
+
+def flatten(snapshot: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    """(metric path, value) for each number or text leaf; the snapshot's own "date" is skipped."""
+    for key, value in snapshot.items():
+        name = prefix + key
+        if isinstance(value, dict):
+            yield from flatten(value, name + ".")
+        elif isinstance(value, (int, float)) and name != "date":
+            yield name, float(value)
+        elif isinstance(value, str) and name != "date":
+            yield name, value
+
+
+def period_start(day: int, period: str) -> int:
+    """Ordinal of the Monday (week) or the 1st (month) of the period holding ordinal `day`."""
+    d = date.fromordinal(day)
+    return day - d.weekday() if period == "week" else date(d.year, d.month, 1).toordinal()
+
+
+def next_period(key: int, period: str) -> int:
+    """Start of the period after the one starting at ordinal `key`."""
+    if period == "week":
+        return key + 7
+    d = date.fromordinal(key)
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1).toordinal()
+
+
+def _ordinal(day: Optional[str], default: int) -> int:
+    return date.fromisoformat(day[:10]).toordinal() if day else default
+
+
+class ScoreboardSeries:
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        try:
+            with open(os.path.join(root, MANIFEST), "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {"version": 1, "data": None, "byteorder": sys.byteorder, "tables": {}, "dicts": {}}
+
+    # --- reading ------------------------------------------------------------------
+
+    def _read(self, table: str, column: str, lo: int = 0, hi: Optional[int] = None) -> array:
+        """Rows [lo, hi) of one column, read straight from the data file."""
+        meta = self.manifest["tables"][table]
+        typecode, offset = meta["columns"][column]
+        hi = meta["rows"] if hi is None else hi
+        out = array(typecode)
+        if hi > lo:
+            with open(os.path.join(self.root, self.manifest["data"]), "rb") as f:
+                f.seek(offset + lo * out.itemsize)
+                out.frombytes(f.read((hi - lo) * out.itemsize))
+            if self.manifest["byteorder"] != sys.byteorder:
+                out.byteswap()
+        return out
+
+    def _bounds(self, table: str, key: str, start: int, end: int) -> Tuple[int, int]:
+        keys = self._read(table, key)
+        return bisect.bisect_left(keys, start), bisect.bisect_right(keys, end)
+
+    def __len__(self) -> int:
+        return self.manifest["tables"].get("snapshots", {}).get("rows", 0)
+
+    def metrics(self) -> List[str]:
+        return [c for c in self.manifest["tables"].get("snapshots", {}).get("columns", {}) if c != "day"]
+
+    def points(self, metric: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple[str, Any]]:
+        """(day, value) for every snapshot from `start` to `end` (ISO dates, inclusive);
+        None where that snapshot lacked the metric."""
+        if metric not in self.metrics():
+            raise KeyError(metric)
+        lo, hi = self._bounds("snapshots", "day", _ordinal(start, 0), _ordinal(end, date.max.toordinal()))
+        days, values = self._read("snapshots", "day", lo, hi), self._read("snapshots", metric, lo, hi)
+        if metric in self.manifest["dicts"]:
+            words = self.manifest["dicts"][metric]
+            values = [words[v] if v >= 0 else None for v in values]
+        else:
+            values = [None if math.isnan(v) else v for v in values]
+        return [(date.fromordinal(d).isoformat(), v) for d, v in zip(days, values)]
+
+    def rollup(self, metric: str, period: str = "week", agg: str = "last", start: Optional[str] = None,
+               end: Optional[str] = None) -> List[Tuple[str, Optional[float]]]:
+        """(period start, aggregate) for the weeks or months overlapping `start`..`end`."""
+        if period not in PERIODS or agg not in AGGS:
+            raise ValueError(f"period must be one of {PERIODS} and agg one of {AGGS}")
+        column = f"{metric}:{agg}"
+        if column not in self.manifest["tables"].get(period, {}).get("columns", {}):
+            raise KeyError(metric)
+        lo, hi = self._bounds(period, "period", period_start(_ordinal(start, 1), period),
+                              _ordinal(end, date.max.toordinal()))
+        keys, values = self._read(period, "period", lo, hi), self._read(period, column, lo, hi)
+        return [(date.fromordinal(k).isoformat(), None if math.isnan(v) else v) for k, v in zip(keys, values)]
+
+    # --- writing ------------------------------------------------------------------
+
+    def _load_rows(self) -> Tuple[array, Dict[str, array]]:
+        if not len(self):
+            return array("i"), {}
+        names = self.manifest["tables"]["snapshots"]["columns"]
+        return self._read("snapshots", "day"), {c: self._read("snapshots", c) for c in names if c != "day"}
+
+    def append(self, snapshots: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Add (day, snapshot) rows and rebuild the rollups; returns the rows added. A snapshot
+        identical to one already stored for the same day is skipped, so re-sending a run's
+        snapshots (e.g. after a crash before its progress was saved) does not double them."""
+        with self._lock:
+            days, cols = self._load_rows()
+            dicts = {k: list(v) for k, v in self.manifest["dicts"].items()}
+            codes = {k: {w: i for i, w in enumerate(v)} for k, v in dicts.items()}
+            snapshots = list(snapshots)
+            incoming = {_ordinal(day, date.today().toordinal()) for day, _ in snapshots}
+            seen = {self._row_key(days[i], cols, dicts, i) for i in range(len(days)) if days[i] in incoming}
+            added, touched = 0, set()
+            for day, snapshot in snapshots:
+                values = {k: v for k, v in flatten(snapshot) if v != ""}  # mappers leave absent text as ""
+                for name, v in values.items():
+                    if name not in cols:
+                        text = isinstance(v, str)
+                        cols[name] = array("i", [-1]) * len(days) if text else array("d", [NAN]) * len(days)
+                        if text:
+                            dicts[name], codes[name] = [], {}
+                n = len(days)
+                days.append(_ordinal(day, date.today().toordinal()))
+                for name, col in cols.items():
+                    v = values.get(name)
+                    if name in dicts:
+                        if isinstance(v, str):
+                            if v not in codes[name]:
+                                codes[name][v] = len(dicts[name])
+                                dicts[name].append(v)
+                            col.append(codes[name][v])
+                        else:
+                            col.append(-1)
+                    else:
+                        col.append(v if isinstance(v, float) else NAN)
+                key = self._row_key(days[n], cols, dicts, n)
+                if key in seen:
+                    del days[n]
+                    for col in cols.values():
+                        del col[n]
+                    continue
+                seen.add(key)
+                added += 1
+                touched.add(days[n])
+            if added:
+                self._write(days, cols, dicts, touched)
+            return added
+
+    @staticmethod
+    def _row_key(day: int, cols: Dict[str, array], dicts: Dict[str, List[str]], i: int) -> Tuple:
+        """Row i's day and present values, independent of which columns exist."""
+        present = []
+        for name, col in cols.items():
+            v = col[i]
+            if name in dicts:
+                if v >= 0:
+                    present.append((name, dicts[name][v]))
+            elif not math.isnan(v):
+                present.append((name, v))
+        return day, frozenset(present)
+
+    def _write(self, days: array, cols: Dict[str, array], dicts: Dict[str, List[str]], touched: set):
+        order = sorted(range(len(days)), key=days.__getitem__)  # stable: same-day rows keep arrival order
+        if order != list(range(len(days))):
+            days = array("i", (days[i] for i in order))
+            cols = {name: array(col.typecode, (col[i] for i in order)) for name, col in cols.items()}
+        tables = {"snapshots": {"day": days, **cols}}
+        numeric = [name for name in cols if name not in dicts]
+        for period in PERIODS:
+            tables[period] = self._update_rollup(days, {name: cols[name] for name in numeric}, period, touched)
+
+        generation = int(self.manifest["data"].split("-")[1].split(".")[0]) + 1 if self.manifest["data"] else 1
+        data = f"series-{generation:06d}.bin"
+        os.makedirs(self.root, exist_ok=True)
+        manifest = {"version": 1, "data": data, "byteorder": sys.byteorder, "tables": {}, "dicts": dicts}
+        offset = 0
+        with open(os.path.join(self.root, data), "wb") as f:
+            for table, columns in tables.items():
+                meta = manifest["tables"][table] = {"rows": len(next(iter(columns.values()))), "columns": {}}
+                for name, col in columns.items():
+                    meta["columns"][name] = [col.typecode, offset]
+                    col.tofile(f)
+                    offset += len(col) * col.itemsize
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+        old, self.manifest = self.manifest["data"], manifest
+        if old and old != data:
+            try:
+                os.remove(os.path.join(self.root, old))
+            except OSError:
+                pass
+
+    def _update_rollup(self, days: array, cols: Dict[str, array], period: str, touched: set) -> Dict[str, array]:
+        """The stored rollup with only the periods holding `touched` days recomputed; rebuilt
+        from scratch when there is none yet or the metrics changed."""
+        stored = self.manifest["tables"].get(period)
+        names = ["period", "count", *(f"{name}:{agg}" for name in cols for agg in AGGS)]
+        if stored is None or list(stored["columns"]) != names:
+            return self._rollup(days, cols, period)
+        table = {name: self._read(period, name) for name in names}
+        for key in sorted({period_start(day, period) for day in touched}):
+            lo, hi = bisect.bisect_left(days, key), bisect.bisect_left(days, next_period(key, period))
+            row = self._rollup(days[lo:hi], {name: col[lo:hi] for name, col in cols.items()}, period)
+            i = bisect.bisect_left(table["period"], key)
+            replace = i < len(table["period"]) and table["period"][i] == key
+            for name, col in table.items():
+                if replace:
+                    col[i] = row[name][0]
+                else:
+                    col.insert(i, row[name][0])
+        return table
+
+    @staticmethod
+    def _rollup(days: Sequence[int], cols: Dict[str, array], period: str) -> Dict[str, array]:
+        """Per-period aggregates of the day-sorted rows."""
+        keys, counts = array("i"), array("i")  # period start, snapshots in it
+        out = {f"{name}:{agg}": array("d") for name in cols for agg in AGGS}
+        i = 0
+        while i < len(days):
+            key = period_start(days[i], period)
+            j = i
+            while j < len(days) and period_start(days[j], period) == key:
+                j += 1
+            keys.append(key)
+            counts.append(j - i)
+            for name, col in cols.items():
+                vals = [v for v in col[i:j] if not math.isnan(v)]
+                out[f"{name}:last"].append(vals[-1] if vals else NAN)
+                out[f"{name}:mean"].append(sum(vals) / len(vals) if vals else NAN)
+                out[f"{name}:min"].append(min(vals) if vals else NAN)
+                out[f"{name}:max"].append(max(vals) if vals else NAN)
+            i = j
+        return {"period": keys, "count": counts, **out}
@@ -0,0 +1,226 @@
+# gmail_store.py
+"""
+Optional SQLite backend for gmail-pull.py (GMAIL_STORE=sqlite).
+
+Actions, meetings, insights, decisions and scoreboard snapshots live in indexed tables, so
+dedupe by action title and date/owner lookups are index hits instead of full-file scans.
+The dashboard still reads JSON, so `export` regenerates scoreboard.json, actions.json,
+meetings.json, insights.json and decisions.json from the tables. EmailIngestService writes
+those files too, so `import_missing` folds in what it added before they are regenerated.
+"""
+import json, sqlite3
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL UNIQUE,
+    owner TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS actions_owner ON actions(owner);
+
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS meetings_date ON meetings(date);
+
+CREATE TABLE IF NOT EXISTS insights (
+    id INTEGER PRIMARY KEY,
+    type TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS insights_type_timestamp ON insights(type, timestamp);
+
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY,
+    owner TEXT,
+    due TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS decisions_due ON decisions(due);
+CREATE INDEX IF NOT EXISTS decisions_owner ON decisions(owner);
+
+CREATE TABLE IF NOT EXISTS scoreboard_snapshots (
+    id INTEGER PRIMARY KEY,
+    date TEXT,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scoreboard_snapshots_date ON scoreboard_snapshots(date);
+
+-- Single row holding the merged scoreboard that scoreboard.json is exported from
+CREATE TABLE IF NOT EXISTS scoreboard (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    data TEXT NOT NULL
+);
+"""
+
+# collection table -> (indexed columns pulled out of each item, range-query column)
+COLLECTIONS = {
+    "meetings": (("title", "date"), "date"),
+    "insights": (("type", "timestamp"), "timestamp"),
+    "decisions": (("owner", "due"), "due"),
+}
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+
+class SqliteStore:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self) -> "SqliteStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+        self.conn.close()
+
+    def is_empty(self) -> bool:
+        tables = ["actions", "scoreboard", *COLLECTIONS]
+        return not any(self.conn.execute(f"SELECT 1 FROM {t} LIMIT 1").fetchone() for t in tables)
+
+    def import_existing(self, actions: List[Dict[str, Any]], collections: Dict[str, List[Dict[str, Any]]],
+                        scoreboard: Dict[str, Any]):
+        """Seed a new database from the current JSON data files, keeping their order."""
+        self.add_actions(actions)
+        for name, items in collections.items():
+            self.add_items(name, items)
+        if scoreboard:
+            self._set_scoreboard(scoreboard)
+
+    def import_missing(self, key: Callable[[Any], str], actions: Iterable[Dict[str, Any]] = (),
+                       collections: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                       scoreboard: Optional[Dict[str, Any]] = None,
+                       merge: Optional[Callable[[Any, Any], Any]] = None) -> int:
+        """Add JSON-file entries the tables lack, i.e. ones written to the files by someone else
+        since the last export: actions by title, collection items by `key` (counting repeats),
+        and a differing `scoreboard` merged over the stored one with `merge`. Returns how many
+        actions and items were added."""
+        added = self.add_actions(actions)
+        for table, items in (collections or {}).items():
+            have = Counter(key(json.loads(r[0])) for r in self.conn.execute(f"SELECT data FROM {table}"))
+            missing = []
+            for item in items:
+                k = key(item)
+                if have[k]:
+                    have[k] -= 1
+                else:
+                    missing.append(item)
+            added += self.add_items(table, missing)
+        if scoreboard and merge is not None and scoreboard != self.scoreboard():
+            self._set_scoreboard(merge(self.scoreboard(), scoreboard))
+        return added
+
+    # --- writes -------------------------------------------------------------------
+
+    def add_actions(self, items: Iterable[Dict[str, Any]]) -> int:
+        """Insert actions whose title is new (unique index); returns how many were added."""
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO actions (title, owner, data) VALUES (?, ?, ?)",
+            [(a.get("title", ""), a.get("owner"), _dumps(a)) for a in items],
+        )
+        return self.conn.total_changes - before
+
+    def add_items(self, table: str, items: Iterable[Dict[str, Any]]) -> int:
+        columns, _ = COLLECTIONS[table]
+        rows = [tuple(str(i[c]) if i.get(c) is not None else None for c in columns) + (_dumps(i),) for i in items]
+        self.conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}, data) VALUES ({', '.join('?' * (len(columns) + 1))})", rows
+        )
+        return len(rows)
+
+    def add_scoreboard(self, snapshot: Dict[str, Any], merge: Callable[[Any, Any], Any]) -> Dict[str, Any]:
+        """Keep `snapshot` in the history table and fold it into the current scoreboard with `merge`."""
+        self.conn.execute(
+            "INSERT INTO scoreboard_snapshots (date, created_at, data) VALUES (?, ?, ?)",
+            (snapshot.get("date"), datetime.now(timezone.utc).isoformat(), _dumps(snapshot)),
+        )
+        merged = merge(self.scoreboard(), snapshot)
+        self._set_scoreboard(merged)
+        return merged
+
+    def remove_messages(self, message_ids: Iterable[str]) -> Dict[str, int]:
+        """Delete the actions and items mapped from `message_ids` (their "message_id"); returns
+        table -> rows deleted, for the tables that lost any."""
+        ids = _dumps(list(message_ids))
+        removed = {}
+        for table in ("actions", *COLLECTIONS):
+            n = self.conn.execute(
+                f"DELETE FROM {table} WHERE json_extract(data, '$.message_id') IN (SELECT value FROM json_each(?))",
+                (ids,),
+            ).rowcount
+            if n:
+                removed[table] = n
+        return removed
+
+    def _set_scoreboard(self, board: Dict[str, Any]):
+        self.conn.execute("INSERT OR REPLACE INTO scoreboard (id, data) VALUES (1, ?)", (_dumps(board),))
+
+    # --- reads --------------------------------------------------------------------
+
+    def has_action(self, title: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM actions WHERE title = ?", (title,)).fetchone() is not None
+
+    def actions(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        if owner is None:
+            rows = self.conn.execute("SELECT data FROM actions ORDER BY id")
+        else:
+            rows = self.conn.execute("SELECT data FROM actions WHERE owner = ? ORDER BY id", (owner,))
+        return [json.loads(r[0]) for r in rows]
+
+    def items(self, table: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Items of a collection in insertion order, optionally limited to an ISO date range."""
+        _, column = COLLECTIONS[table]
+        sql, args = f"SELECT data FROM {table}", []
+        if since is not None or until is not None:
+            sql += f" WHERE {column} >= ? AND {column} < ?"
+            args = [since or "", until or "\uffff"]
+        return [json.loads(r[0]) for r in self.conn.execute(sql + " ORDER BY id", args)]
+
+    def message_ids(self) -> Set[str]:
+        """Every "message_id" the actions and collection items were mapped from."""
+        ids = set()
+        for table in ("actions", *COLLECTIONS):
+            rows = self.conn.execute(f"SELECT DISTINCT json_extract(data, '$.message_id') FROM {table}")
+            ids.update(r[0] for r in rows if r[0] is not None)
+        return ids
+
+    def scoreboard(self) -> Dict[str, Any]:
+        row = self.conn.execute("SELECT data FROM scoreboard WHERE id = 1").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def scoreboard_history(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT data FROM scoreboard_snapshots WHERE date >= ? ORDER BY id", (since or "",)
+        )
+        return [json.loads(r[0]) for r in rows]
+
+    # --- export -------------------------------------------------------------------
+
+    def export(self, save: Callable[[str, Any], None], names: Optional[Iterable[str]] = None):
+        """Regenerate the dashboard's JSON files (all of them, or just `names`) through `save`."""
+        names = set(names) if names is not None else {"scoreboard", "actions", *COLLECTIONS}
+        if "scoreboard" in names:
+            save("scoreboard.json", self.scoreboard())
+        if "actions" in names:
+            save("actions.json", self.actions())
+        for table in COLLECTIONS:
+            if table in names:
+                save(f"{table}.json", self.items(table))
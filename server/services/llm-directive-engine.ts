@@ -2,6 +2,7 @@ import OpenAI from "openai";
 import { GoogleGenAI } from "@google/genai";
 import fs from "fs/promises";
 import path from "path";
+import { readCollection } from "./data-collections";
 import { odarGovernance, type BusinessDirective } from "./odar-governance";
 
 // LLM Configuration
@@ -68,15 +69,15 @@ export class LLMDirectiveEngine {
       const [scoreboard, initiatives, decisions, actions, meetings] = await Promise.all([
         this.loadJsonFile(path.join(dataPath, "scoreboard.json")),
         this.loadJsonFile(path.join(dataPath, "initiatives.json")),
-        this.loadJsonFile(path.join(dataPath, "decisions.json")),
+        readCollection(dataPath, "decisions"),
         this.loadJsonFile(path.join(dataPath, "actions.json")),
-        this.loadJsonFile(path.join(dataPath, "meetings.json")),
+        readCollection(dataPath, "meetings"),
       ]);
 
       // Optional insights file
       let insights;
       try {
-        insights = await this.loadJsonFile(path.join(dataPath, "insights.json"));
+        insights = await readCollection(dataPath, "insights");
       } catch {
         insights = [];
       }
@@ -0,0 +1,171 @@
+"""Offline tests for brief_utils.run_briefs (BRIEF_LLM=stub, BRIEF_DRY_RUN=1)."""
+import os, sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import brief_utils  # noqa: E402
+
+REPORT = """## Ops — 2024-01-01 09:00 EST
+
+### Health
+Uptime: 99.8% (target: 99.5%+)
+MTTR: 4.3min (target: <5min)
+
+### Queue
+Backlog: 2 items (normal: <5)
+HITL Queue: 1 pending
+
+### Spend
+API Tokens: $47/day (budget: $75/day)
+Cost per Brief: $2.30 (target: <$3.00)
+Automation Jobs: 247 completed, 3 failed (98.8% success)
+
+### Backlog
+Morning Briefs: all delivered on time, none late
+Agent Communications: 12 pending, 3 high-priority
+Strategic Actions: 4 active, 2 due within 24h
+Content Pipeline: 3 pieces in review queue
+
+### Risks
+Rate Limit Exposure: Low (67% of daily quota used)
+Critical Dependencies: All operational
+Vendor Renewals: 2 due this month, both on track
+
+### Revenue Impact
+Brief Delivery Impact: 0 missed, $0 revenue loss
+System Downtime Cost: 12min total, est. $240 impact
+Automation Savings: $1,840/week vs manual process
+Agent Efficiency Gain: +34% throughput vs baseline
+"""
+
+
+@pytest.fixture
+def bu(tmp_path, monkeypatch):
+    monkeypatch.setattr(brief_utils, "BRIEF_LLM", "stub")
+    monkeypatch.setattr(brief_utils, "BRIEF_DRY_RUN", True)
+    monkeypatch.setattr(brief_utils, "BRIEF_CACHE", True)
+    monkeypatch.setattr(brief_utils, "BRIEF_CACHE_DIR", str(tmp_path / "brief_cache"))
+    monkeypatch.setattr(brief_utils, "BRIEF_STATE_DIR", str(tmp_path / "brief_state"))
+    monkeypatch.delenv("BRIEF_TEST_URL", raising=False)
+    return brief_utils
+
+
+def _brief(tmp_path, name, report=REPORT, **extra):
+    path = tmp_path / f"{name}.txt"
+    if report is not None:
+        path.write_text(report, encoding="utf-8")
+    return {"name": name, "url_env": "BRIEF_TEST_URL", "file_fallback": str(path), "fallback_skeleton": "skeleton",
+            "openai_api_key_env": "BRIEF_TEST_OPENAI_KEY", "model": "gpt-4o-mini", "system_msg": "You are the COO.",
+            "user_prefix": "Commentary:\n• Observations (2 bullets)\n• Actions (3 bullets)",
+            "subject_prefix": f"{name} brief", "to_env": "BRIEF_TEST_TO", **extra}
+
+
+def test_an_unchanged_report_is_a_cache_hit_costing_no_tokens(bu, tmp_path):
+    brief = _brief(tmp_path, "coo")
+    [first] = bu.run_briefs([brief])
+    [second] = bu.run_briefs([brief])
+
+    assert first["ok"] and first["sent"] and not first["cached"] and first["usage"]["prompt_tokens"] > 0
+    assert second["ok"] and second["sent"] and second["cached"]
+    assert second["usage"] == {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+    spend = bu.token_spend()
+    tokens = first["usage"]["prompt_tokens"] + first["usage"]["completion_tokens"]
+    assert spend["tokens"] == tokens and spend["briefs"]["coo"]["runs"] == 2
+
+
+def test_one_failing_brief_does_not_stop_the_others(bu, tmp_path, monkeypatch):
+    broken = _brief(tmp_path, "broken", report=None)
+    os.mkdir(broken["file_fallback"])  # reading it raises IsADirectoryError
+    briefs = [_brief(tmp_path, "coo"), broken, _brief(tmp_path, "cfo", REPORT.replace("$47", "$52"))]
+    results = bu.run_briefs(briefs)
+
+    assert [(r["name"], r["ok"], r["sent"]) for r in results] == [("coo", True, True), ("broken", False, False),
+                                                                  ("cfo", True, True)]
+    assert "IsADirectoryError" in results[1]["errors"][0]
+    assert set(bu.token_spend()["briefs"]) == {"coo", "cfo"}
+
+
+def test_a_cache_write_failure_still_sends_the_paid_completion(bu, tmp_path, monkeypatch, capsys):
+    def full_disk(self, key, entry):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(bu.CompletionCache, "put", full_disk)
+    [result] = bu.run_briefs([_brief(tmp_path, "coo")])
+
+    assert result["ok"] and result["sent"] and result["usage"]["completion_tokens"] > 0
+    assert "stub commentary" in capsys.readouterr().out
+
+
+def test_a_changed_report_sends_only_the_delta_within_the_budget(bu, tmp_path):
+    brief = _brief(tmp_path, "coo")
+    [first] = bu.run_briefs([brief])
+    (tmp_path / "coo.txt").write_text(REPORT.replace("Backlog: 2", "Backlog: 9"), encoding="utf-8")
+    [second] = bu.run_briefs([brief])
+
+    assert first["prompt"]["mode"] == "full" and second["prompt"]["mode"] == "delta"
+    assert second["prompt"]["changed_sections"] == 1 and not second["cached"]
+    assert second["prompt"]["tokens"] < second["prompt"]["full_tokens"]
+
+    body, info = bu.build_prompt(REPORT.replace("$47/day", "$52/day"), REPORT, max_tokens=50)
+    assert info["tokens"] <= 50 and info["omitted_lines"] == 2
+    assert body == ("### Spend\nAPI Tokens: $52/day (budget: $75/day)  [was: $47/day (budget: $75/day)]\n"
+                    "(2 unchanged lines)")
+
+    spend = bu.token_spend()
+    assert spend["briefs"]["coo"]["runs"] == 2
+    assert spend["tokens"] == sum(r["usage"]["prompt_tokens"] + r["usage"]["completion_tokens"] for r in (first, second))
+
+
+def test_unchanged_sections_are_named_not_repeated(bu):
+    body, info = bu.build_prompt(REPORT.replace("Backlog: 2", "Backlog: 9"), REPORT, "2024-01-01 09:00 EST")
+
+    assert info["mode"] == "delta" and info["omitted_lines"] == 0
+    assert body.endswith("Unchanged since the last brief (2024-01-01 09:00 EST): "
+                         "Health, Spend, Backlog, Risks, Revenue Impact.")
+    assert "Uptime" not in body and info["tokens"] < info["full_tokens"] / 2
+
+
+SMALL = """# Ops
+Uptime: 99%
+
+## Queue
+Backlog: 2
+P2: 1
+P3: 4
+
+## Spend
+Tokens: $47/day
+Cost per brief: $2.30
+"""
+
+
+@pytest.mark.parametrize("max_tokens", [40, 30, 20])
+def test_the_budget_leaves_out_unchanged_lines_before_changed_ones(bu, max_tokens):
+    report = SMALL.replace("Backlog: 2", "Backlog: 5").replace("P2: 1", "P2: 3")
+    body, info = bu.build_prompt(report, SMALL, max_tokens=max_tokens)
+
+    assert info["tokens"] <= max_tokens
+    assert "Backlog: 5" in body and "P2: 3" in body
+    assert "Uptime" not in body and "Tokens" not in body
+
+
+def test_the_summary_and_intro_go_before_unchanged_context(bu):
+    report = REPORT.replace("Backlog: 2", "Backlog: 9")
+    _, roomy = bu.build_prompt(report, REPORT)
+    body, info = bu.build_prompt(report, REPORT, max_tokens=roomy["tokens"] - 1)
+    assert "Unchanged since" not in body and "other sections unchanged" in body
+    assert "HITL Queue: 1 pending" in body and info["omitted_lines"] == 0
+
+    body, info = bu.build_prompt(report, REPORT, max_tokens=35)
+    assert body.startswith("### Queue\nBacklog: 9 items (normal: <5)  [was: 2 items (normal: <5)]")
+    assert "Only what changed" not in body and info["tokens"] <= 35
+
+
+def test_without_a_previous_report_the_budget_cuts_from_the_end(bu):
+    body, info = bu.build_prompt(SMALL, max_tokens=20)
+
+    assert info["mode"] == "full" and info["tokens"] <= 20
+    assert body.startswith("# Ops\nUptime: 99%") and "Cost per brief" not in body
+    assert body.endswith(f"({info['omitted_lines']} more lines left out for the token budget)")
@@ -0,0 +1,62 @@
+"""Round-trip tests for gmail_archive.InboxArchive."""
+import gzip, json, os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "server", "services"))
+
+from gmail_archive import InboxArchive, record_key  # noqa: E402
+
+
+def _record(msg_id, body="x" * 200):
+    return {"id": msg_id, "subject": f"Operations {msg_id}", "body_text": body}
+
+
+def test_records_round_trip_through_a_reopened_archive(tmp_path):
+    root = str(tmp_path / "segments")
+    with InboxArchive(root, segment_bytes=400) as archive:
+        assert all(archive.add(_record(f"m{i}")) for i in range(6))
+        assert not archive.add(_record("m3", body="a later copy"))  # deduped by id
+        assert archive.add({"subject": "no id", "body_text": "hash me"})
+
+    archive = InboxArchive(root, segment_bytes=400)
+    assert len(archive) == 7 and "m3" in archive
+    assert archive.get("m3") == _record("m3")
+    assert archive.get(record_key({"body_text": "hash me"}))["subject"] == "no id"
+    assert archive.get("missing") is None
+    # one gzip member per record: small segments roll over, and each is still a plain .jsonl.gz
+    segments = sorted(n for n in os.listdir(root) if n.endswith(".jsonl.gz"))
+    assert len(segments) > 1 and segments == sorted(archive.segments)
+    with gzip.open(os.path.join(root, segments[0]), "rt", encoding="utf-8") as f:
+        assert json.loads(f.readline())["id"] == "m0"
+    assert [r["id"] for r in archive if "id" in r] == [f"m{i}" for i in range(6)]
+
+
+def test_records_written_after_the_last_index_are_recovered(tmp_path):
+    root = str(tmp_path / "segments")
+    with InboxArchive(root) as archive:
+        archive.add(_record("m1"))
+    archive = InboxArchive(root)
+    archive.add(_record("m2"))  # the run dies before close()
+    segment = os.path.join(root, max(archive.segments))
+    with open(segment, "ab") as f:
+        f.write(gzip.compress(b'{"id": "torn"')[:10])  # and mid-write
+
+    archive = InboxArchive(root)
+    assert "m2" in archive and "torn" not in archive
+    assert archive.get("m2") == _record("m2")
+    assert archive.add(_record("m3")) and InboxArchive(root).get("m3") == _record("m3")
+
+
+def test_prune_drops_expired_segments_but_never_the_active_one(tmp_path):
+    root = str(tmp_path / "segments")
+    archive = InboxArchive(root, segment_bytes=400, retention_days=30)
+    for i in range(6):
+        archive.add(_record(f"m{i}"))
+    active = max(archive.segments)
+    segments = len(archive.segments)
+    newest = max(seg["newest"] for seg in archive.segments.values())
+
+    assert segments > 1 and archive.prune(now=newest + 31 * 86400) == segments - 1
+    assert list(archive.segments) == [active]
+    assert all(e[0] == active for e in archive.entries.values()) and "m0" not in archive
+    assert sorted(n for n in os.listdir(root) if n.endswith(".jsonl.gz")) == [active]
@@ -0,0 +1,339 @@
+"""Regression tests for gmail-pull.py, run offline against gmail_fake.FakeGmailService."""
+import importlib.util, json, os, sys
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = os.path.join(ROOT, "server", "services")
+sys.path.insert(0, SERVICES)
+
+from gmail_fake import FakeGmailService, make_message  # noqa: E402
+
+
+@pytest.fixture
+def gp(tmp_path, monkeypatch):
+    """A fresh gmail-pull module writing into tmp_path, unpaced and without metrics noise."""
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("GMAIL_METRICS_FILE", str(tmp_path / "gmail_metrics.prom"))
+    monkeypatch.setenv("GMAIL_QUOTA_UNITS", "0")
+    monkeypatch.setenv("GMAIL_BACKFILL_QUOTA", "0")
+    monkeypatch.delenv("GMAIL_SOURCES", raising=False)
+    spec = importlib.util.spec_from_file_location("gmail_pull", os.path.join(SERVICES, "gmail-pull.py"))
+    module = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, "gmail_pull", module)
+    spec.loader.exec_module(module)
+    yield module
+    if module._memo is not None:
+        module._memo.close()
+
+
+def _read(gp, name):
+    with open(os.path.join(gp.DATA_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _ops(msg_id, what, date="Mon, 1 Jan 2024 09:00:00 +0000"):
+    return make_message(msg_id, f"Operations: {what}", f"Bottleneck: {what}\nAll else nominal.\n", date=date)
+
+
+def test_runs_append_to_the_log_and_compact_only_past_the_thresholds(gp, monkeypatch):
+    svc = FakeGmailService([_ops("m1", "invoice approvals")])
+    gp.pull_and_write(svc)  # no snapshot yet, so the first log is folded in at once
+    snapshot = os.path.join(gp.DATA_DIR, "insights.json")
+    written = os.stat(snapshot).st_mtime_ns
+    svc.add(_ops("m2", "QA sign-off"))
+    gp.pull_and_write(svc)
+
+    assert os.stat(snapshot).st_mtime_ns == written and len(_read(gp, "insights.json")) == 1
+    assert [i["insight"] for i in gp._read_collection("insights")] == [
+        "Process bottleneck identified: invoice approvals", "Process bottleneck identified: QA sign-off"]
+
+    monkeypatch.setattr(gp, "COMPACT_LINES", 2)
+    svc.add(_ops("m3", "vendor onboarding"))
+    gp.pull_and_write(svc)
+    assert len(_read(gp, "insights.json")) == 3
+    assert not os.path.exists(os.path.join(gp.DATA_DIR, "insights.jsonl"))
+
+
+def test_compaction_merges_into_a_snapshot_written_by_someone_else(gp):
+    log = os.path.join(gp.DATA_DIR, "decisions.jsonl")
+    gp._append_items("decisions", [{"decision": "from the log"}])
+    staged = log + ".0.compacting"
+    os.replace(log, staged)  # staged against an empty snapshot...
+    gp._save_json("decisions.json", [{"decision": "from email-ingest"}])  # ...which changed meanwhile
+    with open(staged, encoding="utf-8") as f:
+        item = f.read()
+
+    assert [d["decision"] for d in gp._read_collection("decisions")] == ["from email-ingest", "from the log"]
+    with open(staged, "w", encoding="utf-8") as f:  # a staged log merged just before a crash
+        f.write(item)
+    assert [d["decision"] for d in gp._read_collection("decisions")] == ["from email-ingest", "from the log"]
+
+
+def test_sqlite_export_keeps_items_email_ingest_merged_into_the_json_files(gp, monkeypatch):
+    monkeypatch.setattr(gp, "STORE", "sqlite")
+    svc = FakeGmailService([_ops("m1", "invoice approvals")])
+    gp.pull_and_write(svc)
+    # EmailIngestService.mergeJsonFile appends to the exported file directly
+    gp._save_json("insights.json", gp._read_collection("insights") + [{"type": "email", "insight": "from email-ingest"}])
+    svc.add(_ops("m2", "QA sign-off"))
+    gp.pull_and_write(svc)
+
+    insights = [i["insight"] for i in gp._read_collection("insights")]
+    assert insights == ["Process bottleneck identified: invoice approvals", "from email-ingest",
+                        "Process bottleneck identified: QA sign-off"]
+
+
+@pytest.fixture
+def fast_retries(gp, monkeypatch):
+    """Retry backoffs of a few milliseconds (schedulers are built per client, on first use)."""
+    monkeypatch.setattr(gp, "RETRY_BASE_SECONDS", 0.001)
+    monkeypatch.setattr(gp, "RETRY_MAX_SECONDS", 0.004)
+
+
+def test_a_throttled_pull_completes(gp, fast_retries):
+    svc = FakeGmailService([_ops(f"m{i}", f"step {i}") for i in range(8)], throttle_rate=0.3, seed=3)
+    result = gp.pull_and_write(svc)
+
+    assert result["ok"] and result["messages_processed"] == 8 and result["messages"]["deferred"] == 0
+    assert svc.throttled > 0 and result["quota"]["throttled"] > 0 and result["quota"]["retries"] > 0
+    assert len(gp._read_collection("insights")) == 8
+
+
+def test_deferred_messages_are_not_ledgered_and_hold_the_cursor(gp, monkeypatch, fast_retries):
+    from gmail_fake import _throttled
+    monkeypatch.setattr(gp, "QUOTA_RETRIES", 1)
+    svc = FakeGmailService([_ops("m0", "invoice approvals")])
+    gp.pull_and_write(svc)
+    cursor = gp._load_cursor()
+    svc.add(_ops("m1", "QA sign-off"))
+    svc.add(_ops("m2", "vendor onboarding"))
+    get = svc._get
+    blocked = {"m2"}
+
+    def throttled_get(msg_id, fmt):
+        if fmt == "full" and msg_id in blocked:
+            raise _throttled()
+        return get(msg_id, fmt)
+    monkeypatch.setattr(svc, "_get", throttled_get)
+
+    result = gp.pull_and_write(svc)
+    assert result["ok"] and result["messages_processed"] == 1 and result["messages"]["deferred"] == 1
+    assert "m1" in gp._load_ledger() and "m2" not in gp._load_ledger()
+    assert gp._load_cursor() == cursor
+
+    blocked.clear()
+    result = gp.pull_and_write(svc)
+    assert result["messages_processed"] == 1 and result["messages"]["skipped"] == 1  # m1 is listed again
+    assert {"m0", "m1", "m2"} <= set(gp._load_ledger())
+    assert gp._load_cursor() != cursor
+    assert len(gp._read_collection("insights")) == 3
+
+
+def test_retry_after_is_honoured(gp, monkeypatch, fast_retries):
+    import httplib2
+    from googleapiclient.errors import HttpError
+    slept = []
+    monkeypatch.setattr(gp.time, "sleep", slept.append)
+    svc = FakeGmailService([_ops("m1", "invoice approvals")])
+    list_ = svc._list
+    calls = []
+
+    def throttled_once(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            content = json.dumps({"error": {"code": 429, "errors": [{"reason": "rateLimitExceeded"}]}}).encode()
+            raise HttpError(httplib2.Response({"status": 429, "retry-after": "7"}), content)
+        return list_(*args, **kwargs)
+    monkeypatch.setattr(svc, "_list", throttled_once)
+
+    result = gp.pull_and_write(svc)
+    assert result["ok"] and result["messages_processed"] == 1
+    assert slept == [7.0] and result["quota"]["retries"] == 1
+
+
+def _ceo(msg_id, autonomy, date):
+    return make_message(msg_id, "CEO Summary", f"Net New MRR: $1,500\nAutonomy: {autonomy}%\n", date=date)
+
+
+def test_backfill_over_pulled_messages_writes_nothing_twice(gp):
+    svc = FakeGmailService([_ops("m1", "invoice approvals", date="Mon, 15 Jan 2024 09:00:00 +0000"),
+                            _ceo("c1", 50, "Mon, 8 Jan 2024 09:00:00 +0000")])
+    gp.pull_and_write(svc)
+    svc.add(_ceo("c2", 95, "Thu, 1 Feb 2024 09:00:00 +0000"))
+    gp.pull_and_write(svc)
+    svc.add(_ops("m2", "QA sign-off", date="Wed, 10 Jan 2024 09:00:00 +0000"))  # never pulled
+
+    result = gp.backfill("2024-01-01", "2024-01-31", svc)
+
+    assert result["ok"] and result["messages_processed"] == 1
+    insights = [i["insight"] for i in gp._read_collection("insights")]
+    assert insights == ["Process bottleneck identified: invoice approvals",
+                        "Process bottleneck identified: QA sign-off"]
+    assert _read(gp, "scoreboard.json")["autonomy"]["auto_resolve_pct"] == 95
+
+
+def test_backfill_skips_messages_the_ledger_has_forgotten(gp):
+    svc = FakeGmailService([_ops("m1", "invoice approvals", date="Mon, 15 Jan 2024 09:00:00 +0000")])
+    gp.pull_and_write(svc)
+    ledger = gp._load_ledger()
+    ledger["m1"] -= 60 * 86400  # older than GMAIL_LEDGER_DAYS: evicted on save
+    gp._save_ledger(ledger)
+    assert "m1" not in gp._load_ledger()
+
+    result = gp.backfill("2024-01-01", "2024-01-31", svc)
+
+    assert result["ok"] and result["messages_processed"] == 0
+    assert [i["insight"] for i in gp._read_collection("insights")] == ["Process bottleneck identified: invoice approvals"]
+
+
+@pytest.mark.parametrize("store", ["json", "sqlite"])
+def test_backfill_remap_replaces_the_items_of_each_message(gp, monkeypatch, store):
+    monkeypatch.setattr(gp, "STORE", store)
+    svc = FakeGmailService([_ops("m1", "invoice approvals", date="Mon, 15 Jan 2024 09:00:00 +0000"),
+                            _ops("m3", "QA sign-off", date="Thu, 1 Feb 2024 09:00:00 +0000")])
+    gp.pull_and_write(svc)
+    assert len(gp._read_collection("decisions")) == 2
+
+    def mapper_v2(text):
+        return {"insights": [{"type": "operational", "insight": "v2: " + text.splitlines()[0]}]}
+    monkeypatch.setitem(gp.MAPPERS, "operations", (mapper_v2, None, "⚙️  Processing operational email"))
+    result = gp.backfill("2024-01-01", "2024-01-31", svc, remap=True)
+
+    assert result["ok"] and result["messages_processed"] == 1
+    insights = gp._read_collection("insights")
+    assert [(i["insight"], i["message_id"]) for i in insights] == [
+        ("Process bottleneck identified: QA sign-off", "m3"), ("v2: Bottleneck: invoice approvals", "m1")]
+    assert [d["message_id"] for d in gp._read_collection("decisions")] == ["m3"]  # m1's are gone
+
+    gp.backfill("2024-01-01", "2024-01-31", svc, remap=True, restart=True)  # again: still one item for m1
+    assert [i["message_id"] for i in gp._read_collection("insights")] == ["m3", "m1"]
+
+
+def _freeze(gp, monkeypatch, now):
+    class Frozen(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now.replace(tzinfo=tz) if tz else now
+    monkeypatch.setattr(gp, "datetime", Frozen)
+
+
+@pytest.mark.parametrize("pipeline, procs", [("sync", 0), ("async", 0), ("sync", 2)])
+def test_memo_hit_on_a_later_copy_gets_fresh_stamps(gp, monkeypatch, pipeline, procs):
+    monkeypatch.setattr(gp, "PIPELINE", pipeline)
+    monkeypatch.setattr(gp, "PARSE_PROCS", procs)
+    _freeze(gp, monkeypatch, datetime(2024, 1, 1, 9))
+    svc = FakeGmailService([_ops("m1", "invoice approvals")])
+    gp.pull_and_write(svc)
+    _freeze(gp, monkeypatch, datetime(2024, 1, 8, 9))
+    svc.add(_ops("m2", "invoice approvals", date="Mon, 8 Jan 2024 09:00:00 +0000"))  # re-sent a week later
+    result = gp.pull_and_write(svc)
+
+    assert result["messages"]["memo_hits"] == 1
+    assert [d["due"] for d in gp._read_collection("decisions")] == ["2024-01-04", "2024-01-11"]
+    assert [i["timestamp"][:10] for i in gp._read_collection("insights")] == ["2024-01-01", "2024-01-08"]
+
+
+@pytest.mark.parametrize("store", ["json", "sqlite"])
+def test_scoreboard_keeps_the_latest_summary_when_an_older_one_comes_last(gp, monkeypatch, store):
+    monkeypatch.setattr(gp, "STORE", store)
+    # Gmail lists newest first: the older summary is listed, and so folded, last
+    svc = FakeGmailService([_ceo("c2", 80, "Mon, 15 Jan 2024 09:00:00 +0000"),
+                            _ceo("c1", 50, "Mon, 8 Jan 2024 09:00:00 +0000")])
+    gp.pull_and_write(svc)
+    assert _read(gp, "scoreboard.json")["autonomy"]["auto_resolve_pct"] == 80
+
+    svc.add(_ceo("c0", 40, "Mon, 1 Jan 2024 09:00:00 +0000"))  # a late delivery, ingested last
+    gp.pull_and_write(svc)
+    board = _read(gp, "scoreboard.json")
+    assert (board["date"], board["autonomy"]["auto_resolve_pct"]) == ("2024-01-15", 80)
+    assert [day for day, _ in gp.scoreboard_series("autonomy.auto_resolve_pct")["points"]] == \
+        ["2024-01-01", "2024-01-08", "2024-01-15"]
+
+
+def test_resent_summary_is_filed_under_its_own_day(gp):
+    svc = FakeGmailService([_ceo("c1", 50, "Mon, 1 Jan 2024 09:00:00 +0000")])
+    gp.pull_and_write(svc)
+    svc.add(_ceo("c2", 50, "Mon, 8 Jan 2024 09:00:00 +0000"))  # same body, memo hit
+    result = gp.pull_and_write(svc)
+
+    assert result["messages"]["memo_hits"] == 1 and result["files"]["scoreboard_series"] == 1
+    assert gp.scoreboard_series("autonomy.auto_resolve_pct")["points"] == [("2024-01-01", 50.0), ("2024-01-08", 50.0)]
+    assert _read(gp, "scoreboard.json")["date"] == "2024-01-08"
+
+
+CEO_SUMMARY = """CEO Summary
+Net New MRR: $298 (target $1,200)
+Autonomy: 92% (MTTR 4.3m)
+Quiz→Paid: 7.8%
+LinkedIn ER: +19%
+Email CTR: +11%
+Top theme: "OpenAI critique"
+Conversions: 4 paid
+High risks: 2
+Medium risks: 1
+Next deadline 4h
+Risk score: 37
+"""
+
+CONTENT_DIGEST = """Content Digest
+Top Piece: "Why validation fails"
+Conversions: 4 paid
+Influenced: $596
+Persona: VS 3x > RL, Architect lagging
+Action: Repost the teardown on Tuesday.
+LinkedIn ER +19%
+Email CTR +11%
+"""
+
+
+def test_ceo_summary_maps_to_the_scoreboard(gp):
+    board = gp.map_ceo_to_scoreboard(CEO_SUMMARY)
+    del board["date"]
+    assert board == {
+        "revenue": {"realized_week": 298.0, "target_week": 1200.0, "upsells": 0},
+        "initiatives": {"on_time_pct": 0, "risk_inverted": 0, "resource_ok_pct": 0, "dependency_clear_pct": 0},
+        "alignment": {"work_tied_to_objectives_pct": 0},
+        "autonomy": {"auto_resolve_pct": 92.0, "mttr_min": 4.3},
+        "risk": {"score": 37, "high": 2, "medium": 1, "next_deadline_hours": 4},
+        "narrative": {"topic": "OpenAI critique", "linkedin_er_delta_pct": 19.0, "email_ctr_delta_pct": 11.0,
+                      "quiz_to_paid_delta_pct": 7.8, "conversions": 4},
+    }
+
+
+@pytest.mark.parametrize("body, topic", [
+    ("Autonomy: 80%\nNarrative: compliance automation.\n", "compliance automation"),
+    ("Autonomy: 80%\n", ""),  # no "Top theme" and no narrative: used to raise IndexError
+    ("Top theme:\n", ""),
+])
+def test_ceo_summary_without_a_top_theme(gp, body, topic):
+    assert gp.map_ceo_to_scoreboard(body)["narrative"]["topic"] == topic
+
+
+def test_content_digest_maps_to_actions_and_a_meeting(gp):
+    out = gp.map_content_to_actions(CONTENT_DIGEST)
+
+    assert [(a["title"], a["owner"]) for a in out["actions"]] == [
+        ("Amplify Top Piece: Why validation fails", "CMO"),
+        ("Prioritize VS persona content for 72h", "Content"),
+        ("Draft Architect brief (fast-track)", "Content"),
+        ("Repost the teardown on Tuesday", "CMO"),
+        ("Double LinkedIn cadence for 72h (winning theme)", "CMO"),
+        ("Extend winning email subject to VS segment", "CMO"),
+    ]
+    [meeting] = out["meetings"]
+    assert meeting["summary"] == ["Top piece: Why validation fails", "Paid from content: 4", "Influenced revenue: $596"]
+    assert gp.map_content_to_actions("Nothing to report.\n") == {"actions": [], "meetings": []}
+
+
+@pytest.mark.parametrize("rules", ["CEO_RULES", "CONTENT_RULES"])
+@pytest.mark.parametrize("text", [CEO_SUMMARY, CONTENT_DIGEST, CEO_SUMMARY.upper(), "Straße: paid 3\nPAID: 4\n", ""])
+def test_line_rules_pick_the_lines_chained_find_line_picked(gp, rules, text):
+    table = getattr(gp, rules)
+    expected = {}
+    for field, alts, extractor, _ in table:
+        L = next((L for L in (gp._find_line(text, *ks) for ks in alts) if L), "")
+        if L:
+            expected[field] = extractor(L) if extractor else L
+    assert gp._LineRules(table).extract(text) == expected
@@ -0,0 +1,73 @@
+"""Tests for gmail_quota's budget, scheduler and error helpers."""
+import json, os, random, sys
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "server", "services"))
+
+import gmail_quota  # noqa: E402
+from gmail_quota import AdaptiveScheduler, QuotaBudget, error_reason, is_retryable, is_throttle, retry_after  # noqa: E402
+
+
+def _error(status, reason="", **headers):
+    content = {"error": {"code": status, "errors": [{"reason": reason}] if reason else []}}
+    return HttpError(httplib2.Response({"status": status, **headers}), json.dumps(content).encode())
+
+
+def test_budget_sleeps_off_a_charge_past_the_burst(monkeypatch):
+    slept = []
+    monkeypatch.setattr(gmail_quota.time, "sleep", slept.append)
+    budget = QuotaBudget(10)
+
+    assert budget.charge("messages.get", calls=2) == 0  # 10 units: the whole burst
+    wait = budget.charge("history.list")  # 2 more go into debt
+    assert wait == pytest.approx(0.2, abs=0.01) and slept == [wait]
+    assert (budget.spent, budget.waited) == (12, wait)
+
+
+def test_scheduler_halves_once_per_cooldown_and_regrows():
+    sched = AdaptiveScheduler(100, max_window=20, cooldown=60)
+    for _ in range(3):  # one burst of rejections
+        sched.on_throttle()
+    assert (sched.window, sched.rate, sched.throttled, sched.decreases) == (10, 50, 3, 1)
+
+    sched.on_success()
+    assert (sched.window, sched.rate) == (11, 55)
+
+
+def test_scheduler_never_cuts_below_its_floors():
+    sched = AdaptiveScheduler(100, max_window=4, cooldown=0)
+    for _ in range(10):
+        sched.on_throttle()
+    assert (sched.window, sched.rate) == (1, 100 * gmail_quota.MIN_RATE)
+    for _ in range(100):
+        sched.on_success()
+    assert (sched.window, sched.rate) == (4, 100)
+
+
+def test_backoff_is_jittered_capped_and_honours_retry_after():
+    sched = AdaptiveScheduler(100, max_window=4, base_delay=1, max_delay=8, rng=random.Random(0))
+    for attempt, cap in [(1, 1), (2, 2), (3, 4), (4, 8), (5, 8), (9, 8)]:
+        assert cap / 2 <= sched.backoff(attempt) <= cap
+    assert sched.backoff(1, retry_after(_error(429, "rateLimitExceeded", **{"retry-after": "7"}))) == 7
+
+
+@pytest.mark.parametrize("exc, throttle, retryable, reason", [
+    (_error(429, "rateLimitExceeded"), True, True, "rateLimitExceeded"),
+    (_error(403, "userRateLimitExceeded"), True, True, "userRateLimitExceeded"),
+    (_error(403, "insufficientPermissions"), False, False, "insufficientPermissions"),
+    (_error(503), False, True, ""),
+    (_error(404, "notFound"), False, False, "notFound"),
+    (ValueError("not an API error"), False, False, ""),
+])
+def test_error_classification(exc, throttle, retryable, reason):
+    assert (is_throttle(exc), is_retryable(exc), error_reason(exc)) == (throttle, retryable, reason)
+
+
+def test_retry_after_reads_delta_seconds_only():
+    assert retry_after(_error(429, **{"retry-after": "7"})) == 7.0
+    assert retry_after(_error(429)) == 0.0
+    assert retry_after(_error(429, **{"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"})) == 0.0
@@ -0,0 +1,101 @@
+"""Table tests for gmail_routing over the shipped server/config/gmail-routes.json."""
+import os, random, sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "server", "services"))
+
+from gmail_routing import RouteRegistry, _HeaderMatcher  # noqa: E402
+
+ROUTES_FILE = os.path.join(ROOT, "server", "config", "gmail-routes.json")
+
+# The subject checks gmail-pull made before routes were configurable
+LEGACY = {
+    "ceo": ["ceo oversight", "ceo summary", "executive summary"],
+    "content": ["content digest", "content report", "marketing summary"],
+    "operations": ["operations", "workflow", "process", "bottleneck"],
+}
+
+
+def legacy_route(subject):
+    subj = subject.lower()
+    return [name for name, terms in LEGACY.items() if any(term in subj for term in terms)]
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return RouteRegistry.load(ROUTES_FILE)
+
+
+def test_shipped_routes_use_the_built_in_mappers(registry):
+    assert [(r.name, r.mapper) for r in registry.routes] == [(n, n) for n in LEGACY]
+    assert not registry.uses_labels
+
+
+@pytest.mark.parametrize("subject, routes", [
+    ("CEO Summary — Mon 1 Jan", ["ceo"]),
+    ("ceo oversight: weekly", ["ceo"]),
+    ("Executive Summary", ["ceo"]),
+    ("Fwd: EXECUTIVE SUMMARY", ["ceo"]),
+    ("CEO update", []),
+    ("Summary", []),
+    ("Content Digest #42", ["content"]),
+    ("Weekly content report", ["content"]),
+    ("Marketing Summary (Q1)", ["content"]),
+    ("Marketing update", []),
+    ("Operations: invoice approvals", ["operations"]),
+    ("Workflows stalled", ["operations"]),
+    ("Reprocessing queue", ["operations"]),  # a substring inside a word, as before
+    ("BOTTLENECKS", ["operations"]),
+    ("Executive Summary: content digest and process bottleneck", ["ceo", "content", "operations"]),
+    ("Content report on the CEO summary", ["ceo", "content"]),
+    ("ceo summaryceo oversight", ["ceo"]),
+    ("Re: lunch", []),
+    ("", []),
+    ("CEO OVERSİGHT", []),  # "İ".lower() is two characters, so the old check never matched
+    ("proceſſ review", []),  # long s is not an "s" to str.lower()
+    ("KPI workflow", ["operations"]),
+])
+def test_subjects_route_as_the_hard_coded_checks_did(registry, subject, routes):
+    assert legacy_route(subject) == routes
+    assert registry.classify(subject) == routes
+
+
+def test_random_subjects_route_as_the_hard_coded_checks_did(registry):
+    rng = random.Random(0)
+    pieces = [t for terms in LEGACY.values() for t in terms] + \
+             ["ceo", "summary", "content", "report", "proc", "ess", "flow", "work", "Re:", "Fwd:", "—", " ", "x"]
+    for _ in range(2000):
+        subject = "".join(rng.choice([p, p.upper(), p.title()]) for p in rng.choices(pieces, k=rng.randint(0, 5)))
+        assert registry.classify(subject) == legacy_route(subject), subject
+
+
+def test_header_matcher_credits_every_term_that_is_a_prefix_of_a_longer_one():
+    matcher = _HeaderMatcher([(0, "process"), (1, "process bottleneck"), (2, "re:^urgent\\b"), (3, "ness")])
+    assert matcher.routes("Process bottleneck") == {0, 1}
+    assert matcher.routes("URGENT: process") == {0, 2}
+    assert matcher.routes("processness") == {0, 3}
+    assert matcher.routes("bottleneck") == set()
+
+
+def test_routes_match_on_sender_and_label_too():
+    registry = RouteRegistry([
+        {"name": "ceo", "subject": ["ceo summary"]},
+        {"name": "vendor", "mapper": "vendor_mappers:map_invoice", "from": ["re:@(billing|invoices)\\."],
+         "label": ["finance"]},
+    ])
+    assert registry.uses_labels
+    assert registry.classify("Invoice 12", "Billing <noreply@billing.acme.com>") == ["vendor"]
+    assert registry.classify("CEO Summary", "ceo@complianceworxs.com", ["Finance/2024"]) == ["ceo", "vendor"]
+    assert registry.classify("Invoice 12", "ap@acme.com", ["inbox"]) == []
+
+
+@pytest.mark.parametrize("routes", [
+    [{"name": "ceo", "subject": ["a"]}, {"name": "ceo", "subject": ["b"]}],
+    [{"name": "bad name", "subject": ["a"]}],
+    [{"name": "empty"}],
+])
+def test_invalid_routes_are_rejected(routes):
+    with pytest.raises(ValueError):
+        RouteRegistry(routes)